@@ -14,6 +14,7 @@ from src.services.mysql_service import MySQLService
 from src.services.db_reader import DBSchemaReaderService
 from src.services.db_profiling_service import DBProfilingService, DataGovernanceConfig
 from src.services.inference import GeminiService, OpenAIService
+from src.services.llm_cache_service import with_response_cache
 
 
 def main():
@@ -45,6 +46,10 @@ def main():
         print(f"   ✗ Gemini not available: {e}")
         return
     
+    # Re-profiling sends identical prompts; serve them from the response cache if enabled
+    light_llm = with_response_cache(light_llm)
+    heavy_llm = with_response_cache(heavy_llm)
+    
     # 3. Initialize governance
     print("3. Initializing data governance...")
     governance = DataGovernanceConfig(
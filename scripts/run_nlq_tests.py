@@ -9,7 +9,7 @@ from typing import Any, Dict, List
 # Add project root to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.flows.nl_to_sql import process_nl_query
+from src.modules.columnar_result import ColumnarResult
 from src.services.mysql_service import MySQLService
 
 
@@ -37,6 +37,9 @@ def _escape_markdown(value: Any) -> str:
 def _format_results_section(title: str, data: Any) -> List[str]:
     lines: List[str] = [f"## {title}", ""]
 
+    if isinstance(data, ColumnarResult):
+        data = data.to_rows()
+
     if data is None:
         lines.append("_No data available._")
         lines.append("")
@@ -85,7 +88,7 @@ def _format_results_section(title: str, data: Any) -> List[str]:
     return lines
 
 
-def run_single_test(case: Dict[str, Any], mysql_service: MySQLService, report_dir: Path) -> Dict[str, Any]:
+def run_single_test(case: Dict[str, Any], mysql_service: MySQLService, report_dir: Path, columnar: bool = False) -> Dict[str, Any]:
     question_id = case["id"]
     question = case["question"]
     expected_sql = case["expected_sql"]
@@ -97,14 +100,17 @@ def run_single_test(case: Dict[str, Any], mysql_service: MySQLService, report_di
     }
 
     try:
-        expected_results = mysql_service.execute_query(expected_sql)
+        expected_results = mysql_service.execute_query(expected_sql, columnar=columnar)
         report_data["expected_results"] = expected_results
     except Exception as exc:
         report_data["expected_results_error"] = str(exc)
         expected_results = None
 
+    # Imported lazily: the flow picks its LLM provider from the environment at import
+    from src.flows.nl_to_sql import process_nl_query
+
     try:
-        generated_sql, generated_results = process_nl_query(question)
+        generated_sql, generated_results = process_nl_query(question, columnar=columnar)
         report_data["generated_sql"] = generated_sql
         report_data["generated_results"] = generated_results
     except Exception as exc:
@@ -209,8 +215,22 @@ def main() -> None:
     parser.add_argument("--start", type=int, default=1, help="Start question number (inclusive)")
     parser.add_argument("--end", type=int, default=None, help="End question number (inclusive)")
     parser.add_argument("--output-dir", type=Path, default=Path("reports/test_runs"), help="Base directory for test reports")
+    parser.add_argument("--columnar", action="store_true", help="Fetch and compare results in columnar mode")
+    parser.add_argument("--llm-stand-in", type=Path, default=None, help="Replay LLM responses from this JSONL recordings file via the local stand-in server")
+    parser.add_argument("--llm-latency", default=None, help="Stand-in latency spec, e.g. fixed:0.5 or lognormal:-0.5,0.4")
+    parser.add_argument("--llm-record-from", default=None, help="Forward stand-in misses to this Ollama/OpenAI-compatible server and record them")
     args = parser.parse_args()
 
+    stand_in = None
+    if args.llm_stand_in:
+        from src.services.llm_stand_in import LLMStandInServer
+        stand_in = LLMStandInServer(
+            recordings=str(args.llm_stand_in), latency=args.llm_latency, upstream=args.llm_record_from
+        ).start()
+        os.environ["NLQ_LLM_PROVIDER"] = "ollama"
+        os.environ["LLM_API_BASE"] = stand_in.url
+        print(f"Using LLM stand-in at {stand_in.url} ({len(stand_in.responses)} recorded responses)")
+
     cases = load_test_cases(args.jsonl_path)
 
     filtered_cases = []
@@ -230,11 +250,14 @@ def main() -> None:
 
     summary: List[Dict[str, Any]] = []
     for case in filtered_cases:
-        result = run_single_test(case, mysql_service, run_dir)
+        result = run_single_test(case, mysql_service, run_dir, columnar=args.columnar)
         summary.append(result)
 
     write_summary(run_dir, summary)
     print(f"Saved reports in {run_dir}")
+    if stand_in:
+        print(f"LLM stand-in stats: {stand_in.stats}")
+        stand_in.stop()
 
 
 if __name__ == "__main__":
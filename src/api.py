@@ -1,11 +1,14 @@
 
 import uvicorn
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from src.flows.nl_to_sql import process_nl_query
+from src.flows.nl_to_sql import complexity_classifier, query_cache, semantic_cache, sql_templates, process_nl_query, process_nl_query_paged, fetch_next_page, stream_nl_query
+from src.services.pagination_service import PaginationError
+from src.modules.columnar_result import ColumnarResult, json_value
+from src.services.streaming import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, encode_ndjson, encode_sse
+from src.services.token_usage import get_meter
 import json
-from decimal import Decimal
 
 
 app = FastAPI()
@@ -18,25 +21,86 @@ app.add_middleware(
 )
 
 
-def decimal_default(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
+def json_default(obj):
+    """JSON encoder fallback for database values and columnar results"""
+    if isinstance(obj, ColumnarResult):
+        return obj.to_json_dict()
+    value = json_value(obj)
+    if value is obj:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return value
 
 @app.post("/query")
 async def query_endpoint(request: Request):
     data = await request.json()
+    # "format": "columnar" returns {"columns": [...], "data": {column: [...]}} instead of row objects
+    columnar = data.get("format") == "columnar"
+    cursor = data.get("cursor")
+    page_size = data.get("page_size")
     nl_query = data.get("query")
-    if not nl_query:
+    if not nl_query and not cursor:
         return JSONResponse({"error": "Missing 'query' field"}, status_code=400)
+    if page_size is not None and (not isinstance(page_size, int) or page_size <= 0):
+        return JSONResponse({"error": "'page_size' must be a positive integer"}, status_code=400)
     try:
-        sql, results = process_nl_query(nl_query)
-        # sql, results = "dummy sql", [{ 'col1': 'value1' }, {'col1': 'value2'}, { 'col1': 'value1' }, {'col1': 'value2'}]
-        # Use custom encoder for Decimal
-        json_str = json.dumps({"results": results, "sql": sql}, default=decimal_default)
-        return JSONResponse(content=json.loads(json_str))
+        if cursor:
+            # Next page of an already-generated query; no LLM calls
+            sql, results, next_cursor = fetch_next_page(cursor, columnar=columnar)
+            payload = {"results": results, "sql": sql, "next_cursor": next_cursor}
+        elif page_size:
+            sql, results, next_cursor = process_nl_query_paged(nl_query, page_size, columnar=columnar)
+            payload = {"results": results, "sql": sql, "next_cursor": next_cursor}
+        else:
+            sql, results = process_nl_query(nl_query, columnar=columnar)
+            # sql, results = "dummy sql", [{ 'col1': 'value1' }, {'col1': 'value2'}, { 'col1': 'value1' }, {'col1': 'value2'}]
+            payload = {"results": results, "sql": sql}
+        # Serialize once with a custom encoder for Decimal, dates and columnar results
+        body = json.dumps(payload, default=json_default)
+        return Response(content=body, media_type="application/json")
+    except PaginationError as e:
+        return JSONResponse({"error": str(e)}, status_code=410)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+@app.post("/query/stream")
+async def query_stream_endpoint(request: Request):
+    """
+    Streaming variant of /query. Emits stage events (refined query tokens, intent,
+    path, SQL) as each stage completes, then result batches of `batch_size` rows.
+    Responds with Server-Sent Events when the client accepts text/event-stream
+    (or sends "stream": "sse"), otherwise with NDJSON.
+    """
+    data = await request.json()
+    nl_query = data.get("query")
+    batch_size = data.get("batch_size", 100)
+    columnar = data.get("format") == "columnar"
+    if not nl_query:
+        return JSONResponse({"error": "Missing 'query' field"}, status_code=400)
+    if not isinstance(batch_size, int) or batch_size <= 0:
+        return JSONResponse({"error": "'batch_size' must be a positive integer"}, status_code=400)
+
+    use_sse = data.get("stream") == "sse" or SSE_MEDIA_TYPE in request.headers.get("accept", "")
+    encode = encode_sse if use_sse else encode_ndjson
+
+    def body():
+        # Sync generator: Starlette iterates it in a worker thread
+        try:
+            for event in stream_nl_query(nl_query, batch_size=batch_size, columnar=columnar):
+                yield encode(event, default=json_default)
+        except Exception as e:
+            yield encode({"event": "error", "error": str(e)}, default=json_default)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=SSE_MEDIA_TYPE if use_sse else NDJSON_MEDIA_TYPE, headers=headers)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """LLM token usage per flow stage, provider and model, refinement-skip decisions and query, semantic and SQL template cache lookups (Prometheus text format)"""
+    body = (
+        get_meter().to_prometheus() + complexity_classifier.to_prometheus()
+        + query_cache.to_prometheus() + semantic_cache.to_prometheus() + sql_templates.to_prometheus()
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run("src.api:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,48 +1,260 @@
-from typing import Any, List, Dict
-from langgraph.graph import StateGraph, END
-from src.services.inference import ModelInferenceService, OllamaService, OpenAIService
+import functools
+import os
+import queue
+import threading
+from typing import Annotated, Any, Iterator, List, Dict, Optional
+from langgraph.graph import StateGraph, START, END
+from src.services.inference import GeminiService, ModelInferenceService, OllamaService, OpenAIService
+from src.services.llm_cache_service import with_response_cache
+from src.services.routing_inference import RoutingInferenceService
 from src.services.mysql_service import MySQLService
 from src.services.nlp import NLQIntentAnalyzer
+from src.services.pagination_service import QueryPaginator
+from src.services.query_cache import QueryPlanCache
+from src.services.query_complexity import QueryComplexityClassifier
+from src.services.semantic_cache import ChromaAnswerStore, LocalAnswerStore, SemanticAnswerCache
+from src.services.query_cost_service import QueryCostGuard
 from src.services.sql_generation_service import SQLGenerationService
+from src.services.sql_template_cache import SQLTemplateCache
+from src.services.token_usage import track_stage
 from src.modules.semantic_graph import SemanticGraph
+from src.modules.columnar_result import ColumnarResult
 from src.services.vector_service import GraphVectorService
 
+
+def create_inference_service(provider: str):
+    """Inference service for an NLQ_LLM_PROVIDER / LLM_ROUTER_FALLBACKS name"""
+    if provider == "ollama":
+        return OllamaService(model=os.getenv("LLM_MODEL", "qwen2.5-coder:3b"), base_url=os.getenv("LLM_API_BASE", "http://localhost:11434"))
+    if provider == "model":
+        return ModelInferenceService()
+    if provider == "gemini":
+        return GeminiService()
+    if provider == "openai":
+        return OpenAIService(model="gpt-4o")
+    raise ValueError(f"Unknown LLM provider '{provider}' (expected openai, gemini, ollama or model)")
+
+
 # Load the semantic graph from file or service
 GRAPH_PATH = "schemas/ecommerce_marketplace.json"  # Update as needed
 graph = SemanticGraph.load_from_json(GRAPH_PATH)
 
 # Initialize services
-model = OpenAIService(model="gpt-4o")
-# model = OllamaService(model="qwen2.5-coder:3b")
+# NLQ_LLM_PROVIDER=ollama or model targets LLM_API_BASE, e.g. the local stand-in in llm_stand_in.py
+LLM_PROVIDER = os.getenv("NLQ_LLM_PROVIDER", "openai").lower()
+# Failover, circuit breaking and hedging across providers (see routing_inference.py),
+# e.g. LLM_ROUTER_FALLBACKS=gemini tries Gemini when the primary provider fails
+LLM_FALLBACKS = [name.strip().lower() for name in os.getenv("LLM_ROUTER_FALLBACKS", "").split(",") if name.strip()]
+# Disk-backed response cache (LLM_CACHE_ENABLED=true, LLM_CACHE_MODE=replay for offline test runs)
+if LLM_FALLBACKS:
+    llm_providers = [LLM_PROVIDER] + [name for name in LLM_FALLBACKS if name != LLM_PROVIDER]
+    model = RoutingInferenceService([(name, create_inference_service(name)) for name in llm_providers])
+    model = with_response_cache(model, provider="+".join(llm_providers))
+else:
+    model = with_response_cache(create_inference_service(LLM_PROVIDER))
 vector_service = GraphVectorService()
 # Index the graph nodes for vector search
 vector_service.index_graph(graph)
 
 intent_analyzer = NLQIntentAnalyzer(model=model, vector_service=vector_service)
+# Lets simple, unambiguous queries skip the analyst refinement call (REFINE_SKIP_*)
+complexity_classifier = QueryComplexityClassifier()
+# Resolve intent from the graph's lexical index before asking the LLM (LEXICAL_INTENT_MIN_COVERAGE)
+LEXICAL_INTENT_ENABLED = os.getenv("LEXICAL_INTENT_ENABLED", "true").lower() == "true"
+# Intent, path and SQL of answered questions, per graph snapshot (QUERY_CACHE_*)
+query_cache = QueryPlanCache()
+# Parameterized SQL per question shape and join path, bound without the LLM (SQL_TEMPLATE_CACHE_*)
+sql_templates = SQLTemplateCache()
+# Paraphrases of answered questions reuse their path and SQL, confirmed by a light LLM (SEMANTIC_CACHE_*)
+if os.getenv("SEMANTIC_CACHE_BACKEND", "chroma").lower() == "local":
+    answer_store = LocalAnswerStore(vector_service.embedding_fn)
+else:
+    answer_store = ChromaAnswerStore(vector_service)
+light_model = with_response_cache(OpenAIService(model=os.getenv("LLM_LIGHT_MODEL", "gpt-4o-mini"))) if LLM_PROVIDER == "openai" else model
+semantic_cache = SemanticAnswerCache(answer_store, verifier=light_model)
 sql_generator = SQLGenerationService(db_name="ecommerce_marketplace", model=model)
+# Precompute governance sensitivity of graph columns once at load
+if sql_generator.governance:
+    graph.sensitivity_index(sql_generator.governance)
+# Categorical value -> column index for WHERE literals, and the lexical intent index built on it
+graph.value_index()
+graph.lexical_index()
+# Optional EXPLAIN-based pre-flight check (QUERY_COST_GUARD_ENABLED=true to enable)
+cost_guard = QueryCostGuard(sql_generator.sql_service, graph)
+# Server-side cursors for paging through results of generated SQL
+paginator = QueryPaginator(sql_generator.sql_service)
+
+
+def _emit(state: dict, event: str, **data):
+    """Publish a stage event to a streaming caller (no-op for invoke callers)"""
+    emit = state.get("emit")
+    if emit:
+        emit({"event": event, **data})
+
+
+def tracked_stage(stage: str):
+    """Attribute the node's LLM token usage to `stage` in state["token_usage"]"""
+    def decorator(node):
+        @functools.wraps(node)
+        def run(state: dict) -> dict:
+            with track_stage(stage, state):
+                return node(state)
+        return run
+    return decorator
+
+
+def merge_state(current: dict, update: dict) -> dict:
+    """
+    State reducer. Nodes mutate and return the shared state dict; parallel
+    branches return it in the same step, so updates are merged instead of
+    rejected. The caller's dict stays the state object.
+    """
+    if not current:
+        return update
+    if update is not current:
+        current.update(update)
+    return current
+
+
+def check_query_cache(state: dict) -> dict:
+    """
+    Repeated questions (same normalized wording, same graph snapshot) and
+    paraphrases of answered ones (embedding similarity, same literals) reuse
+    the cached intent, path and SQL and go straight to the cost check.
+    """
+    plan = query_cache.get(state["user_query"], graph)
+    source = "query_cache"
+    if not plan:
+        plan = semantic_cache.lookup(state["user_query"], graph)
+        source = "semantic_cache"
+    if not plan:
+        return state
+    print(f"♻️ Plan reused from {source}: {plan['sql']}")
+    state.update(plan["intent"])
+    state["path"] = plan["path"]
+    state["sql"] = plan["sql"]
+    state["retries"] = 0
+    state["plan_source"] = source
+    _emit(state, "intent", intent=plan["intent"], source=source)
+    _emit(state, "path", path=plan["path"])
+    _emit(state, "sql", sql=plan["sql"], cached=True)
+    return state
+
+
+def cache_route(state: dict) -> str:
+    return "check_cost" if state.get("plan_source") else "classify_query"
+
+
+def _remember_plan(state: dict, sql: str):
+    """
+    Store the plan of executed SQL in the caches it did not come from.
+    Corrected SQL replaces whatever the caches held.
+    """
+    corrected = bool(state.get("retries"))
+    source = state.get("plan_source")
+    intent = {key: state.get(key) for key in ("start_node", "end_node", "condition")}
+    if corrected or source != "query_cache":
+        query_cache.put(state["user_query"], graph, intent, state["path"], sql)
+    if corrected or source in (None, "sql_template"):
+        semantic_cache.add(state["user_query"], graph, intent, state["path"], sql)
+    if corrected or source is None:
+        sql_templates.learn(state["user_query"], state["path"], sql, graph)
+
+
+def classify_query(state: dict) -> dict:
+    """
+    Heuristic prescreen of the query. Complex queries are refined in parallel
+    with retrieval; the rest wait for retrieval and its vector confidence.
+    """
+    prescreen = complexity_classifier.prescreen(state["user_query"])
+    state["query_complexity"] = prescreen
+    if not prescreen["simple"]:
+        complexity_classifier.record(skipped=False, reasons=prescreen["reasons"])
+    return state
+
 
+def classify_route(state: dict) -> List[str]:
+    if state["query_complexity"]["simple"]:
+        return ["retrieve_context"]
+    return ["refine_query", "retrieve_context"]
 
+
+def retrieve_context(state: dict) -> dict:
+    """
+    Vector search for candidate intent nodes. It only needs the user's own
+    query, not the refinement, so complex queries run it in parallel with
+    refine_query. For prescreened-simple queries the hit distances decide
+    whether refinement is skipped.
+    """
+    scored_nodes = intent_analyzer.retrieve_nodes_with_distances(state["user_query"], graph)
+    state["candidate_nodes"] = [node_id for node_id, _ in scored_nodes]
+    if not state["query_complexity"]["simple"]:
+        return state
+
+    confidence = complexity_classifier.check_confidence(scored_nodes)
+    state["query_complexity"] = {**state["query_complexity"], **confidence}
+    complexity_classifier.record(skipped=confidence["simple"], reasons=confidence["reasons"])
+    if confidence["simple"]:
+        print(f"⏭️ Simple query (best hit distance {confidence['top_distance']:.3f}); skipping refinement")
+        state["refinement_skipped"] = True
+        _emit(state, "refined_query", refined_query=state["user_query"], skipped=True)
+    else:
+        state["refine_after_retrieval"] = True
+    return state
+
+
+def refine_gate(state: dict) -> str:
+    # Complex queries were refined in parallel with retrieval
+    return "refine_query" if state.get("refine_after_retrieval") else "extract_intent"
+
+
+def _guidance_tables(analyst_guidance: Optional[str]) -> List[str]:
+    """Graph tables listed under TABLES NEEDED in the analyst guidance"""
+    if not analyst_guidance or "TABLES NEEDED:" not in analyst_guidance:
+        return []
+    line = analyst_guidance.split("TABLES NEEDED:")[1].split("\n")[0]
+    names = [name.strip(" []*`'\".") for name in line.replace(";", ",").split(",")]
+    return [name for name in names if name in graph.node_properties]
+
+
+@tracked_stage("extract_intent")
 def extract_intent(state: dict) -> dict:
     # Use refined query if available, otherwise fall back to original
     query_for_intent = state.get("refined_query", state["user_query"])
     
-    print(f"Extracting user intent from: {query_for_intent}")
-    intent = intent_analyzer.analyze_intent(query_for_intent, graph)
+    # Candidates retrieved in parallel with refinement, plus tables the analyst asked for
+    node_names = state.get("candidate_nodes")
+    if node_names is not None:
+        node_names = node_names + [
+            table for table in _guidance_tables(state.get("analyst_guidance")) if table not in node_names
+        ]
+    
+    # Queries that name their tables, columns and values verbatim skip the LLM call
+    intent = None
+    if LEXICAL_INTENT_ENABLED:
+        lexical = graph.lexical_index().resolve(state["user_query"])
+        intent = lexical["intent"]
+        if not intent:
+            print(f"Lexical intent not resolved ({lexical['reason']}, coverage {lexical['confidence']:.2f})")
+    state["intent_source"] = "lexical" if intent else "llm"
+    
+    if not intent:
+        print(f"Extracting user intent from: {query_for_intent}")
+        intent = intent_analyzer.analyze_intent(query_for_intent, graph, node_names=node_names)
     if not intent:
         raise ValueError("Could not extract intent from user query.")
     state.update(intent)
-    print("Intent received: ", intent)
+    print(f"Intent received ({state['intent_source']}): ", intent)
+    _emit(state, "intent", intent=intent, source=state["intent_source"])
     return state
 
-def refine_query_as_analyst(state: dict) -> dict:
-    """
-    Refine the user query by thinking like a data analyst.
-    Provides context about available tables and suggests which tables to look at,
-    what joins might be needed, and clarifies any ambiguities.
-    """
-    user_query = state["user_query"]
-    
-    print("\n🔍 Refining query as data analyst...")
+_table_summaries = {"version": None, "lines": []}
+
+
+def table_summaries() -> List[str]:
+    """Table lines for the analyst prompt, rebuilt only when the graph version changes"""
+    if _table_summaries["version"] == graph.version:
+        return _table_summaries["lines"]
     
     # Get all table nodes with their descriptions
     table_nodes = []
@@ -65,6 +277,22 @@ def refine_query_as_analyst(state: dict) -> dict:
             
             table_nodes.append(table_info)
     
+    _table_summaries.update(version=graph.version, lines=table_nodes)
+    return table_nodes
+
+@tracked_stage("refine_query")
+def refine_query_as_analyst(state: dict) -> dict:
+    """
+    Refine the user query by thinking like a data analyst.
+    Provides context about available tables and suggests which tables to look at,
+    what joins might be needed, and clarifies any ambiguities.
+    """
+    user_query = state["user_query"]
+    
+    print("\n🔍 Refining query as data analyst...")
+    
+    table_nodes = table_summaries()
+    
     # Create analyst prompt
     prompt = f"""You are an experienced data analyst reviewing a user's query request. Your job is to think through the query and provide guidance on how to approach it.
 
@@ -88,7 +316,15 @@ NOTES: [Any additional considerations or ambiguities to address]
 """
     
     try:
-        analyst_guidance = model.chat_completion(prompt)
+        if state.get("emit") and hasattr(model, "stream_chat_completion"):
+            # Forward tokens to the client while the analyst guidance is generated
+            chunks = []
+            for chunk in model.stream_chat_completion(prompt):
+                chunks.append(chunk)
+                _emit(state, "token", stage="refine_query", text=chunk)
+            analyst_guidance = "".join(chunks)
+        else:
+            analyst_guidance = model.chat_completion(prompt)
         print(f"\n📊 Data Analyst Guidance:\n{analyst_guidance}\n")
         
         # Store both original and refined query
@@ -111,6 +347,7 @@ NOTES: [Any additional considerations or ambiguities to address]
         state["refined_query"] = user_query
         state["analyst_guidance"] = None
     
+    _emit(state, "refined_query", refined_query=state["refined_query"])
     return state
 
 def find_path(state: dict) -> dict:
@@ -118,6 +355,7 @@ def find_path(state: dict) -> dict:
     if not state.get("end_node") or state["end_node"] == [""] or state["start_node"] == state["end_node"] or len(state["end_node"]) == 0:
         state["path"] = [state["start_node"][0], state["start_node"][0]]
         print("Single entity query detected. Path: ", state["path"])
+        _emit(state, "path", path=state["path"])
         return state
     
     cost, path, walk = graph.find_path(state["start_node"], state["end_node"], "foreign_key,association,reverse_foreign_key")
@@ -126,8 +364,10 @@ def find_path(state: dict) -> dict:
         state["path"] = [state["start_node"][0], state["start_node"][0]]
     
     state["path"] = path
+    _emit(state, "path", path=path)
     return state
 
+@tracked_stage("generate_sql")
 def generate_sql(state: dict) -> dict:
     # Use refined query if available, otherwise use original
     query_for_generation = state.get("refined_query", state["user_query"])
@@ -138,36 +378,94 @@ def generate_sql(state: dict) -> dict:
     else:
         query_context = query_for_generation
     
-    sql = sql_generator.generate_sql(state["path"], graph, f"{query_context}\n\nIntent Condition: {state.get('condition', '')}")
-    print("generated sql", sql)
+    # Same question shape and path as an executed query: bind the new literals instead
+    sql = sql_templates.bind(state["user_query"], state["path"], graph)
+    if sql:
+        print("🧩 SQL bound from template: ", sql)
+        state["plan_source"] = "sql_template"
+    else:
+        sql = sql_generator.generate_sql(state["path"], graph, f"{query_context}\n\nIntent Condition: {state.get('condition', '')}")
+        print("generated sql", sql)
     state["sql"] = sql
     state["retries"] = 0  # Initialize retries
+    _emit(state, "sql", sql=sql)
     return state
 
+def check_cost(state: dict) -> dict:
+    """
+    Pre-flight EXPLAIN of the generated SQL. Expensive queries are rejected,
+    capped with a LIMIT, or sent back for correction with the plan as feedback.
+    """
+    result = cost_guard.check(state["sql"])
+    state["cost_verdict"] = result["verdict"]
+    if result["estimate"]:
+        state["cost_estimate"] = {
+            "rows_examined": result["estimate"]["rows_examined"],
+            "full_scans": result["estimate"]["full_scans"]
+        }
+
+    if result["verdict"] == "ok":
+        return state
+
+    print(f"💸 Cost guard ({result['verdict']}): {result['reason']}")
+    if result["verdict"] == "limit":
+        state["sql"] = result["sql"]
+        return state
+
+    if result["verdict"] == "correct":
+        state["error"] = cost_guard.format_feedback(result)
+    else:
+        state["error"] = result["reason"]
+    state["results"] = None
+    return state
+
+def check_cost_route(state: dict) -> str:
+    verdict = state.get("cost_verdict", "ok")
+    if verdict == "correct":
+        if state.get("retries", 0) < 3:
+            return "correct_sql"
+        print("Max retries reached. Stopping.")
+        return END
+    if verdict == "reject":
+        return END
+    return "run_sql"
+
 def run_sql(state: dict) -> dict:
     sql = state["sql"]
     print("Executing Sql: ", sql)
     try:
-        results = sql_generator.run_sql(sql)
+        if state.get("page_size"):
+            results, next_cursor = paginator.first_page(sql, state["page_size"])
+            state["next_cursor"] = next_cursor
+            if state.get("columnar"):
+                results = ColumnarResult.from_dicts(results)
+        else:
+            results = sql_generator.run_sql(sql, columnar=state.get("columnar", False))
         state["results"] = results
         state["error"] = None
     except Exception as e:
         print(f"SQL Execution Error: {e}")
         state["error"] = str(e)
         state["results"] = None
+    if state["error"] is None:
+        _remember_plan(state, sql)
     return state
 
+@tracked_stage("correct_sql")
 def correct_sql(state: dict) -> dict:
     print("Correcting SQL based on error...")
     invalid_sql = state["sql"]
     error = state["error"]
     user_query = state["user_query"]
     
+    if state.get("refinement_skipped") and not state.get("retries"):
+        complexity_classifier.record_correction_after_skip()
     corrected_sql = sql_generator.correct_sql(invalid_sql, error, user_query)
     print("Corrected SQL: ", corrected_sql)
     
     state["sql"] = corrected_sql
     state["retries"] = state.get("retries", 0) + 1
+    _emit(state, "sql", sql=corrected_sql, retry=state["retries"])
     return state
 
 def check_retry(state: dict) -> str:
@@ -180,19 +478,54 @@ def check_retry(state: dict) -> str:
     return END
 
 # Build the LangGraph
-builder = StateGraph(dict)
+builder = StateGraph(Annotated[dict, merge_state])
+builder.add_node("check_query_cache", check_query_cache)
+builder.add_node("classify_query", classify_query)
+builder.add_node("retrieve_context", retrieve_context)
 builder.add_node("extract_intent", extract_intent)
 builder.add_node("refine_query", refine_query_as_analyst)
 builder.add_node("find_path", find_path)
 builder.add_node("generate_sql", generate_sql)
+builder.add_node("check_cost", check_cost)
 builder.add_node("run_sql", run_sql)
 builder.add_node("correct_sql", correct_sql)
 
-builder.set_entry_point("refine_query")
+# Repeated questions skip straight to the cost check with their cached SQL.
+# Complex queries: refinement (LLM) and vector retrieval run as parallel
+# branches in one step and meet at intent extraction. Prescreened-simple
+# queries retrieve first; refinement only runs if the vector match is weak.
+builder.add_edge(START, "check_query_cache")
+builder.add_conditional_edges(
+    "check_query_cache",
+    cache_route,
+    {
+        "classify_query": "classify_query",
+        "check_cost": "check_cost"
+    }
+)
+builder.add_conditional_edges("classify_query", classify_route, ["refine_query", "retrieve_context"])
+builder.add_conditional_edges(
+    "retrieve_context",
+    refine_gate,
+    {
+        "refine_query": "refine_query",
+        "extract_intent": "extract_intent"
+    }
+)
 builder.add_edge("refine_query", "extract_intent")
 builder.add_edge("extract_intent", "find_path")
 builder.add_edge("find_path", "generate_sql")
-builder.add_edge("generate_sql", "run_sql")
+builder.add_edge("generate_sql", "check_cost")
+
+builder.add_conditional_edges(
+    "check_cost",
+    check_cost_route,
+    {
+        "run_sql": "run_sql",
+        "correct_sql": "correct_sql",
+        END: END
+    }
+)
 
 builder.add_conditional_edges(
     "run_sql",
@@ -202,16 +535,90 @@ builder.add_conditional_edges(
         END: END
     }
 )
-builder.add_edge("correct_sql", "run_sql")
+builder.add_edge("correct_sql", "check_cost")
 
 nlq_to_sql_graph = builder.compile()
 
-def process_nl_query(user_query: str) -> tuple[str, dict]:
+def process_nl_query(user_query: str, columnar: bool = False) -> tuple[str, dict]:
     """
     Main entry point for NLQ to SQL flow using langgraph state.
+    With columnar=True the results are returned as a ColumnarResult.
     """
-    state = {"user_query": user_query}
+    state = {"user_query": user_query, "columnar": columnar}
     final_state = nlq_to_sql_graph.invoke(state)
     print(final_state)
+    print("Token usage per stage: ", state.get("token_usage"))
 
     return (state['sql'], state['results'])
+
+def process_nl_query_paged(user_query: str, page_size: int, columnar: bool = False) -> tuple[str, Any, Optional[str]]:
+    """
+    Run the NLQ to SQL flow and return only the first page of results.
+    Returns (sql, results, next_cursor); next_cursor is None on the last page.
+    """
+    if page_size <= 0:
+        raise ValueError("page_size must be a positive integer")
+    state = {"user_query": user_query, "columnar": columnar, "page_size": page_size}
+    nlq_to_sql_graph.invoke(state)
+    return (state['sql'], state['results'], state.get('next_cursor'))
+
+def fetch_next_page(cursor: str, columnar: bool = False) -> tuple[str, Any, Optional[str]]:
+    """
+    Fetch the next page of an already-generated query by cursor token,
+    without re-running intent extraction or SQL generation.
+    """
+    sql, results, next_cursor = paginator.next_page(cursor)
+    if columnar:
+        results = ColumnarResult.from_dicts(results)
+    return (sql, results, next_cursor)
+
+def stream_nl_query(user_query: str, batch_size: int = 100, columnar: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Run the NLQ to SQL flow and yield events as each stage completes:
+    "token" (analyst refinement tokens), "refined_query", "intent", "path", "sql",
+    then one "results" event per batch of rows and a final "done" (or "error").
+
+    The flow runs in a worker thread and publishes events through a queue, so the
+    first bytes reach the client while the LLM calls are still running. Results
+    are fetched batch by batch through the paginator's server-side cursor.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer")
+    events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+    state = {"user_query": user_query, "columnar": columnar, "page_size": batch_size, "emit": events.put}
+
+    def run():
+        try:
+            nlq_to_sql_graph.invoke(state)
+        except Exception as e:
+            state["error"] = str(e)
+            state["results"] = None
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+
+    if state.get("results") is None:
+        yield {"event": "error", "error": state.get("error") or "Query did not produce results", "sql": state.get("sql")}
+        return
+
+    # The first batch comes from run_sql (already columnar if requested)
+    results, next_cursor, batch, row_count = state["results"], state.get("next_cursor"), 0, 0
+    while True:
+        row_count += len(results)
+        yield {"event": "results", "batch": batch, "results": results}
+        if not next_cursor:
+            break
+        _, results, next_cursor = paginator.next_page(next_cursor)
+        if columnar:
+            results = ColumnarResult.from_dicts(results)
+        batch += 1
+    yield {
+        "event": "done", "sql": state["sql"], "row_count": row_count, "batches": batch + 1,
+        "token_usage": state.get("token_usage", {})
+    }
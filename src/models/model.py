@@ -1,9 +1,13 @@
 from datetime import datetime
+import json
 import os
 import requests
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterator, Optional, Any
 from dotenv import load_dotenv
 
+from src.services.http_session import get_session, request_timeout
+from src.services.streaming import iter_sse_data
+
 load_dotenv()
 
 
@@ -19,6 +23,7 @@ class Model:
         api_base: Optional[str] = None,
         api_key: Optional[str] = None,
         embed_model: Optional[str] = None,
+        session: Optional[requests.Session] = None,
     ):
         self.api_base = api_base or os.getenv("LLM_API_BASE")
         self.api_key = api_key or os.getenv("LLM_API_KEY")
@@ -34,6 +39,9 @@ class Model:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+        # Shared keep-alive connection pool (see src/services/http_session.py)
+        self.session = session or get_session()
+        self.timeout = request_timeout()
 
     def chat(
         self,
@@ -47,6 +55,45 @@ class Model:
         """
         Calls the LLM chat endpoint with optional schema or tool calling.
         """
+        payload = self._chat_payload(messages, response_format, temperature, json_schema, tools, tool_choice)
+        response = self.session.post(
+            f"{self.api_base}/chat/completions", json=payload, headers=self.headers, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: str = "",
+        temperature: float = 0.2,
+        json_schema: Optional[Dict] = None,
+    ) -> Iterator[str]:
+        """
+        Streams the chat completion, yielding content deltas as they arrive.
+        """
+        payload = self._chat_payload(messages, response_format, temperature, json_schema)
+        payload["stream"] = True
+        with self.session.post(
+            f"{self.api_base}/chat/completions", json=payload, headers=self.headers,
+            timeout=self.timeout, stream=True
+        ) as response:
+            response.raise_for_status()
+            for data in iter_sse_data(response.iter_lines(decode_unicode=True)):
+                choices = json.loads(data).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+
+    def _chat_payload(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: str = "",
+        temperature: float = 0.2,
+        json_schema: Optional[Dict] = None,
+        tools: Optional[List[Dict]] = None,
+        tool_choice: Optional[str] = None,
+    ) -> Dict[str, Any]:
         payload: Dict[str, Any] = {
             "model": self.model,
             "temperature": temperature,
@@ -78,11 +125,7 @@ class Model:
             if tool_choice:
                 payload["tool_choice"] = tool_choice
 
-        response = requests.post(
-            f"{self.api_base}/chat/completions", json=payload, headers=self.headers
-        )
-        response.raise_for_status()
-        return response.json()
+        return payload
 
     def embed(self, texts: List[str]) -> List[List[float]]:
         """
@@ -97,8 +140,8 @@ class Model:
         payload = {"input": texts, "model": self.embed_model}
 
         print(f"[Model Embedding] Requesting embeddings for {len(texts)} texts.")
-        response = requests.post(
-            f"{self.api_base}/embeddings", json=payload, headers=self.headers
+        response = self.session.post(
+            f"{self.api_base}/embeddings", json=payload, headers=self.headers, timeout=self.timeout
         )
         response.raise_for_status()
         data = response.json()
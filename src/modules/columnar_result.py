@@ -0,0 +1,152 @@
+from decimal import Decimal
+from datetime import date, datetime, time, timedelta
+
+# NumPy and PyArrow are optional; without them columns are plain Python lists.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class ColumnarResult:
+    """
+    A query result stored column-wise: a list of column names plus one array per column.
+
+    Compared to a list of per-row dicts this stores each column name once and keeps
+    values of a column contiguous. Numeric columns without NULLs become typed NumPy
+    arrays when NumPy is installed; everything else is kept as an object column.
+    """
+
+    def __init__(self, columns, data=None):
+        """
+        Args:
+            columns: Ordered list of column names
+            data: Dict mapping column name to a sequence of values
+        """
+        self.columns = list(columns)
+        data = data or {}
+        self.data = {col: self._as_array(data.get(col, [])) for col in self.columns}
+
+    @classmethod
+    def from_rows(cls, columns, rows):
+        """
+        Build a columnar result from row tuples (e.g. cursor.fetchall()).
+        """
+        columns = list(columns)
+        values = [list(col) for col in zip(*rows)] if rows else [[] for _ in columns]
+        return cls(columns, dict(zip(columns, values)))
+
+    @classmethod
+    def from_cursor(cls, cursor, batch_size=10000):
+        """
+        Build a columnar result from a tuple cursor, fetching in batches so that
+        row tuples are released as soon as they are copied into the columns.
+        """
+        columns = [desc[0] for desc in cursor.description]
+        values = [[] for _ in columns]
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for i, col in enumerate(zip(*batch)):
+                values[i].extend(col)
+        return cls(columns, dict(zip(columns, values)))
+
+    @classmethod
+    def from_dicts(cls, rows):
+        """
+        Build a columnar result from a list of row dicts.
+        """
+        columns = []
+        for row in rows:
+            for key in row.keys():
+                if key not in columns:
+                    columns.append(key)
+        return cls(columns, {col: [row.get(col) for row in rows] for col in columns})
+
+    def __len__(self):
+        if not self.columns:
+            return 0
+        return len(self.data[self.columns[0]])
+
+    def __eq__(self, other):
+        if not isinstance(other, ColumnarResult):
+            return NotImplemented
+        return self.columns == other.columns and all(
+            list(self.data[col]) == list(other.data[col]) for col in self.columns
+        )
+
+    def column(self, name):
+        """Get the array for a column"""
+        return self.data[name]
+
+    def with_column(self, name, values):
+        """Return a new result with one column replaced"""
+        data = dict(self.data)
+        data[name] = values
+        return ColumnarResult(self.columns, data)
+
+    def to_rows(self):
+        """Convert back to a list of per-row dicts"""
+        arrays = [self._to_list(self.data[col]) for col in self.columns]
+        return [dict(zip(self.columns, values)) for values in zip(*arrays)]
+
+    def to_arrow(self):
+        """Convert to a pyarrow.Table (requires pyarrow)"""
+        if pa is None:
+            raise ImportError("pyarrow is required for ColumnarResult.to_arrow()")
+        return pa.table({col: pa.array(self._to_list(self.data[col])) for col in self.columns})
+
+    def to_json_dict(self):
+        """
+        JSON-ready representation: {"columns": [...], "data": {column: [...]}, "row_count": n}.
+        Decimals become floats and temporal values become ISO strings.
+        """
+        return {
+            "columns": self.columns,
+            "data": {col: [json_value(v) for v in self._to_list(self.data[col])] for col in self.columns},
+            "row_count": len(self)
+        }
+
+    @staticmethod
+    def _to_list(values):
+        return values.tolist() if hasattr(values, "tolist") else list(values)
+
+    @staticmethod
+    def _as_array(values):
+        """Store a column as a typed NumPy array when possible, else as a list"""
+        if np is None:
+            return list(values)
+        if isinstance(values, np.ndarray):
+            return values
+        values = list(values)
+        if values and all(type(v) is int for v in values):
+            try:
+                return np.array(values, dtype=np.int64)
+            except OverflowError:
+                pass
+        elif values and all(type(v) in (int, float) for v in values):
+            return np.array(values, dtype=np.float64)
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+
+def json_value(value):
+    """Convert a single database value to a JSON-serializable value"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    if np is not None and isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,60 @@
+import re
+import threading
+from collections import OrderedDict
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive substring matcher for a list of keywords.
+
+    All keywords are compiled into one alternation regex, so a column name is
+    scanned once instead of once per keyword. Decisions are memoized per name in
+    a bounded LRU cache; column names repeat across prompts and result rows, so
+    most lookups never reach the regex.
+    """
+
+    def __init__(self, keywords, cache_size=4096):
+        """
+        Args:
+            keywords: Keywords to look for anywhere in a name
+            cache_size: Maximum number of memoized decisions
+        """
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.set_keywords(keywords)
+
+    def set_keywords(self, keywords):
+        """Replace the keyword list, recompile and drop memoized decisions"""
+        self.keywords = [k.lower() for k in keywords if k]
+        # Longest first so the alternation prefers the most specific keyword
+        alternatives = sorted(set(self.keywords), key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(k) for k in alternatives)) if alternatives else None
+        self.clear_cache()
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def matches(self, name):
+        """True if any keyword occurs in name (case-insensitive)"""
+        with self._lock:
+            hit = self._cache.get(name)
+            if hit is not None:
+                self._cache.move_to_end(name)
+                return hit
+
+        result = self.search(name) is not None
+
+        with self._lock:
+            self._cache[name] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def search(self, name):
+        """Return the first matching keyword in name, or None"""
+        if self._pattern is None or not name:
+            return None
+        match = self._pattern.search(str(name).lower())
+        return match.group(0) if match else None
@@ -0,0 +1,194 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Question, aggregation and filler words that never name a schema element
+STOPWORDS = frozenset("""
+a an the of in on at for to from by with within into about as and or is are was were be been being
+do does did have has had there their this that these those it its me my our we you your i
+how many much what which who whom whose when where why show list give get find display tell return
+all any some every each total number count sum average avg mean max maximum min minimum
+please can could would should will shall may might just only also
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Weights of the match sources; anything at or above STRONG_WEIGHT anchors a table
+SOURCE_WEIGHTS = {"name": 1.0, "column": 0.9, "synonym": 0.9, "value": 0.8, "description": 0.3}
+STRONG_WEIGHT = 0.8
+MAX_NGRAM = 4
+
+
+def singularize(token: str) -> str:
+    """Crude English singular form, enough to match "orders" with "order" """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("sses", "xes", "ches", "shes", "uses")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lower-cased, singularized word tokens; underscores split words"""
+    return [singularize(t) for t in _TOKEN.findall(str(text).lower().replace("_", " "))]
+
+
+class LexicalIntentIndex:
+    """
+    N-gram index over the nodes of a semantic graph, used to resolve the intent
+    of queries that name tables and columns almost verbatim without an LLM call.
+
+    Terms come from node names (tables and columns), `synonyms` properties,
+    categorical values (from SemanticGraph.value_index()) and, with a low weight,
+    the words of descriptions. A query resolves when its n-grams anchor one or
+    two tables through strong matches (names, synonyms, values), no strong match
+    is ambiguous, and enough of its content words are explained. Matched
+    categorical values become the intent condition.
+
+    Build it through SemanticGraph.lexical_index(), which caches the index and
+    rebuilds it when the graph changes.
+    """
+
+    def __init__(self, graph, min_coverage: Optional[float] = None):
+        """
+        Args:
+            graph: SemanticGraph to index
+            min_coverage: Share of content words that must be explained
+                (defaults to LEXICAL_INTENT_MIN_COVERAGE, 0.75)
+        """
+        self.min_coverage = min_coverage if min_coverage is not None else float(
+            os.getenv("LEXICAL_INTENT_MIN_COVERAGE", "0.75")
+        )
+        # term -> node_id -> (weight, source, original text)
+        self.terms: Dict[Tuple[str, ...], Dict[str, Tuple[float, str, str]]] = {}
+        self.tables: Set[str] = set()
+        for node_id, node_data in graph.node_properties.items():
+            self._index_node(node_id, node_data.get("type"), node_data.get("properties") or {})
+        # Categorical values, mapped to the columns that hold them
+        for holders in graph.value_index().values.values():
+            for node_id, value, _ in holders:
+                self._add(value, node_id, "value")
+
+    def _add(self, text: Any, node_id: str, source: str):
+        term = tuple(tokenize(text))
+        if not term or len(term) > MAX_NGRAM or all(t in STOPWORDS for t in term):
+            return
+        weight = SOURCE_WEIGHTS[source]
+        nodes = self.terms.setdefault(term, {})
+        if node_id not in nodes or nodes[node_id][0] < weight:
+            nodes[node_id] = (weight, source, str(text))
+
+    def _index_node(self, node_id: str, node_type: Optional[str], properties: Dict[str, Any]):
+        if node_type in ("table", "view", "virtual_table"):
+            self.tables.add(node_id)
+            self._add(node_id, node_id, "name")
+        elif node_type == "attribute":
+            column = node_id.split(".")[-1]
+            self._add(column, node_id, "column")
+            # "is_active" is asked about as "active"
+            if column.startswith(("is_", "has_")):
+                self._add(column.split("_", 1)[1], node_id, "column")
+        else:
+            return
+        for synonym in properties.get("synonyms") or []:
+            self._add(synonym, node_id, "synonym")
+        for key in ("description", "Comment", "table_comment", "semantic_meaning"):
+            for word in set(tokenize(properties.get(key) or "")):
+                if word not in STOPWORDS and len(word) > 2:
+                    self._add(word, node_id, "description")
+
+    def table_of(self, node_id: str) -> str:
+        return node_id if node_id in self.tables else node_id.split(".")[0]
+
+    def resolve(self, query: str) -> Dict[str, Any]:
+        """
+        Match the query against the index.
+
+        Returns:
+            {"intent": {start_node, end_node, condition} or None, "confidence": float,
+             "tables": [...], "matches": [...], "reason": why it did not resolve}
+        """
+        tokens = tokenize(query)
+        content = [i for i, t in enumerate(tokens) if t not in STOPWORDS]
+        result = {"intent": None, "confidence": 0.0, "tables": [], "matches": [], "reason": None}
+        if not content:
+            result["reason"] = "no_content_words"
+            return result
+
+        # Longest strong matches first; a token belongs to at most one match
+        strong = []
+        covered: Set[int] = set()
+        for n in range(min(MAX_NGRAM, len(tokens)), 0, -1):
+            for i in range(len(tokens) - n + 1):
+                span = range(i, i + n)
+                if covered.intersection(span):
+                    continue
+                hits = {
+                    node: hit for node, hit in self.terms.get(tuple(tokens[i:i + n]), {}).items()
+                    if hit[0] >= STRONG_WEIGHT
+                }
+                if hits:
+                    strong.append((i, hits))
+                    covered.update(span)
+        strong.sort(key=lambda match: match[0])
+
+        # Table names anchor tables; columns and values anchor their table if unambiguous
+        anchored: List[str] = []
+        for _, hits in strong:
+            for node, (_, source, _) in hits.items():
+                if source == "name" and node not in anchored:
+                    anchored.append(node)
+        conditions = []
+        for _, hits in strong:
+            if any(source == "name" for _, source, _ in hits.values()):
+                continue
+            in_anchored = {node: hit for node, hit in hits.items() if self.table_of(node) in anchored}
+            candidates = in_anchored or hits
+            if len(candidates) > 1:
+                result["reason"] = "ambiguous_match"
+                result["matches"].append(sorted(candidates))
+                return result
+            node, (_, source, text) = next(iter(candidates.items()))
+            table = self.table_of(node)
+            if table not in anchored:
+                anchored.append(table)
+            if source == "value":
+                conditions.append(f"{node} = '{text}'")
+            result["matches"].append(node)
+
+        # "COD payment": a table name that is part of a matched column's name
+        # describes that column, it does not add a table
+        matched_columns = [node for node in result["matches"] if node not in self.tables]
+        for table in list(anchored):
+            name = set(tokenize(table))
+            if len(anchored) > 1 and any(
+                self.table_of(node) != table and self.table_of(node) in anchored
+                and name <= set(tokenize(node.split(".")[-1]))
+                for node in matched_columns
+            ):
+                anchored.remove(table)
+
+        # Description words explain the rest when they point into the anchored tables
+        for i in content:
+            if i in covered:
+                continue
+            if any(self.table_of(node) in anchored for node in self.terms.get((tokens[i],), {})):
+                covered.add(i)
+
+        result["tables"] = anchored
+        result["confidence"] = sum(1 for i in content if i in covered) / len(content)
+        if not anchored:
+            result["reason"] = "no_table"
+        elif len(anchored) > 2:
+            result["reason"] = "too_many_tables"
+        elif result["confidence"] < self.min_coverage:
+            result["reason"] = "low_coverage"
+        else:
+            result["intent"] = {
+                "start_node": [anchored[0]],
+                "end_node": [anchored[-1]],
+                "condition": " AND ".join(conditions)
+            }
+        return result
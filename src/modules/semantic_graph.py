@@ -1,8 +1,13 @@
+import hashlib
 import heapq
 from collections import defaultdict
 import json
 import copy
 
+from src.modules.lexical_index import LexicalIntentIndex
+from src.modules.sensitivity_index import SensitivityIndex
+from src.modules.value_index import CategoricalValueIndex
+
 # The SemanticGraph class is included here for self-containment.
 # This is the core data structure that will be built and expanded.
 class SemanticGraph:
@@ -33,6 +38,12 @@ class SemanticGraph:
         """Initializes an empty graph."""
         self.graph = defaultdict(dict)
         self.node_properties = {}
+        # Bumped on every change; derived indexes compare it to know when to rebuild
+        self.version = 0
+        self._sensitivity = None
+        self._lexical = None
+        self._values = None
+        self._fingerprint = None
 
     def get_neighbors_by_condition(self, node_id, condition):
         """
@@ -54,6 +65,7 @@ class SemanticGraph:
         """
         if node_id not in self.node_properties:
             self.node_properties[node_id] = {'type': node_type, 'properties': properties or {}}
+            self.version += 1
             print(f"Node added: '{node_id}' ({node_type})")
         else:
             print(f"Warning: Node '{node_id}' already exists.")
@@ -71,6 +83,7 @@ class SemanticGraph:
         if properties:
             edge_data['properties'] = properties
         self.graph[from_node][to_node] = edge_data
+        self.version += 1
         print(f"Edge added: '{from_node}' -> '{to_node}' (Weight: {weight}, Condition: {condition}, Properties: {properties})")
 
     def find_path(self, start_nodes, target_nodes, query_context):
@@ -126,6 +139,46 @@ class SemanticGraph:
             return None
         return copy.deepcopy(self.graph[from_node][to_node])
     
+    def sensitivity_index(self, classifier):
+        """
+        Returns the SensitivityIndex of this graph for a governance classifier.
+        The index is built once and rebuilt only when the graph changes or the
+        classifier's keywords are reloaded (its keywords_version changes).
+        """
+        key = (id(classifier), getattr(classifier, 'keywords_version', 0), self.version)
+        if self._sensitivity is None or self._sensitivity[0] != key:
+            self._sensitivity = (key, SensitivityIndex(self, classifier))
+        return self._sensitivity[1]
+
+    def value_index(self):
+        """
+        Returns the CategoricalValueIndex of this graph (literal value -> columns
+        holding it), rebuilt only when the graph changes.
+        """
+        if self._values is None or self._values[0] != self.version:
+            self._values = (self.version, CategoricalValueIndex(self))
+        return self._values[1]
+
+    def fingerprint(self):
+        """
+        Short content hash of the graph (edges and node properties). Unlike
+        `version` it is stable across processes, so persisted artifacts can be
+        tied to a graph snapshot. Recomputed only when the graph changes.
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.version:
+            payload = json.dumps({"graph": self.graph, "node_properties": self.node_properties}, sort_keys=True, default=str)
+            self._fingerprint = (self.version, hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16])
+        return self._fingerprint[1]
+
+    def lexical_index(self):
+        """
+        Returns the LexicalIntentIndex of this graph (names, synonyms, categorical
+        values and descriptions), rebuilt only when the graph changes.
+        """
+        if self._lexical is None or self._lexical[0] != self.version:
+            self._lexical = (self.version, LexicalIntentIndex(self))
+        return self._lexical[1]
+
     def save_to_json(self, file_path):
         """
         Saves the current state of the semantic graph to a JSON file.
@@ -0,0 +1,44 @@
+class SensitivityIndex:
+    """
+    Precomputed governance sensitivity of the attribute nodes of a semantic graph.
+
+    Every node gets a compact integer ID (its position in node_properties) and the
+    sensitive attribute nodes are stored as a bitmap over those IDs, plus a set of
+    lower-cased "table.column" names for lookups from parsed SQL. An attribute is
+    sensitive if profiling flagged it (`is_sensitive` property) or its column name
+    matches the governance keywords.
+
+    Build it through SemanticGraph.sensitivity_index(), which caches the index and
+    rebuilds it when the graph or the keyword configuration changes.
+    """
+
+    def __init__(self, graph, classifier):
+        """
+        Args:
+            graph: SemanticGraph to index
+            classifier: Object with is_sensitive_column(column_name), e.g. DataGovernanceService
+        """
+        self.node_ids = {node_id: i for i, node_id in enumerate(graph.node_properties)}
+        self.bitmap = 0
+        sensitive = set()
+        for node_id, node_data in graph.node_properties.items():
+            if node_data.get("type") != "attribute":
+                continue
+            column = node_id.split(".")[-1]
+            props = node_data.get("properties") or {}
+            if props.get("is_sensitive") or classifier.is_sensitive_column(column):
+                self.bitmap |= 1 << self.node_ids[node_id]
+                sensitive.add(node_id.lower())
+        self.sensitive_columns = frozenset(sensitive)
+
+    def __len__(self):
+        return len(self.sensitive_columns)
+
+    def is_sensitive(self, node_id: str) -> bool:
+        """True if the graph node is a sensitive attribute"""
+        i = self.node_ids.get(node_id)
+        return i is not None and bool((self.bitmap >> i) & 1)
+
+    def is_sensitive_column(self, table: str, column: str) -> bool:
+        """True if table.column is a sensitive attribute of the graph"""
+        return f"{table}.{column}".lower() in self.sensitive_columns
@@ -0,0 +1,622 @@
+"""
+Lightweight SQL parser for governance checks.
+
+Parses MySQL SELECT statements (CTEs, UNIONs, derived tables, joins and scalar
+subqueries) into a small tree that is enough to answer governance questions:
+which columns each projection reads, which tables are referenced, what each
+table alias points to, and which base table column an output column comes from.
+It does not validate SQL; unknown syntax is skipped rather than rejected.
+
+Parsed queries are cached by SQL hash so the repeated checks done by SQL
+generation and execution parse each statement only once. Cached trees are
+shared and must be treated as read-only.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class Token(NamedTuple):
+    kind: str        # ident, string, number, op
+    value: str       # identifier without backticks, or raw text
+    start: int       # offset in the SQL string
+    end: int
+    quoted: bool = False
+
+    @property
+    def upper(self) -> str:
+        return self.value.upper() if self.kind == "ident" and not self.quoted else ""
+
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<backtick>`(?:[^`]|``)*`?)
+  | (?P<string>'(?:[^'\\]|\\.|'')*'?|"(?:[^"\\]|\\.|"")*"?)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+  | (?P<ident>[A-Za-z_$@][\w$@]*)
+  | (?P<op>[<>!=]=|<=>|<>|\|\||&&|:=|.)
+""", re.VERBOSE | re.DOTALL)
+
+# Reserved words that are never column references when unquoted
+KEYWORDS = frozenset("""
+    SELECT FROM WHERE GROUP BY HAVING ORDER LIMIT OFFSET UNION EXCEPT INTERSECT ALL DISTINCT
+    DISTINCTROW AS ON USING JOIN INNER LEFT RIGHT OUTER CROSS NATURAL FULL STRAIGHT_JOIN LATERAL
+    AND OR NOT XOR IS NULL IN LIKE BETWEEN EXISTS REGEXP RLIKE SOUNDS ESCAPE CASE WHEN THEN ELSE
+    END ASC DESC TRUE FALSE INTERVAL DIV MOD WITH RECURSIVE OVER PARTITION ROWS RANGE PRECEDING
+    FOLLOWING UNBOUNDED CURRENT ROW SEPARATOR BINARY COLLATE ROLLUP FOR UPDATE SHARE LOCK MODE
+    INTO WINDOW ANY SOME USE FORCE IGNORE INDEX KEY CURRENT_DATE CURRENT_TIME CURRENT_TIMESTAMP
+    LOCALTIME LOCALTIMESTAMP UTC_DATE UTC_TIME UTC_TIMESTAMP HIGH_PRIORITY SQL_CALC_FOUND_ROWS
+    SQL_NO_CACHE SQL_CACHE SQL_SMALL_RESULT SQL_BIG_RESULT SQL_BUFFER_RESULT
+""".split())
+
+INTERVAL_UNITS = frozenset("""
+    MICROSECOND SECOND MINUTE HOUR DAY WEEK MONTH QUARTER YEAR SECOND_MICROSECOND
+    MINUTE_MICROSECOND MINUTE_SECOND HOUR_MICROSECOND HOUR_SECOND HOUR_MINUTE DAY_MICROSECOND
+    DAY_SECOND DAY_MINUTE DAY_HOUR YEAR_MONTH
+""".split())
+
+_SELECT_MODIFIERS = frozenset("""
+    ALL DISTINCT DISTINCTROW HIGH_PRIORITY STRAIGHT_JOIN SQL_SMALL_RESULT SQL_BIG_RESULT
+    SQL_BUFFER_RESULT SQL_NO_CACHE SQL_CACHE SQL_CALC_FOUND_ROWS
+""".split())
+_SET_OPERATORS = frozenset({"UNION", "EXCEPT", "INTERSECT"})
+_PROJECTION_END = frozenset({"FROM", "INTO", "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "WINDOW",
+                             "FOR", "LOCK"}) | _SET_OPERATORS
+_FROM_END = frozenset({"WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "WINDOW", "FOR", "LOCK",
+                       "INTO"}) | _SET_OPERATORS
+_JOIN_WORDS = frozenset({"JOIN", "INNER", "LEFT", "RIGHT", "OUTER", "CROSS", "NATURAL", "FULL",
+                         "STRAIGHT_JOIN", "LATERAL"})
+
+_MAX_DEPTH = 32
+
+
+class ColumnRef(NamedTuple):
+    """A column reference, optionally qualified by a table name or alias"""
+    qualifier: Optional[str]
+    name: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.qualifier}.{self.name}" if self.qualifier else self.name
+
+
+class SelectItem:
+    """One projection of a SELECT list"""
+
+    def __init__(self, text: str, start: int, end: int, alias: Optional[str], alias_text: Optional[str],
+                 columns: List[ColumnRef], star_qualifier: Optional[str] = None, is_star: bool = False,
+                 is_column: bool = False, expr_end: Optional[int] = None):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.expr_end = expr_end if expr_end is not None else end  # end of the expression, before any alias
+        self.alias = alias
+        self.alias_text = alias_text
+        self.columns = columns
+        self.is_star = is_star
+        self.star_qualifier = star_qualifier
+        self.is_column = is_column
+
+    @property
+    def output_name(self) -> str:
+        """Column name the item has in the result set"""
+        if self.alias:
+            return self.alias
+        if self.is_column:
+            return self.columns[0].name
+        return self.text
+
+    def __repr__(self):
+        return f"SelectItem({self.text!r}, alias={self.alias!r})"
+
+
+class TableRef:
+    """A FROM/JOIN source: a base table, a CTE reference, or a derived table"""
+
+    def __init__(self, name: Optional[str], alias: Optional[str] = None, schema: Optional[str] = None,
+                 query: Optional["Query"] = None):
+        self.name = name
+        self.alias = alias
+        self.schema = schema
+        self.query = query
+
+    @property
+    def is_base_table(self) -> bool:
+        return self.query is None
+
+    def matches(self, qualifier: str) -> bool:
+        qualifier = qualifier.lower()
+        if self.alias:
+            return self.alias.lower() == qualifier
+        return bool(self.name) and self.name.lower() == qualifier
+
+    def __repr__(self):
+        return f"TableRef({self.name!r}, alias={self.alias!r}, derived={self.query is not None})"
+
+
+class Select:
+    """A single SELECT block"""
+
+    def __init__(self):
+        self.items: List[SelectItem] = []
+        self.sources: List[TableRef] = []
+        self.subqueries: List["Query"] = []
+        self.filter_columns: List[ColumnRef] = []
+
+    def source_for(self, ref: ColumnRef) -> Optional[TableRef]:
+        """Resolve the FROM source a column reference reads from"""
+        if ref.qualifier:
+            return next((s for s in self.sources if s.matches(ref.qualifier)), None)
+        if len(self.sources) == 1:
+            return self.sources[0]
+        for source in self.sources:
+            if source.query is not None and ref.name.lower() in source.query.output_names():
+                return source
+        return None
+
+    def lineage(self, ref: ColumnRef, depth: int = 0) -> List[Tuple[Optional[str], str]]:
+        """Base (table, column) pairs a column reference is derived from; table is None if unknown"""
+        source = self.source_for(ref)
+        if source is None:
+            return [(None, ref.name)]
+        if source.query is None:
+            return [(source.name, ref.name)]
+        if depth >= _MAX_DEPTH:
+            return [(None, ref.name)]
+        return source.query.column_lineage(ref.name, depth + 1)
+
+    def item_lineage(self, item: SelectItem) -> List[Tuple[Optional[str], str]]:
+        result = []
+        for ref in item.columns:
+            result.extend(self.lineage(ref))
+        return result
+
+    def star_tables(self, item: SelectItem) -> List[TableRef]:
+        """Sources expanded by a * or t.* projection"""
+        if item.star_qualifier:
+            return [s for s in self.sources if s.matches(item.star_qualifier)]
+        return list(self.sources)
+
+
+class Query:
+    """A query expression: optional CTEs plus one or more SELECTs joined by set operators"""
+
+    def __init__(self, ctes: Optional[Dict[str, "Query"]] = None):
+        self.ctes: Dict[str, "Query"] = ctes or {}
+        self.selects: List[Select] = []
+        self.subqueries: List["Query"] = []
+
+    def output_names(self) -> List[str]:
+        if not self.selects:
+            return []
+        return [item.output_name.lower() for item in self.selects[0].items]
+
+    def column_lineage(self, name: str, depth: int = 0) -> List[Tuple[Optional[str], str]]:
+        """Base (table, column) pairs behind an output column of this query"""
+        result = []
+        names = self.output_names()
+        position = names.index(name.lower()) if name.lower() in names else None
+        for select in self.selects:
+            # Set operations match columns by position, not by name
+            item = None
+            if position is not None and position < len(select.items) and not select.items[position].is_star:
+                item = select.items[position]
+            if item is not None:
+                for ref in item.columns:
+                    result.extend(select.lineage(ref, depth))
+                continue
+            star = next((i for i in select.items if i.is_star), None)
+            if star is not None:
+                result.extend(select.lineage(ColumnRef(star.star_qualifier, name), depth))
+        return result or [(None, name)]
+
+    def walk(self, depth: int = 0) -> Iterator["Query"]:
+        """This query and every nested query (CTEs, derived tables, subqueries)"""
+        yield self
+        if depth >= _MAX_DEPTH:
+            return
+        for cte in self.ctes.values():
+            yield from cte.walk(depth + 1)
+        for sub in self.subqueries:
+            yield from sub.walk(depth + 1)
+        for select in self.selects:
+            for source in select.sources:
+                if source.query is not None and source.name is None:
+                    yield from source.query.walk(depth + 1)
+            for sub in select.subqueries:
+                yield from sub.walk(depth + 1)
+
+    def walk_selects(self) -> Iterator[Select]:
+        for query in self.walk():
+            yield from query.selects
+
+
+class ParsedQuery(Query):
+    """Root of a parsed statement"""
+
+    def __init__(self, sql: str):
+        super().__init__()
+        self.sql = sql
+
+    def tables(self) -> List[str]:
+        """Base tables referenced anywhere in the statement, without duplicates"""
+        seen = OrderedDict()
+        for select in self.walk_selects():
+            for source in select.sources:
+                if source.is_base_table and source.name:
+                    seen.setdefault(source.name.lower(), source.name)
+        return list(seen.values())
+
+    def table_aliases(self) -> Dict[str, str]:
+        """Map lower-cased aliases (and table names) to base table names"""
+        aliases = {}
+        for select in self.walk_selects():
+            for source in select.sources:
+                if source.is_base_table and source.name:
+                    aliases[source.name.lower()] = source.name
+                    if source.alias:
+                        aliases[source.alias.lower()] = source.name
+        return aliases
+
+
+class _Parser:
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.tokens = tokenize(sql)
+        self.match = self._match_parens()
+
+    def _match_parens(self) -> Dict[int, int]:
+        match, stack = {}, []
+        for i, tok in enumerate(self.tokens):
+            if tok.kind == "op" and tok.value == "(":
+                stack.append(i)
+            elif tok.kind == "op" and tok.value == ")" and stack:
+                match[stack.pop()] = i
+        for i in stack:
+            # Unbalanced: treat the rest of the statement as the group
+            match[i] = len(self.tokens)
+        return match
+
+    # Token helpers
+
+    def _is(self, i: int, value: str) -> bool:
+        return i < len(self.tokens) and self.tokens[i].kind == "op" and self.tokens[i].value == value
+
+    def _upper(self, i: int) -> str:
+        return self.tokens[i].upper if i < len(self.tokens) else ""
+
+    def _is_name(self, i: int, end: int) -> bool:
+        """Identifier that can be a table, column or alias name"""
+        if i >= end:
+            return False
+        tok = self.tokens[i]
+        return tok.kind == "ident" and (tok.quoted or tok.upper not in KEYWORDS)
+
+    def _starts_query(self, i: int) -> bool:
+        return self._upper(i) in ("SELECT", "WITH") or (self._is(i, "(") and self._starts_query(i + 1))
+
+    def _next_top(self, i: int, end: int, words: frozenset) -> int:
+        """Index of the first token at this nesting level whose keyword is in words"""
+        while i < end:
+            if self._is(i, "("):
+                i = self.match[i] + 1
+                continue
+            if self._upper(i) in words or self._is(i, ";"):
+                return i
+            i += 1
+        return end
+
+    def _split_commas(self, start: int, end: int) -> List[Tuple[int, int]]:
+        parts, i, part_start = [], start, start
+        while i < end:
+            if self._is(i, "("):
+                i = self.match[i] + 1
+                continue
+            if self._is(i, ","):
+                parts.append((part_start, i))
+                part_start = i + 1
+            i += 1
+        parts.append((part_start, end))
+        return [(a, b) for a, b in parts if a < b]
+
+    def _text(self, start: int, end: int) -> str:
+        return self.sql[self.tokens[start].start:self.tokens[end - 1].end]
+
+    # Grammar
+
+    def parse(self) -> ParsedQuery:
+        root = ParsedQuery(self.sql)
+        i = 0
+        while i < len(self.tokens) and not self._starts_query(i):
+            i += 1
+        if i < len(self.tokens):
+            end = self._next_top(i, len(self.tokens), frozenset())
+            query = self.parse_query(i, end, {}, 0)
+            root.ctes, root.selects, root.subqueries = query.ctes, query.selects, query.subqueries
+        return root
+
+    def parse_query(self, start: int, end: int, scope: Dict[str, Query], depth: int) -> Query:
+        query = Query()
+        if depth >= _MAX_DEPTH:
+            return query
+        i = start
+        if self._upper(i) == "WITH":
+            i += 1
+            if self._upper(i) == "RECURSIVE":
+                i += 1
+            while i < end and self._is_name(i, end):
+                name = self.tokens[i].value
+                i += 1
+                if self._is(i, "("):
+                    i = self.match[i] + 1
+                if self._upper(i) == "AS":
+                    i += 1
+                if not self._is(i, "("):
+                    break
+                close = self.match[i]
+                query.ctes[name.lower()] = self.parse_query(i + 1, close, {**scope, **query.ctes}, depth + 1)
+                i = close + 1
+                if not self._is(i, ","):
+                    break
+                i += 1
+        scope = {**scope, **query.ctes}
+
+        while i < end:
+            if self._is(i, "("):
+                close = self.match[i]
+                inner = self.parse_query(i + 1, close, scope, depth + 1)
+                query.selects.extend(inner.selects)
+                query.subqueries.extend(inner.subqueries)
+                query.ctes.update(inner.ctes)
+                i = close + 1
+            elif self._upper(i) == "SELECT":
+                select, i = self.parse_select(i, end, scope, depth)
+                query.selects.append(select)
+            else:
+                break
+            if self._upper(i) in _SET_OPERATORS:
+                i += 1
+                if self._upper(i) in ("ALL", "DISTINCT"):
+                    i += 1
+                continue
+            # Trailing ORDER BY / LIMIT of a parenthesized set operation
+            self._scan_expression(i, end, scope, depth, [], query.subqueries)
+            break
+        return query
+
+    def parse_select(self, start: int, end: int, scope: Dict[str, Query], depth: int) -> Tuple[Select, int]:
+        select = Select()
+        i = start + 1
+        while self._upper(i) in _SELECT_MODIFIERS:
+            i += 1
+
+        projection_end = self._next_top(i, end, _PROJECTION_END)
+        for a, b in self._split_commas(i, projection_end):
+            select.items.append(self._parse_item(a, b, scope, depth, select.subqueries))
+        i = projection_end
+
+        if self._upper(i) == "INTO":
+            i = self._next_top(i + 1, end, _FROM_END | {"FROM"})
+        if self._upper(i) == "FROM":
+            from_end = self._next_top(i + 1, end, _FROM_END)
+            self._parse_from(i + 1, from_end, scope, depth, select)
+            i = from_end
+
+        rest_end = self._next_top(i, end, _SET_OPERATORS)
+        self._scan_expression(i, rest_end, scope, depth, select.filter_columns, select.subqueries)
+        return select, rest_end
+
+    def _parse_item(self, start: int, end: int, scope, depth, subqueries) -> SelectItem:
+        alias = alias_text = None
+        expr_end = end
+        if end - start >= 2 and self._upper(end - 2) == "AS":
+            alias_tok = self.tokens[end - 1]
+            alias, alias_text = alias_tok.value, self.sql[alias_tok.start:alias_tok.end]
+            expr_end = end - 2
+        elif end - start >= 2 and self._is_alias_position(end - 1, start):
+            alias_tok = self.tokens[end - 1]
+            alias, alias_text = alias_tok.value, self.sql[alias_tok.start:alias_tok.end]
+            expr_end = end - 1
+
+        is_star = star_qualifier = None
+        if expr_end - start == 1 and self._is(start, "*"):
+            is_star = True
+        elif expr_end - start == 3 and self._is(start + 1, ".") and self._is(start + 2, "*"):
+            is_star, star_qualifier = True, self.tokens[start].value
+
+        columns: List[ColumnRef] = []
+        if not is_star:
+            self._scan_expression(start, expr_end, scope, depth, columns, subqueries)
+        return SelectItem(
+            text=self._text(start, end),
+            start=self.tokens[start].start,
+            end=self.tokens[end - 1].end,
+            alias=alias,
+            alias_text=alias_text,
+            columns=columns,
+            star_qualifier=star_qualifier,
+            is_star=bool(is_star),
+            is_column=len(columns) == 1 and expr_end - start in (1, 3) and self.tokens[start].kind == "ident",
+            expr_end=self.tokens[expr_end - 1].end if expr_end > start else self.tokens[end - 1].end
+        )
+
+    def _is_alias_position(self, i: int, start: int) -> bool:
+        """Implicit alias: `expr alias` where the last token follows a complete expression"""
+        tok = self.tokens[i]
+        if tok.kind == "string":
+            name_like = True
+        else:
+            name_like = self._is_name(i, i + 1)
+        if not name_like or i - 1 < start:
+            return False
+        prev = self.tokens[i - 1]
+        if prev.kind in ("string", "number"):
+            return True
+        if prev.kind == "op":
+            return prev.value == ")"
+        return prev.quoted or prev.upper == "END" or prev.upper not in KEYWORDS
+
+    def _parse_from(self, start: int, end: int, scope, depth, select: Select):
+        i = start
+        while i < end:
+            upper = self._upper(i)
+            if self._is(i, ",") or upper in _JOIN_WORDS:
+                i += 1
+            elif upper == "ON":
+                on_end = i + 1
+                while on_end < end and not (self._is(on_end, ",") or
+                                            (self._upper(on_end) in _JOIN_WORDS and not self._is(on_end + 1, "("))):
+                    on_end = self.match[on_end] + 1 if self._is(on_end, "(") else on_end + 1
+                on_end = min(on_end, end)
+                self._scan_expression(i + 1, on_end, scope, depth, select.filter_columns, select.subqueries)
+                i = on_end
+            elif upper == "USING":
+                i += 1
+                if self._is(i, "("):
+                    i = self.match[i] + 1
+            elif upper in ("USE", "FORCE", "IGNORE"):
+                while i < end and not self._is(i, "("):
+                    i += 1
+                if i < end:
+                    i = self.match[i] + 1
+            elif self._is(i, "("):
+                close = min(self.match[i], end)
+                if self._starts_query(i + 1):
+                    derived = self.parse_query(i + 1, close, scope, depth + 1)
+                    i, alias = self._parse_alias(close + 1, end)
+                    select.sources.append(TableRef(None, alias=alias, query=derived))
+                else:
+                    self._parse_from(i + 1, close, scope, depth, select)
+                    i = close + 1
+            elif self._is_name(i, end):
+                parts = [self.tokens[i].value]
+                i += 1
+                while self._is(i, ".") and self._is_name(i + 1, end):
+                    parts.append(self.tokens[i + 1].value)
+                    i += 2
+                i, alias = self._parse_alias(i, end)
+                name = parts[-1]
+                schema = parts[-2] if len(parts) > 1 else None
+                cte = scope.get(name.lower()) if schema is None else None
+                select.sources.append(TableRef(name, alias=alias, schema=schema, query=cte))
+            else:
+                i += 1
+
+    def _parse_alias(self, i: int, end: int) -> Tuple[int, Optional[str]]:
+        if self._upper(i) == "AS" and i + 1 < end:
+            return i + 2, self.tokens[i + 1].value
+        if self._is_name(i, end):
+            return i + 1, self.tokens[i].value
+        return i, None
+
+    def _scan_expression(self, start: int, end: int, scope, depth, columns: List[ColumnRef],
+                         subqueries: List[Query]):
+        """Collect column references and subqueries in an expression"""
+        i = start
+        interval = False
+        while i < end:
+            tok = self.tokens[i]
+            if tok.kind == "op":
+                if tok.value == "(" and self._starts_query(i + 1):
+                    close = min(self.match[i], end)
+                    subqueries.append(self.parse_query(i + 1, close, scope, depth + 1))
+                    i = close + 1
+                    continue
+                i += 1
+                continue
+            if tok.kind != "ident":
+                i += 1
+                continue
+            upper = tok.upper
+            if self._is(i + 1, "(") and not tok.quoted:
+                # Function call; arguments are scanned next
+                i += 1
+                continue
+            if upper == "AS":
+                # CAST(x AS type) / CONVERT(x USING charset)
+                i += 2
+                continue
+            if upper == "INTERVAL":
+                interval = True
+                i += 1
+                continue
+            if interval and upper in INTERVAL_UNITS:
+                interval = False
+                i += 1
+                continue
+            if not tok.quoted and upper in KEYWORDS:
+                i += 1
+                continue
+            if tok.value.startswith("@"):
+                i += 1
+                continue
+            parts = [tok.value]
+            while self._is(i + 1, ".") and i + 2 < end and (
+                    self.tokens[i + 2].kind == "ident" or self._is(i + 2, "*")):
+                parts.append(self.tokens[i + 2].value)
+                i += 2
+            if parts[-1] != "*":
+                columns.append(ColumnRef(parts[-2] if len(parts) > 1 else None, parts[-1]))
+            i += 1
+
+
+def quote_alias(name: str) -> str:
+    """Backtick-quote a result column name for use as an alias"""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split SQL into tokens, dropping whitespace and comments"""
+    tokens = []
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        text = match.group()
+        if kind in ("ws", "comment"):
+            continue
+        if kind == "backtick":
+            tokens.append(Token("ident", text[1:-1].replace("``", "`") if text.endswith("`") else text[1:],
+                                match.start(), match.end(), quoted=True))
+        else:
+            tokens.append(Token(kind, text, match.start(), match.end()))
+    return tokens
+
+
+_cache: "OrderedDict[str, ParsedQuery]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_size = int(os.getenv("SQL_PARSE_CACHE_SIZE", "512"))
+
+
+def parse_sql(sql: str) -> ParsedQuery:
+    """
+    Parse a SQL statement, reusing the cached tree for SQL seen before.
+
+    Args:
+        sql: SQL text
+
+    Returns:
+        ParsedQuery (shared; do not modify)
+    """
+    key = hashlib.sha1(sql.encode("utf-8", "surrogatepass")).hexdigest()
+    with _cache_lock:
+        parsed = _cache.get(key)
+        if parsed is not None and parsed.sql == sql:
+            _cache.move_to_end(key)
+            return parsed
+
+    parsed = _Parser(sql).parse()
+
+    with _cache_lock:
+        _cache[key] = parsed
+        while len(_cache) > _cache_size:
+            _cache.popitem(last=False)
+    return parsed
+
+
+def clear_parse_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,174 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.modules.sql_parser import KEYWORDS, parse_sql, tokenize as tokenize_sql
+
+_SEPARATORS = re.compile(r"[\W_]+")
+_LETTER = re.compile(r"[^\W\d_]")
+# Column types whose profiled values are dates or times, not labels
+_TEMPORAL_TYPES = ("date", "time", "year")
+MAX_VALUE_LENGTH = 64
+
+
+def normalize_literal(value: Any) -> str:
+    """Case-folded value with punctuation, underscores and runs of spaces collapsed to one space"""
+    return _SEPARATORS.sub(" ", str(value).casefold()).strip()
+
+
+class CategoricalValueIndex:
+    """
+    Inverted index from the literal values of categorical columns to the
+    `table.column` nodes that hold them.
+
+    Values come from the profiled `value_distribution` (with their row counts)
+    and `sample_values` of attribute nodes flagged `is_categorical`. Only
+    textual labels are indexed: numbers, dates and values of sensitive
+    columns are skipped. Lookups are exact on the normalized literal, so
+    "delivered", "DELIVERED" and "Delivered" all resolve to the stored
+    spelling.
+
+    Build it through SemanticGraph.value_index(), which caches the index and
+    rebuilds it when the graph changes.
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph: SemanticGraph to index
+        """
+        # normalized literal -> [(node_id, stored value, row count)], most frequent first
+        self.values: Dict[str, List[Tuple[str, str, int]]] = {}
+        self.max_words = 0
+        for node_id, node_data in graph.node_properties.items():
+            if node_data.get("type") != "attribute":
+                continue
+            properties = node_data.get("properties") or {}
+            if not properties.get("is_categorical") or properties.get("is_sensitive"):
+                continue
+            if str(properties.get("Type", "")).lower().startswith(_TEMPORAL_TYPES):
+                continue
+            counts = dict(properties.get("value_distribution") or {})
+            for value in properties.get("sample_values") or []:
+                counts.setdefault(value, 0)
+            for value, count in counts.items():
+                self._add(node_id, value, count)
+        for holders in self.values.values():
+            holders.sort(key=lambda holder: -holder[2])
+
+    def _add(self, node_id: str, value: Any, count: Any):
+        if not isinstance(value, str) or len(value) > MAX_VALUE_LENGTH or not _LETTER.search(value):
+            return
+        key = normalize_literal(value)
+        holders = self.values.setdefault(key, [])
+        if all(holder[0] != node_id for holder in holders):
+            holders.append((node_id, value, count if isinstance(count, int) else 0))
+            self.max_words = max(self.max_words, len(key.split()))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def lookup(self, literal: Any) -> List[Dict[str, Any]]:
+        """Columns holding the literal, most frequent first: [{"column", "value", "count"}]"""
+        return [
+            {"column": node_id, "value": value, "count": count}
+            for node_id, value, count in self.values.get(normalize_literal(literal), [])
+        ]
+
+    def find_in_text(self, text: str, tables: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Known values mentioned in free text (longest match first, no overlaps).
+
+        Args:
+            text: User query or any other text
+            tables: Only report columns of these tables
+
+        Returns:
+            [{"literal": normalized words, "columns": [{"column", "value", "count"}]}]
+        """
+        words = normalize_literal(text).split()
+        taken = [False] * len(words)
+        found = []
+        for n in range(min(self.max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                if any(taken[i:i + n]):
+                    continue
+                columns = self.lookup(" ".join(words[i:i + n]))
+                if tables is not None:
+                    columns = [c for c in columns if c["column"].split(".")[0] in tables]
+                if columns:
+                    found.append((i, {"literal": " ".join(words[i:i + n]), "columns": columns}))
+                    taken[i:i + n] = [True] * n
+        return [match for _, match in sorted(found, key=lambda item: item[0])]
+
+    def describe(self, matches: List[Dict[str, Any]]) -> str:
+        """Prompt lines for find_in_text matches, e.g. - "cod": orders.payment_method = 'COD'"""
+        lines = []
+        for match in matches:
+            options = " or ".join(
+                f"{c['column']} = '{c['value']}'" for c in match["columns"]
+            )
+            lines.append(f"- \"{match['literal']}\": {options}")
+        return "\n".join(lines)
+
+    def canonicalize_sql(self, sql: str) -> str:
+        """
+        Rewrite string literals compared with `=` or `IN` against a categorical
+        column to the stored spelling of that column's value ('in_transit' ->
+        'In Transit'), so filters match the data on case-sensitive collations.
+        LIKE patterns, other comparisons and literals the column does not hold
+        are left as written.
+        """
+        tokens = tokenize_sql(sql)
+        parsed = None
+        replacements = []
+        for i, token in enumerate(tokens):
+            if token.kind != "string" or not token.value.startswith("'") or len(token.value) < 2:
+                continue
+            holders = self.values.get(normalize_literal(_unquote(token.value[1:-1])))
+            if not holders:
+                continue
+            ref = _compared_column(tokens, i)
+            if ref is None:
+                continue
+            if parsed is None:
+                parsed = parse_sql(sql)
+            qualifier, column = ref
+            if qualifier:
+                table = parsed.table_aliases().get(qualifier.lower())
+                tables = [table] if table else []
+            else:
+                tables = parsed.tables()
+            nodes = {f"{table}.{column}".lower() for table in tables}
+            spellings = {value for node_id, value, _ in holders if node_id.lower() in nodes}
+            if len(spellings) == 1:
+                replacements.append((token.start, token.end, "'" + spellings.pop().replace("'", "''") + "'"))
+
+        for start, end, literal in reversed(replacements):
+            sql = sql[:start] + literal + sql[end:]
+        return sql
+
+
+def _unquote(content: str) -> str:
+    return content.replace("''", "'").replace("\\'", "'")
+
+
+def _column_before(tokens, j: int) -> Optional[Tuple[Optional[str], str]]:
+    """(qualifier, column) of a column reference ending at token j"""
+    if j < 0 or tokens[j].kind != "ident" or tokens[j].upper in KEYWORDS:
+        return None
+    if j >= 2 and tokens[j - 1].value == "." and tokens[j - 2].kind == "ident":
+        return tokens[j - 2].value, tokens[j].value
+    return None, tokens[j].value
+
+
+def _compared_column(tokens, i: int) -> Optional[Tuple[Optional[str], str]]:
+    """Column the string literal at token i is compared with by `col = '...'` or `col IN (...)`"""
+    if i >= 1 and tokens[i - 1].value == "=":
+        return _column_before(tokens, i - 2)
+    # Walk back over the other items of an IN list to its opening parenthesis
+    j = i - 1
+    while j >= 1 and tokens[j].value == "," and tokens[j - 1].kind == "string":
+        j -= 2
+    if j >= 1 and tokens[j].value == "(" and tokens[j - 1].upper == "IN":
+        return _column_before(tokens, j - 2)
+    return None
@@ -0,0 +1,169 @@
+"""
+Async Inference Layer
+
+Async variants of the inference service calls so callers can overlap LLM requests:
+1. `aget_structured_output` / `achat_completion` on every inference service
+   (via AsyncInferenceMixin), running the provider call off the event loop
+2. A process-wide concurrency limiter (one thread semaphore shared by every
+   event loop and thread) that caps in-flight provider calls, so a fan-out
+   cannot exhaust rate limits or the HTTP connection pool
+3. `gather_llm_calls` for gather-style fan-out with a per-call timeout; results
+   keep the input order and a failed or timed-out call does not cancel the others
+
+The providers' HTTP clients are synchronous (pooled `requests.Session`), so each
+call runs in a worker thread, which holds the slot while the request is sent.
+Cancelling or timing out the awaiting task returns immediately: a call still
+waiting for a slot is dropped, while a call already sent keeps its slot until
+the worker thread finishes, bounded by the HTTP read timeout. Limited calls
+must not fan out through the same limiter again (nested run_concurrently),
+since the outer calls would hold slots the inner ones wait for.
+
+Configuration (environment variables):
+- LLM_MAX_CONCURRENCY: Maximum concurrent provider calls (default 8)
+- LLM_CALL_TIMEOUT: Default per-call timeout in seconds, 0 disables (default 120)
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def default_call_timeout() -> Optional[float]:
+    timeout = float(os.getenv("LLM_CALL_TIMEOUT", "120"))
+    return timeout or None
+
+
+class ConcurrencyLimiter:
+    """
+    Caps concurrent LLM calls. The slots are a threading.BoundedSemaphore taken
+    in the worker thread, so the cap holds across event loops (run_concurrently
+    starts a new one per call) and across threads.
+    """
+
+    # How often a worker waiting for a slot checks whether its caller gave up
+    _POLL_SECONDS = 0.05
+
+    def __init__(self, limit: Optional[int] = None):
+        """
+        Args:
+            limit: Maximum concurrent calls in the process (defaults to LLM_MAX_CONCURRENCY)
+        """
+        self.limit = limit or int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self._slots = threading.BoundedSemaphore(self.limit)
+
+    def _call(self, abandoned: threading.Event, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        """Worker thread: wait for a slot, unless the caller gave up meanwhile, then call"""
+        while not self._slots.acquire(timeout=self._POLL_SECONDS):
+            if abandoned.is_set():
+                return None
+        try:
+            if abandoned.is_set():
+                return None
+            return func(*args, **kwargs)
+        finally:
+            self._slots.release()
+
+    async def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a blocking call in a worker thread once a slot is free.
+
+        The timeout covers waiting for a slot plus the call itself; on expiry
+        asyncio.TimeoutError is raised. A call that has not started yet is
+        dropped; one already running keeps its slot until it returns.
+        """
+        abandoned = threading.Event()
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(self._call, abandoned, func, args, kwargs), timeout)
+        except BaseException:
+            abandoned.set()
+            raise
+
+
+_default_limiter: Optional[ConcurrencyLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_limiter() -> ConcurrencyLimiter:
+    """Process-wide limiter shared by all inference services"""
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_lock:
+            if _default_limiter is None:
+                _default_limiter = ConcurrencyLimiter()
+    return _default_limiter
+
+
+class AsyncInferenceMixin:
+    """
+    Adds async variants of the protocol calls to an inference service.
+    Set `limiter` on an instance to use a dedicated limit instead of the shared one.
+    """
+
+    limiter: Optional[ConcurrencyLimiter] = None
+
+    def _limiter(self) -> ConcurrencyLimiter:
+        return self.limiter or get_limiter()
+
+    async def aget_structured_output(
+        self,
+        content: str,
+        json_schema: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Async get_structured_output (timeout defaults to LLM_CALL_TIMEOUT)"""
+        return await self._limiter().run(
+            self.get_structured_output, content, json_schema,
+            timeout=timeout if timeout is not None else default_call_timeout()
+        )
+
+    async def achat_completion(
+        self,
+        message: str,
+        context: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Async chat_completion (timeout defaults to LLM_CALL_TIMEOUT)"""
+        return await self._limiter().run(
+            self.chat_completion, message, context,
+            timeout=timeout if timeout is not None else default_call_timeout()
+        )
+
+
+async def gather_llm_calls(
+    calls: List[Awaitable[Any]],
+    timeout: Optional[float] = None,
+    return_exceptions: bool = True
+) -> List[Any]:
+    """
+    Await several LLM calls concurrently, in input order.
+
+    Args:
+        calls: Awaitables, e.g. service.aget_structured_output(...)
+        timeout: Extra per-call timeout in seconds (None relies on the calls' own)
+        return_exceptions: Put exceptions (including asyncio.TimeoutError) in the
+            result list instead of raising the first one
+
+    Cancelling the gather cancels every pending call.
+    """
+    if timeout is not None:
+        calls = [asyncio.wait_for(call, timeout) for call in calls]
+    return await asyncio.gather(*calls, return_exceptions=return_exceptions)
+
+
+def run_concurrently(
+    funcs: List[Callable[[], Any]],
+    timeout: Optional[float] = None,
+    limiter: Optional[ConcurrencyLimiter] = None
+) -> List[Any]:
+    """
+    Synchronous helper: run blocking LLM-bound callables concurrently under the
+    shared limiter (or `limiter`) and return their results (or exceptions) in order.
+    Must not be called from inside a running event loop or a limited call.
+    """
+    limiter = limiter or get_limiter()
+
+    async def main():
+        return await gather_llm_calls([limiter.run(func) for func in funcs], timeout=timeout)
+
+    return asyncio.run(main())
@@ -0,0 +1,223 @@
+"""
+Audit Log Service
+
+Background, batched JSONL writer for the query audit trail:
+1. Callers enqueue records without blocking (bounded queue, drop on overflow)
+2. A daemon thread drains the queue and writes batches, flushing once per batch
+3. The log file is rotated by size and by age, keeping a fixed number of backups
+
+The writer never raises into the caller. If the disk is slow the queue fills up
+and new records are dropped and counted instead of stalling query execution.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class AuditLogWriter:
+    """
+    Asynchronous JSONL audit log writer with batched flushes and rotation.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        rotate_interval: Optional[float] = None,
+        backup_count: Optional[int] = None
+    ):
+        """
+        Initialize the writer. The file and the background thread are created
+        lazily on the first record, so importing this module has no side effects.
+
+        Args:
+            path: Audit log file path
+            max_queue_size: Maximum pending records before new ones are dropped
+            batch_size: Maximum records written per flush
+            flush_interval: Maximum seconds a record waits before being flushed
+            max_bytes: Rotate when the file grows beyond this size (0 disables)
+            rotate_interval: Rotate when the file is older than this many seconds (0 disables)
+            backup_count: Number of rotated files to keep
+        """
+        self.path = path or os.getenv("MYSQL_AUDIT_LOG", "logs/mysql_audit.log")
+        self.batch_size = batch_size or int(os.getenv("AUDIT_LOG_BATCH_SIZE", "100"))
+        self.flush_interval = flush_interval or float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "1.0"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("AUDIT_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.rotate_interval = rotate_interval if rotate_interval is not None else float(os.getenv("AUDIT_LOG_ROTATE_SECONDS", "86400"))
+        self.backup_count = backup_count if backup_count is not None else int(os.getenv("AUDIT_LOG_BACKUP_COUNT", "5"))
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(
+            maxsize=max_queue_size or int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000"))
+        )
+        self._file = None
+        self._opened_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.dropped = 0
+        self.write_errors = 0
+
+    def log(
+        self,
+        status: str,
+        sql: str,
+        message: str = "",
+        latency_ms: Optional[float] = None,
+        row_count: Optional[int] = None,
+        masked_columns: Optional[int] = None
+    ):
+        """
+        Enqueue an audit record. Never blocks and never raises.
+
+        Args:
+            status: SUCCESS, ERROR or BLOCKED
+            sql: Executed SQL (hashed, with a short preview)
+            message: Free-form message (error text, policy violation)
+            latency_ms: Query latency in milliseconds
+            row_count: Number of rows returned
+            masked_columns: Number of result columns masked by governance
+        """
+        try:
+            record = {
+                "timestamp": datetime.now().isoformat(),
+                "status": status,
+                "sql_hash": hashlib.sha256(sql.encode("utf-8")).hexdigest()[:16],
+                "sql": sql[:200],
+                "latency_ms": round(latency_ms, 2) if latency_ms is not None else None,
+                "row_count": row_count,
+                "masked_columns": masked_columns,
+                "message": message
+            }
+            self._ensure_started()
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            pass  # Don't fail on logging errors
+
+    def flush(self, timeout: float = 5.0):
+        """Block until all queued records are written or the timeout expires"""
+        deadline = time.monotonic() + timeout
+        while self._thread and self._thread.is_alive() and self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        with self._lock:
+            if self._file:
+                self._file.flush()
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending records and stop the background thread"""
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+        with self._lock:
+            self._write_batch(self._drain())
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _ensure_started(self):
+        """Start the background writer on first use"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        """Background loop: collect a batch, write it, repeat"""
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            with self._lock:
+                self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _drain(self):
+        """Take everything currently queued"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+                self._queue.task_done()
+            except queue.Empty:
+                return batch
+
+    def _write_batch(self, batch):
+        """Write a batch of records and flush once. Caller holds the lock."""
+        if not batch:
+            return
+        try:
+            self._rotate_if_needed()
+            if self._file is None:
+                self._open()
+            self._file.write("".join(json.dumps(record, default=str) + "\n" for record in batch))
+            self._file.flush()
+        except Exception as e:
+            self.write_errors += 1
+            if self.write_errors == 1:
+                print(f"⚠️  Audit log write failed ({e}), records are being dropped")
+
+    def _open(self):
+        """Open the log file in append mode"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _rotate_if_needed(self):
+        """Rotate the log file by size or age"""
+        if self._file is None:
+            # Age is tracked from when this process opened the file
+            if not os.path.exists(self.path):
+                return
+            size = os.path.getsize(self.path)
+            too_old = False
+        else:
+            size = self._file.tell()
+            too_old = self.rotate_interval and size > 0 and time.time() - self._opened_at >= self.rotate_interval
+
+        too_big = self.max_bytes and size >= self.max_bytes
+        if not (too_big or too_old):
+            return
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
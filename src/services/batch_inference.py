@@ -0,0 +1,292 @@
+"""
+Batched Structured Output
+
+`get_structured_outputs(prompts, json_schema)` on every inference service (via
+BatchInferenceMixin) answers many independent prompts that share one schema.
+Results keep the input order; a failed item holds its exception instead of a
+dict, so one bad answer does not fail the whole batch.
+
+Strategies (LLM_BATCH_MODE, or `mode=` per call):
+1. parallel (default): one request per prompt, run concurrently under the
+   shared limiter from async_inference
+2. pack: up to LLM_BATCH_PACK_SIZE prompts per request; the model answers
+   {"results": [{"index": i, "output": {...}}]} and items it skipped or
+   answered without the schema's required keys are retried one by one
+3. provider: the provider's batch endpoint (OpenAI Batch API: upload, poll,
+   download). Cheaper per token but minutes to hours of latency, so it is
+   meant for offline profiling and evaluation. Services without a batch
+   endpoint fall back to parallel.
+
+The parallel and pack strategies run their own event loop and must not be
+called from inside a running one (use aget_structured_output there).
+
+Configuration (environment variables):
+- LLM_BATCH_MODE: parallel, pack or provider (default parallel)
+- LLM_BATCH_PACK_SIZE: Prompts per packed request (default 8)
+- LLM_BATCH_POLL_SECONDS: Provider batch poll interval in seconds (default 10)
+- LLM_BATCH_MAX_WAIT_SECONDS: Cancel a provider batch after this many seconds (default 86400)
+"""
+
+import io
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .async_inference import run_concurrently
+from .llm_errors import LLMProviderError, LLMResponseError, LLMTimeoutError
+
+BATCH_MODES = ("parallel", "pack", "provider")
+
+BatchResult = Union[Dict[str, Any], Exception]
+StructuredCall = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+
+def batch_mode(mode: Optional[str] = None) -> str:
+    mode = (mode or os.getenv("LLM_BATCH_MODE", "parallel")).lower()
+    if mode not in BATCH_MODES:
+        raise ValueError(f"LLM batch mode must be one of {', '.join(BATCH_MODES)}, got '{mode}'")
+    return mode
+
+
+def missing_required(output: Any, json_schema: Dict[str, Any]) -> Optional[str]:
+    """Why an item does not fit the schema's top level, or None if it does"""
+    if not isinstance(output, dict) or not output:
+        return "expected a non-empty JSON object"
+    missing = [key for key in json_schema.get("required", []) if key not in output]
+    if missing:
+        return f"missing required keys {missing}"
+    return None
+
+
+def _checked(output: Any, json_schema: Dict[str, Any], source: str) -> BatchResult:
+    problem = missing_required(output, json_schema)
+    return LLMResponseError(f"Invalid structured output: {problem}", source) if problem else output
+
+
+def parallel_structured_outputs(
+    call: StructuredCall,
+    prompts: List[str],
+    json_schema: Dict[str, Any],
+    source: str = ""
+) -> List[BatchResult]:
+    """One call per prompt, run concurrently; exceptions are returned in place"""
+    return parallel_structured_output_batches([(call, prompts, json_schema, source)])[0]
+
+
+def parallel_structured_output_batches(
+    batches: List[Tuple[StructuredCall, List[str], Dict[str, Any], str]]
+) -> List[List[BatchResult]]:
+    """
+    parallel_structured_outputs for several (call, prompts, json_schema, source)
+    batches, e.g. on different services, as one fan-out under the shared limiter.
+    Returns one result list per batch.
+    """
+    items = [(call, prompt, json_schema, source) for call, prompts, json_schema, source in batches for prompt in prompts]
+    results = iter(run_concurrently([
+        lambda call=call, prompt=prompt, json_schema=json_schema: call(prompt, json_schema)
+        for call, prompt, json_schema, _ in items
+    ]))
+    return [
+        [
+            result if isinstance(result, Exception) else _checked(result, json_schema, source)
+            for result in (next(results) for _ in prompts)
+        ]
+        for _, prompts, json_schema, source in batches
+    ]
+
+
+def pack_prompt(prompts: List[str], json_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Content and schema for answering several prompts in one request.
+    Returns {"content": str, "schema": dict}.
+    """
+    items = "\n\n".join(f"### Request {i}\n{prompt}" for i, prompt in enumerate(prompts))
+    content = f"""
+Answer each of the {len(prompts)} independent requests below separately.
+Each answer must be a JSON object matching this schema:
+{json.dumps(json_schema, indent=2)}
+
+Return {{"results": [{{"index": <request number>, "output": <answer>}}, ...]}} with exactly one entry per request.
+
+{items}
+"""
+    schema = {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"index": {"type": "integer"}, "output": json_schema},
+                    "required": ["index", "output"]
+                }
+            }
+        },
+        "required": ["results"]
+    }
+    return {"content": content, "schema": schema}
+
+
+def unpack_results(
+    response: Any,
+    count: int,
+    json_schema: Dict[str, Any],
+    source: str = ""
+) -> List[BatchResult]:
+    """Map a packed response back to `count` items; unanswered items become LLMResponseError"""
+    results: List[BatchResult] = [
+        LLMResponseError("No answer for this item in the packed response", source) for _ in range(count)
+    ]
+    entries = response.get("results") if isinstance(response, dict) else None
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("index")
+        if isinstance(index, int) and 0 <= index < count and isinstance(results[index], Exception):
+            results[index] = _checked(entry.get("output"), json_schema, source)
+    return results
+
+
+def packed_structured_outputs(
+    call: StructuredCall,
+    prompts: List[str],
+    json_schema: Dict[str, Any],
+    pack_size: Optional[int] = None,
+    source: str = ""
+) -> List[BatchResult]:
+    """
+    Send prompts in packs of `pack_size` (packs run concurrently); items a pack
+    did not answer properly are retried individually.
+    """
+    pack_size = pack_size or int(os.getenv("LLM_BATCH_PACK_SIZE", "8"))
+    packs = [list(range(start, min(start + pack_size, len(prompts)))) for start in range(0, len(prompts), pack_size)]
+    requests = [pack_prompt([prompts[i] for i in pack], json_schema) for pack in packs]
+    responses = run_concurrently([
+        lambda request=request: call(request["content"], request["schema"]) for request in requests
+    ])
+
+    results: List[BatchResult] = [None] * len(prompts)
+    for pack, response in zip(packs, responses):
+        unpacked = (
+            [response] * len(pack) if isinstance(response, Exception)
+            else unpack_results(response, len(pack), json_schema, source)
+        )
+        for i, result in zip(pack, unpacked):
+            results[i] = result
+
+    retry = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+    if retry:
+        print(f"📦 {len(retry)}/{len(prompts)} packed items unanswered; retrying individually")
+        for i, result in zip(retry, parallel_structured_outputs(call, [prompts[i] for i in retry], json_schema, source)):
+            results[i] = result
+    return results
+
+
+def run_openai_batch(
+    client,
+    requests: List[Dict[str, Any]],
+    poll_seconds: Optional[float] = None,
+    max_wait: Optional[float] = None,
+    sleep: Callable[[float], None] = time.sleep
+) -> Dict[str, Any]:
+    """
+    Run chat completion requests through the OpenAI Batch API.
+
+    Args:
+        client: openai.OpenAI client
+        requests: Batch input lines ({"custom_id", "method", "url", "body"})
+        poll_seconds: Status poll interval
+        max_wait: Cancel and raise LLMTimeoutError after this many seconds
+        sleep: Sleep function (injectable for tests)
+
+    Returns:
+        custom_id -> chat completion body (dict) or LLMError for failed lines
+    """
+    poll_seconds = poll_seconds if poll_seconds is not None else float(os.getenv("LLM_BATCH_POLL_SECONDS", "10"))
+    max_wait = max_wait if max_wait is not None else float(os.getenv("LLM_BATCH_MAX_WAIT_SECONDS", "86400"))
+
+    data = "\n".join(json.dumps(line) for line in requests).encode("utf-8")
+    input_file = client.files.create(file=("batch_input.jsonl", io.BytesIO(data)), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h"
+    )
+    print(f"📦 OpenAI batch {batch.id} submitted with {len(requests)} requests")
+
+    started = time.monotonic()
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        if time.monotonic() - started > max_wait:
+            client.batches.cancel(batch.id)
+            raise LLMTimeoutError(f"Batch {batch.id} not finished after {max_wait:.0f}s", "openai")
+        sleep(poll_seconds)
+        batch = client.batches.retrieve(batch.id)
+    print(f"📦 OpenAI batch {batch.id} {batch.status}")
+
+    results: Dict[str, Any] = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            if response.get("status_code") == 200:
+                results[entry["custom_id"]] = response["body"]
+            else:
+                error = entry.get("error") or (response.get("body") or {}).get("error") or {}
+                results[entry["custom_id"]] = LLMProviderError(
+                    error.get("message", "Batch request failed"), "openai", status_code=response.get("status_code")
+                )
+    for line in requests:
+        results.setdefault(line["custom_id"], LLMProviderError(f"Batch {batch.status} without a result", "openai"))
+    return results
+
+
+class BatchInferenceMixin:
+    """
+    Adds get_structured_outputs to an inference service. A service with a
+    provider batch endpoint implements `_provider_structured_outputs`.
+    """
+
+    def get_structured_outputs(
+        self,
+        prompts: List[str],
+        json_schema: Dict[str, Any],
+        mode: Optional[str] = None
+    ) -> List[BatchResult]:
+        """
+        Structured outputs for several prompts sharing one schema.
+
+        Returns:
+            One entry per prompt, in order: the parsed dict, or the exception
+            (LLMError or similar) that item failed with
+        """
+        if not prompts:
+            return []
+        mode = batch_mode(mode)
+        source = type(self).__name__
+        if mode == "provider":
+            provider_batch = getattr(self, "_provider_structured_outputs", None)
+            if provider_batch is not None:
+                return provider_batch(prompts, json_schema)
+            mode = "parallel"
+        if mode == "pack" and len(prompts) > 1:
+            return packed_structured_outputs(self.get_structured_output, prompts, json_schema, source=source)
+        return parallel_structured_outputs(self.get_structured_output, prompts, json_schema, source=source)
+
+
+def structured_outputs(
+    service,
+    prompts: List[str],
+    json_schema: Dict[str, Any],
+    mode: Optional[str] = None
+) -> List[BatchResult]:
+    """get_structured_outputs for any service; ones without it get parallel calls"""
+    if hasattr(service, "get_structured_outputs"):
+        return service.get_structured_outputs(prompts, json_schema, mode=mode)
+    return parallel_structured_outputs(service.get_structured_output, prompts, json_schema, type(service).__name__)
+
+
+def is_batch_error(result: BatchResult) -> bool:
+    return isinstance(result, Exception)
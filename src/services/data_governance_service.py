@@ -13,10 +13,12 @@ Usage:
 """
 
 import os
-import re
 import csv
 from typing import List, Dict, Any, Optional, Tuple
 
+from ..modules.keyword_matcher import KeywordMatcher
+from ..modules.sql_parser import ParsedQuery, parse_sql, quote_alias, tokenize
+
 
 class DataGovernanceService:
     """
@@ -37,6 +39,7 @@ class DataGovernanceService:
             "pin", "auth", "credential", "key", "passwd"
         ]
         
+        self.sensitive_keywords_csv = sensitive_keywords_csv
         self.sensitive_keywords = self._load_keywords(sensitive_keywords_csv)
         self.enabled = os.getenv("DATA_GOVERNANCE_ENABLED", "true").lower() == "true"
         self.strict_mode = os.getenv("DATA_GOVERNANCE_STRICT_MODE", "true").lower() == "true"
@@ -44,7 +47,22 @@ class DataGovernanceService:
         # Masking strategies by keyword pattern
         self.partial_mask_keywords = ["email", "phone", "mobile", "tel", "contact"]
         
-        # Compile regex patterns for efficient matching
+        # Bumped whenever keywords are (re)compiled so derived indexes can be invalidated
+        self.keywords_version = 0
+        
+        # Compile keyword matchers for efficient matching
+        self._compile_patterns()
+    
+    def reload_keywords(self, sensitive_keywords_csv: Optional[str] = None):
+        """
+        Reload sensitive keywords from CSV and invalidate cached column decisions.
+        
+        Args:
+            sensitive_keywords_csv: Path to CSV file (defaults to the one used at init)
+        """
+        if sensitive_keywords_csv:
+            self.sensitive_keywords_csv = sensitive_keywords_csv
+        self.sensitive_keywords = self._load_keywords(self.sensitive_keywords_csv)
         self._compile_patterns()
     
     def _load_keywords(self, csv_path: Optional[str]) -> List[str]:
@@ -68,13 +86,12 @@ class DataGovernanceService:
         return self.default_keywords
     
     def _compile_patterns(self):
-        """Compile regex patterns for sensitive column detection"""
-        # Create patterns without strict word boundaries to match compound words
+        """Compile keyword matchers for sensitive column detection"""
+        # Substring matching without word boundaries to match compound words
         # e.g., "password" matches "user_password", "password_hash", "api_token" matches "token"
-        self.patterns = [
-            re.compile(re.escape(keyword), re.IGNORECASE)
-            for keyword in self.sensitive_keywords
-        ]
+        self.sensitive_matcher = KeywordMatcher(self.sensitive_keywords)
+        self.partial_mask_matcher = KeywordMatcher(self.partial_mask_keywords)
+        self.keywords_version += 1
     
     def is_sensitive_column(self, column_name: str) -> bool:
         """
@@ -93,8 +110,7 @@ class DataGovernanceService:
         if self.is_partial_mask_column(column_name):
             return False  # Not "fully" sensitive
         
-        column_lower = column_name.lower()
-        return any(pattern.search(column_lower) for pattern in self.patterns)
+        return self.sensitive_matcher.matches(column_name)
     
     def is_partial_mask_column(self, column_name: str) -> bool:
         """
@@ -109,16 +125,22 @@ class DataGovernanceService:
         if not self.enabled:
             return False
         
-        column_lower = column_name.lower()
-        return any(keyword in column_lower for keyword in self.partial_mask_keywords)
+        return self.partial_mask_matcher.matches(column_name)
     
-    def validate_query(self, sql: str, schema_context: Optional[Dict] = None) -> Tuple[bool, Optional[str]]:
+    def validate_query(
+        self,
+        sql: str,
+        schema_context: Optional[Dict] = None,
+        sensitivity_index: Optional[Any] = None
+    ) -> Tuple[bool, Optional[str]]:
         """
         Validate if a SQL query accesses sensitive columns.
         
         Args:
             sql: SQL query to validate
             schema_context: Optional schema context with table.column mappings
+            sensitivity_index: Optional SensitivityIndex of the semantic graph; columns are
+                also resolved to their base table and checked against it
             
         Returns:
             Tuple of (is_valid, error_message)
@@ -128,15 +150,19 @@ class DataGovernanceService:
         if not self.enabled:
             return True, None
         
-        sql_upper = sql.upper()
-        
-        # Check for SELECT * (potentially exposes sensitive columns)
-        if self.strict_mode and re.search(r'SELECT\s+\*', sql_upper):
-            # Check if any table in the query might have sensitive columns
-            if schema_context:
-                tables = self._extract_tables_from_query(sql)
-                for table in tables:
-                    if table in schema_context:
+        parsed = parse_sql(sql)
+        
+        # Check for SELECT * / t.* (potentially exposes sensitive columns)
+        if self.strict_mode and schema_context:
+            for select in parsed.walk_selects():
+                for item in select.items:
+                    if not item.is_star:
+                        continue
+                    # Check if any table expanded by the star might have sensitive columns
+                    for source in select.star_tables(item):
+                        table = source.name
+                        if not source.is_base_table or table not in schema_context:
+                            continue
                         columns = schema_context[table].get('columns', [])
                         sensitive_cols = [col for col in columns if self.is_sensitive_column(col)]
                         if sensitive_cols:
@@ -145,16 +171,21 @@ class DataGovernanceService:
                                 f"{', '.join(sensitive_cols)}. Please specify columns explicitly."
                             )
         
-        # Extract column names from SELECT clause
-        selected_columns = self._extract_selected_columns(sql)
-        
-        # Check if any selected column is sensitive
+        # Check if any selected column is sensitive, at every query level
+        # (CTEs, derived tables and subqueries included)
         sensitive_found = []
-        for col in selected_columns:
-            # Handle qualified names (table.column)
-            col_name = col.split('.')[-1]
-            if self.is_sensitive_column(col_name):
-                sensitive_found.append(col)
+        for select in parsed.walk_selects():
+            for item in select.items:
+                for col in item.columns:
+                    if col.text in sensitive_found:
+                        continue
+                    if self.is_sensitive_column(col.name) or (
+                        sensitivity_index is not None and any(
+                            table and sensitivity_index.is_sensitive_column(table, column)
+                            for table, column in select.lineage(col)
+                        )
+                    ):
+                        sensitive_found.append(col.text)
         
         if sensitive_found:
             return False, (
@@ -178,48 +209,168 @@ class DataGovernanceService:
         if not self.enabled:
             return sql
         
-        # Extract SELECT clause
-        select_match = re.search(r'SELECT\s+(.*?)\s+FROM', sql, re.IGNORECASE | re.DOTALL)
-        if not select_match:
-            return sql
+        # Replace projections that read sensitive columns, at every query level
+        edits = []
+        for select in parse_sql(sql).walk_selects():
+            for item in select.items:
+                sensitive = [col for col in item.columns if self.is_sensitive_column(col.name)]
+                if sensitive:
+                    alias = item.alias_text or sensitive[-1].name
+                    edits.append((item.start, item.end, f"{mask_value} AS {alias}"))
         
-        select_clause = select_match.group(1)
-        columns = [col.strip() for col in select_clause.split(',')]
-        
-        # Replace sensitive columns with masked values
-        sanitized_columns = []
-        for col in columns:
-            col_clean = col.strip()
-            # Handle aliases (e.g., "column AS alias")
-            if ' AS ' in col_clean.upper():
-                parts = re.split(r'\s+AS\s+', col_clean, flags=re.IGNORECASE)
-                col_name = parts[0].strip()
-                alias = parts[1].strip()
-            else:
-                col_name = col_clean
-                alias = None
+        return self._apply_edits(sql, edits)
+    
+    def mask_sql(self, sql: str) -> Tuple[str, bool]:
+        """
+        Push result masking down into the query.
+        Rewrites each output column that mask_results would mask (by output name or by
+        the base column it is derived from) into a SQL masking expression, so sensitive
+        values never leave the database. The masking expression keeps the output alias,
+        and MySQL resolves ORDER BY names to aliases first, so ORDER BY references to a
+        masked column are rewritten to its original expression to keep the row order.
+        
+        Args:
+            sql: SQL query
             
-            # Check if sensitive
-            base_name = col_name.split('.')[-1].strip('`"[]')
-            if self.is_sensitive_column(base_name):
-                if alias:
-                    sanitized_columns.append(f"{mask_value} AS {alias}")
+        Returns:
+            Tuple of (rewritten_sql, complete). complete is False when some output columns
+            could not be resolved (e.g. SELECT *, non-SELECT statements); those results
+            still need mask_results.
+        """
+        if not self.enabled:
+            return sql, True
+        
+        parsed = parse_sql(sql)
+        if not parsed.selects:
+            return sql, False
+        
+        complete = True
+        edits = []
+        masked = {}
+        output_names = [item.output_name for item in parsed.selects[0].items]
+        for select in parsed.selects:
+            # Set operations take their column names from the first SELECT
+            for item, name in zip(select.items, output_names):
+                if item.is_star:
+                    complete = False
+                    continue
+                strategy = self._masking_strategy(name, [col for _, col in select.item_lineage(item)])
+                if strategy is None:
+                    continue
+                expr = sql[item.start:item.expr_end]
+                masked[name.lower()] = expr
+                alias = item.alias_text or quote_alias(name)
+                if strategy == "partial":
+                    edits.append((item.start, item.end, f"{self._partial_mask_sql(expr)} AS {alias}"))
                 else:
-                    sanitized_columns.append(f"{mask_value} AS {base_name}")
-            else:
-                sanitized_columns.append(col)
+                    edits.append((item.start, item.end, f"'***MASKED***' AS {alias}"))
+        
+        order_edits = self._order_by_edits(sql, [name.lower() for name in output_names], masked)
+        if order_edits and len(parsed.selects) > 1:
+            # A set operation can only be ordered by its output columns
+            return sql, False
+        return self._apply_edits(sql, edits + order_edits), complete
+    
+    @staticmethod
+    def _order_by_edits(sql: str, output_names: List[str], masked: Dict[str, str]) -> List[Tuple[int, int, str]]:
+        """
+        Edits replacing top-level ORDER BY items that name (or number) a masked
+        output column with the column's original expression
+        """
+        if not masked:
+            return []
+        tokens = tokenize(sql)
+        depth, start = 0, None
+        for i, token in enumerate(tokens):
+            if token.value == "(":
+                depth += 1
+            elif token.value == ")":
+                depth -= 1
+            elif depth == 0 and token.upper == "ORDER" and i + 1 < len(tokens) and tokens[i + 1].upper == "BY":
+                start = i + 2
+        if start is None:
+            return []
+        
+        edits = []
+        item, depth = [], 0
+        for token in tokens[start:] + [None]:
+            if token is not None:
+                if token.value == "(":
+                    depth += 1
+                elif token.value == ")":
+                    depth -= 1
+                if depth > 0 or not (token.value == "," or token.upper in ("LIMIT", "FOR", "LOCK") or token.value == ";"):
+                    item.append(token)
+                    continue
+            if item and item[-1].upper in ("ASC", "DESC"):
+                item = item[:-1]
+            if len(item) == 1:
+                ref = item[0]
+                name = None
+                if ref.kind == "ident":
+                    name = ref.value.lower()
+                elif ref.kind == "number" and ref.value.isdigit() and 0 < int(ref.value) <= len(output_names):
+                    name = output_names[int(ref.value) - 1]
+                if name in masked:
+                    edits.append((ref.start, ref.end, masked[name]))
+            if token is None or token.value != ",":
+                break
+            item = []
+        return edits
+    
+    def _masking_strategy(self, output_name: str, source_columns: List[str]) -> Optional[str]:
+        """'partial', 'full' or None for an output column and the base columns it reads"""
+        if self.is_partial_mask_column(output_name):
+            return "partial"
+        if self.is_sensitive_column(output_name):
+            return "full"
+        if any(self.is_sensitive_column(col) for col in source_columns):
+            return "full"
+        if any(self.is_partial_mask_column(col) for col in source_columns):
+            return "partial"
+        return None
+    
+    @staticmethod
+    def _apply_edits(sql: str, edits: List[Tuple[int, int, str]]) -> str:
+        """Splice (start, end, replacement) edits into SQL; edits nested in an earlier one are dropped"""
+        applied = []
+        for start, end, text in sorted(edits):
+            if applied and start < applied[-1][1]:
+                continue
+            applied.append((start, end, text))
+        for start, end, text in reversed(applied):
+            sql = sql[:start] + text + sql[end:]
+        return sql
+    
+    def masking_plan(self, columns: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Decide once per result schema how each column is masked.
         
-        # Reconstruct query
-        new_select = "SELECT " + ", ".join(sanitized_columns) + " FROM"
-        return re.sub(r'SELECT\s+.*?\s+FROM', new_select, sql, count=1, flags=re.IGNORECASE | re.DOTALL)
+        Args:
+            columns: Result column names
+            
+        Returns:
+            Tuple of (partial_mask_columns, full_mask_columns); all other columns pass through
+        """
+        partial, full = [], []
+        for column in columns:
+            # Partial masking has priority
+            if self.is_partial_mask_column(column):
+                partial.append(column)
+            elif self.is_sensitive_column(column):
+                full.append(column)
+        return partial, full
     
-    def mask_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def mask_results(self, results: List[Dict[str, Any]], in_place: bool = False) -> List[Dict[str, Any]]:
         """
         Mask sensitive columns in query results.
         Supports both full masking and partial masking strategies.
+        The masking plan is computed once per result schema, so only masked
+        columns are touched per row.
         
         Args:
             results: List of result dictionaries
+            in_place: Mutate the given rows instead of copying them
             
         Returns:
             Results with sensitive values masked
@@ -227,21 +378,50 @@ class DataGovernanceService:
         if not self.enabled or not results:
             return results
         
-        masked_results = []
+        keys = results[0].keys()
+        partial, full = self.masking_plan(list(keys))
+        if not partial and not full and all(row.keys() == keys for row in results):
+            return results if in_place else [dict(row) for row in results]
+        
+        masked_results = results if in_place else []
         for row in results:
-            masked_row = {}
-            for key, value in row.items():
-                # Check partial masking first (has priority)
-                if self.is_partial_mask_column(key):
-                    masked_row[key] = self._partial_mask_value(str(value))
-                elif self.is_sensitive_column(key):
-                    masked_row[key] = "***MASKED***"
-                else:
-                    masked_row[key] = value
-            masked_results.append(masked_row)
+            if row.keys() != keys:
+                # Rows of one query share a schema; re-plan for anything that differs
+                keys = row.keys()
+                partial, full = self.masking_plan(list(keys))
+            if not in_place:
+                row = dict(row)
+                masked_results.append(row)
+            for column in partial:
+                row[column] = self._partial_mask_value(str(row[column]))
+            for column in full:
+                row[column] = "***MASKED***"
         
         return masked_results
     
+    def mask_columnar(self, result: Any) -> Any:
+        """
+        Mask sensitive columns in a columnar result (see ColumnarResult).
+        Each column is checked once and masked as a whole.
+
+        Args:
+            result: Columnar result with `columns`, `column(name)` and `with_column(name, values)`
+
+        Returns:
+            Result with sensitive columns masked
+        """
+        if not self.enabled or result is None:
+            return result
+
+        partial, full = self.masking_plan(result.columns)
+        for column in partial:
+            values = [self._partial_mask_value(str(v)) for v in result.column(column)]
+            result = result.with_column(column, values)
+        for column in full:
+            result = result.with_column(column, ["***MASKED***"] * len(result.column(column)))
+
+        return result
+
     def _partial_mask_value(self, value: str) -> str:
         """
         Apply partial masking to a value (e.g., email, phone).
@@ -276,6 +456,27 @@ class DataGovernanceService:
         # Default: show first char + ***
         return f"{value[0]}***"
     
+    @staticmethod
+    def _partial_mask_sql(expr: str) -> str:
+        """
+        SQL (MySQL 8) equivalent of _partial_mask_value for a column expression.
+        NULL stays NULL instead of being masked as the string 'None'.
+        """
+        v = f"CAST({expr} AS CHAR)"
+        local = f"SUBSTRING_INDEX({v}, '@', 1)"
+        domain = f"SUBSTRING_INDEX({v}, '@', -1)"
+        return (
+            f"CASE WHEN {v} IS NULL THEN NULL "
+            f"WHEN CHAR_LENGTH({v}) < 3 THEN '***' "
+            # Email: exactly one '@'
+            f"WHEN CHAR_LENGTH({v}) - CHAR_LENGTH(REPLACE({v}, '@', '')) = 1 THEN "
+            f"CASE WHEN CHAR_LENGTH({local}) > 2 THEN CONCAT(LEFT({v}, 1), '***@', {domain}) "
+            f"ELSE CONCAT('***@', {domain}) END "
+            # Phone: 7+ digits keeps the first 3 and last 4 characters
+            f"WHEN CHAR_LENGTH(REGEXP_REPLACE({v}, '[^0-9]', '')) >= 7 THEN CONCAT(LEFT({v}, 3), '***', RIGHT({v}, 4)) "
+            f"ELSE CONCAT(LEFT({v}, 1), '***') END"
+        )
+    
     def get_safe_columns(self, table_columns: Dict[str, List[str]]) -> Dict[str, List[str]]:
         """
         Filter out sensitive columns from schema.
@@ -298,60 +499,31 @@ class DataGovernanceService:
         
         return safe_columns
     
-    def _extract_selected_columns(self, sql: str) -> List[str]:
-        """Extract column names from SELECT clause"""
-        # Simple extraction - can be enhanced
-        select_match = re.search(r'SELECT\s+(.*?)\s+FROM', sql, re.IGNORECASE | re.DOTALL)
-        if not select_match:
-            return []
-        
-        select_clause = select_match.group(1)
-        
-        # Handle SELECT *
-        if '*' in select_clause:
-            return ['*']
+    def parse(self, sql: str) -> ParsedQuery:
+        """
+        Parse SQL once for all governance checks (cached by SQL hash).
         
-        # Split by comma and clean
+        Args:
+            sql: SQL query
+            
+        Returns:
+            Parsed query tree shared by validation, sanitization and table extraction
+        """
+        return parse_sql(sql)
+    
+    def _extract_selected_columns(self, sql: str) -> List[str]:
+        """Extract column names read by the SELECT lists ('*' for star projections)"""
         columns = []
-        for col in select_clause.split(','):
-            col = col.strip()
-            # Remove AS aliases
-            if ' AS ' in col.upper():
-                col = re.split(r'\s+AS\s+', col, flags=re.IGNORECASE)[0].strip()
-            # Remove function calls (e.g., COUNT(column))
-            col = re.sub(r'\w+\((.*?)\)', r'\1', col)
-            # Remove quotes and backticks
-            col = col.strip('`"\'[]')
-            if col:
-                columns.append(col)
-        
+        for select in parse_sql(sql).walk_selects():
+            for item in select.items:
+                if item.is_star:
+                    columns.append('*')
+                columns.extend(col.text for col in item.columns)
         return columns
     
     def _extract_tables_from_query(self, sql: str) -> List[str]:
-        """Extract table names from SQL query"""
-        tables = []
-        
-        # Find all table references after FROM and JOIN keywords
-        # Match: FROM table, JOIN table, etc.
-        patterns = [
-            r'FROM\s+(\w+)',
-            r'JOIN\s+(\w+)',
-            r',\s*(\w+)'  # Comma-separated tables
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, sql, re.IGNORECASE)
-            tables.extend(matches)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_tables = []
-        for table in tables:
-            if table.lower() not in seen:
-                seen.add(table.lower())
-                unique_tables.append(table)
-        
-        return unique_tables
+        """Extract base table names referenced by the query (CTE names excluded)"""
+        return parse_sql(sql).tables()
     
     def get_governance_summary(self) -> Dict[str, Any]:
         """Get governance configuration summary"""
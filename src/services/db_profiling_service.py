@@ -6,6 +6,11 @@ from typing import Optional, Dict, Any, List, Protocol
 from datetime import datetime
 from pathlib import Path
 
+from .async_inference import run_concurrently
+from .batch_inference import batch_mode, parallel_structured_output_batches, structured_outputs
+from .mysql_service import quote_identifier
+from ..modules.keyword_matcher import KeywordMatcher
+
 
 class InferenceServiceProtocol(Protocol):
     """Protocol for LLM inference services"""
@@ -23,6 +28,33 @@ class DBReaderProtocol(Protocol):
 class MySQLServiceProtocol(Protocol):
     """Protocol for MySQL service"""
     def execute_query(self, sql: str, asDict: bool = True) -> List[Dict[str, Any]]: ...
+    def execute_prepared(self, sql: str, params: tuple = (), asDict: bool = True, governed: bool = True) -> List[Dict[str, Any]]: ...
+
+
+BUSINESS_CONTEXT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "business_purpose": {"type": "string"},
+        "data_domain": {"type": "string"},
+        "business_impact": {"type": "string", "enum": ["HIGH", "MEDIUM", "LOW"]},
+        "description": {"type": "string"},
+        "typical_queries": {"type": "array", "items": {"type": "string"}},
+        "related_business_processes": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["business_purpose", "description"]
+}
+
+COLUMN_SEMANTICS_SCHEMA = {
+    "type": "object",
+    "additionalProperties": {
+        "type": "object",
+        "properties": {
+            "description": {"type": "string"},
+            "semantic_meaning": {"type": "string"},
+            "business_relevance": {"type": "string"}
+        }
+    }
+}
 
 
 class DataGovernanceConfig:
@@ -38,9 +70,20 @@ class DataGovernanceConfig:
             "pin", "auth", "credential", "key"
         ]
         
+        self.sensitive_keywords_csv = sensitive_keywords_csv
         self.sensitive_keywords = self._load_keywords(sensitive_keywords_csv)
+        self.matcher = KeywordMatcher(self.sensitive_keywords)
+        self.keywords_version = 1
         self.masking_enabled = os.getenv("DATA_MASKING_ENABLED", "true").lower() == "true"
     
+    def reload_keywords(self, sensitive_keywords_csv: Optional[str] = None):
+        """Reload sensitive keywords from CSV and invalidate cached column decisions"""
+        if sensitive_keywords_csv:
+            self.sensitive_keywords_csv = sensitive_keywords_csv
+        self.sensitive_keywords = self._load_keywords(self.sensitive_keywords_csv)
+        self.matcher.set_keywords(self.sensitive_keywords)
+        self.keywords_version += 1
+    
     def _load_keywords(self, csv_path: Optional[str]) -> List[str]:
         """Load sensitive keywords from CSV file"""
         if not csv_path:
@@ -66,8 +109,7 @@ class DataGovernanceConfig:
         if not self.masking_enabled:
             return False
         
-        column_lower = column_name.lower()
-        return any(keyword in column_lower for keyword in self.sensitive_keywords)
+        return self.matcher.matches(column_name)
 
 
 class DBProfilingService:
@@ -150,14 +192,28 @@ class DBProfilingService:
         
         tables, views = self.db_reader.get_tables(dbname)
         
-        # Profile tables
+        # Profile tables: schema, statistics and samples per table first, then
+        # the LLM analyses of all tables as one batch per model instead of two
+        # calls per table
+        table_inputs = {}
+        table_errors = {}
         for i, table in enumerate(tables, 1):
             print(f"[{i}/{len(tables)}] Profiling table: {table}")
             try:
-                profile_data["tables"][table] = self.profile_table(dbname, table)
+                table_inputs[table] = self._collect_table_inputs(dbname, table)
             except Exception as e:
                 print(f"  ❌ Error profiling table {table}: {e}")
-                profile_data["tables"][table] = {"error": str(e)}
+                table_errors[table] = {"error": str(e)}
+        
+        analyses = self._analyze_tables_batched(table_inputs) if table_inputs else {}
+        for table in tables:
+            if table in table_errors:
+                profile_data["tables"][table] = table_errors[table]
+                continue
+            business_context, column_descriptions = analyses[table]
+            profile_data["tables"][table] = self._assemble_table_profile(
+                table, table_inputs[table], business_context, column_descriptions
+            )
         
         # Profile views
         print(f"\nProfiled {len(tables)} tables")
@@ -195,6 +251,32 @@ class DBProfilingService:
         Returns:
             Dictionary containing table profile
         """
+        inputs = self._collect_table_inputs(dbname, table)
+        
+        # 4 + 5. LLM-powered business analysis (HEAVY) and column descriptions
+        # (LIGHT, batched) are independent, so both calls are in flight together
+        print(f"  🤖 Running heavy LLM business analysis and light LLM column semantic analysis...")
+        business_context, column_descriptions = run_concurrently([
+            lambda: self._analyze_table_business_context(
+                table, inputs["columns"], inputs["sample_rows"], inputs["table_comment"]
+            ),
+            lambda: self._analyze_column_semantics(table, inputs["columns"], inputs["stats"])
+        ])
+        if isinstance(business_context, BaseException):
+            print(f"    Warning: LLM business analysis failed: {business_context}")
+            business_context = self._default_business_context(table, inputs["table_comment"])
+        if isinstance(column_descriptions, BaseException):
+            print(f"    Warning: LLM column analysis failed: {column_descriptions}")
+            column_descriptions = {}
+        return self._assemble_table_profile(table, inputs, business_context, column_descriptions)
+    
+    def _collect_table_inputs(self, dbname: str, table: str) -> Dict[str, Any]:
+        """
+        Steps 1-3 of table profiling: schema, statistics and masked samples.
+        
+        Returns:
+            Dictionary with columns, table_comment, stats and sample_rows
+        """
         # 1. Get schema with DB comments
         columns = self.db_reader.get_table_schema(dbname, table)
         print(f"  📋 Retrieved {len(columns)} columns from schema")
@@ -225,12 +307,69 @@ class DBProfilingService:
             sample_rows,
             f"Sample rows for table {table} (with masking)"
         )
+        return {"columns": columns, "table_comment": table_comment, "stats": stats, "sample_rows": sample_rows}
+    
+    def _analyze_tables_batched(self, table_inputs: Dict[str, Dict[str, Any]]) -> Dict[str, tuple]:
+        """
+        Steps 4-5 for many tables: a batch on the heavy LLM (business context)
+        and one on the light LLM (column semantics). In the parallel batch mode
+        the items of both go out as one fan-out under the shared limiter; pack
+        and provider batches are sent one after the other. A failed item falls
+        back to the same defaults as a failed single call.
         
-        # 4. LLM-powered business analysis (HEAVY)
-        print(f"  🤖 Running heavy LLM business analysis...")
-        business_context = self._analyze_table_business_context(
-            table, columns, sample_rows, table_comment
-        )
+        Returns:
+            Dictionary mapping table names to (business_context, column_descriptions)
+        """
+        tables = list(table_inputs)
+        business_prompts = [
+            self._business_context_prompt(
+                table, inputs["columns"], inputs["sample_rows"], inputs["table_comment"]
+            )
+            for table, inputs in table_inputs.items()
+        ]
+        column_prompts = {
+            table: self._column_semantics_prompt(table, inputs["columns"], inputs["stats"])
+            for table, inputs in table_inputs.items()
+        }
+        column_tables = [table for table in tables if column_prompts[table]]
+        
+        print(f"\n🤖 Heavy LLM business analysis for {len(tables)} tables and light LLM column "
+              f"semantic analysis for {len(column_tables)} tables (batched)...")
+        column_batch_prompts = [column_prompts[table] for table in column_tables]
+        if batch_mode() == "parallel":
+            business_results, column_batch = parallel_structured_output_batches([
+                (self.heavy_llm.get_structured_output, business_prompts, BUSINESS_CONTEXT_SCHEMA,
+                 type(self.heavy_llm).__name__),
+                (self.light_llm.get_structured_output, column_batch_prompts, COLUMN_SEMANTICS_SCHEMA,
+                 type(self.light_llm).__name__),
+            ])
+        else:
+            business_results = structured_outputs(self.heavy_llm, business_prompts, BUSINESS_CONTEXT_SCHEMA)
+            column_batch = structured_outputs(
+                self.light_llm, column_batch_prompts, COLUMN_SEMANTICS_SCHEMA
+            ) if column_tables else []
+        column_results = dict(zip(column_tables, column_batch))
+        
+        analyses = {}
+        for table, business_context in zip(tables, business_results):
+            if isinstance(business_context, BaseException) or not business_context:
+                print(f"    Warning: LLM business analysis failed for {table}: {business_context}")
+                business_context = self._default_business_context(table, table_inputs[table]["table_comment"])
+            column_descriptions = column_results.get(table, {})
+            if isinstance(column_descriptions, BaseException):
+                print(f"    Warning: LLM column analysis failed for {table}: {column_descriptions}")
+                column_descriptions = {}
+            analyses[table] = (business_context, column_descriptions)
+        return analyses
+    
+    def _assemble_table_profile(
+        self,
+        table: str,
+        inputs: Dict[str, Any],
+        business_context: Dict[str, Any],
+        column_descriptions: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Combine collected inputs and LLM analyses into the table profile"""
         print(f"     Business context keys: {list(business_context.keys())}")
         self._dump_debug_data(
             f"{table}_04_business_context.json",
@@ -238,11 +377,6 @@ class DBProfilingService:
             f"Heavy LLM business analysis for table {table}"
         )
         
-        # 5. LLM-powered column descriptions (LIGHT, batched)
-        print(f"  💡 Running light LLM column semantic analysis...")
-        column_descriptions = self._analyze_column_semantics(
-            table, columns, stats
-        )
         print(f"     Descriptions generated for {len(column_descriptions)} columns")
         self._dump_debug_data(
             f"{table}_05_column_descriptions.json",
@@ -251,10 +385,10 @@ class DBProfilingService:
         )
         
         result = {
-            "row_count": stats["row_count"],
-            "table_comment": table_comment,
-            "columns": columns,
-            "column_statistics": stats["columns"],
+            "row_count": inputs["stats"]["row_count"],
+            "table_comment": inputs["table_comment"],
+            "columns": inputs["columns"],
+            "column_statistics": inputs["stats"]["columns"],
             "column_descriptions": column_descriptions,
             **business_context
         }
@@ -293,13 +427,13 @@ class DBProfilingService:
     
     def _get_table_comment(self, dbname: str, table: str) -> str:
         """Get table or view comment from information_schema"""
-        query = f"""
+        query = """
             SELECT TABLE_COMMENT
             FROM information_schema.TABLES
-            WHERE TABLE_SCHEMA = '{dbname}' AND TABLE_NAME = '{table}'
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
         """
         try:
-            result = self.mysql_service.execute_query(query)
+            result = self.mysql_service.execute_prepared(query, (dbname, table), governed=False)
             if result and len(result) > 0:
                 comment = result[0].get('TABLE_COMMENT', '')
                 return comment if comment else ''
@@ -378,11 +512,16 @@ class DBProfilingService:
             "columns": column_stats
         }
     
+    @staticmethod
+    def _table_ref(dbname: str, table: str) -> str:
+        """Quoted `db`.`table` reference for interpolation into profiling queries"""
+        return f"{quote_identifier(dbname)}.{quote_identifier(table)}"
+    
     def _get_row_count(self, dbname: str, table: str) -> int:
         """Get total row count for table"""
-        query = f"SELECT COUNT(*) as cnt FROM {dbname}.{table}"
+        query = f"SELECT COUNT(*) as cnt FROM {self._table_ref(dbname, table)}"
         try:
-            result = self.mysql_service.execute_query(query)
+            result = self.mysql_service.execute_prepared(query)
             return result[0]['cnt'] if result else 0
         except Exception as e:
             print(f"    Warning: Could not get row count: {e}")
@@ -390,9 +529,9 @@ class DBProfilingService:
     
     def _get_distinct_count(self, dbname: str, table: str, column: str) -> int:
         """Get distinct value count for column"""
-        query = f"SELECT COUNT(DISTINCT `{column}`) as cnt FROM {dbname}.{table}"
+        query = f"SELECT COUNT(DISTINCT {quote_identifier(column)}) as cnt FROM {self._table_ref(dbname, table)}"
         try:
-            result = self.mysql_service.execute_query(query)
+            result = self.mysql_service.execute_prepared(query)
             return result[0]['cnt'] if result else 0
         except Exception as e:
             print(f"    Warning: Could not get distinct count for {column}: {e}")
@@ -403,9 +542,9 @@ class DBProfilingService:
         if total_rows == 0:
             return 0.0
         
-        query = f"SELECT COUNT(*) as cnt FROM {dbname}.{table} WHERE `{column}` IS NULL"
+        query = f"SELECT COUNT(*) as cnt FROM {self._table_ref(dbname, table)} WHERE {quote_identifier(column)} IS NULL"
         try:
-            result = self.mysql_service.execute_query(query)
+            result = self.mysql_service.execute_prepared(query)
             null_count = result[0]['cnt'] if result else 0
             return (null_count / total_rows) * 100
         except Exception as e:
@@ -420,16 +559,17 @@ class DBProfilingService:
         top_n: int
     ) -> Dict[str, int]:
         """Get top N value distribution for categorical column"""
+        quoted = quote_identifier(column)
         query = f"""
-            SELECT `{column}`, COUNT(*) as cnt
-            FROM {dbname}.{table}
-            WHERE `{column}` IS NOT NULL
-            GROUP BY `{column}`
+            SELECT {quoted}, COUNT(*) as cnt
+            FROM {self._table_ref(dbname, table)}
+            WHERE {quoted} IS NOT NULL
+            GROUP BY {quoted}
             ORDER BY cnt DESC
-            LIMIT {top_n}
+            LIMIT %s
         """
         try:
-            result = self.mysql_service.execute_query(query)
+            result = self.mysql_service.execute_prepared(query, (int(top_n),))
             return {str(row[column]): row['cnt'] for row in result}
         except Exception as e:
             print(f"    Warning: Could not get value distribution for {column}: {e}")
@@ -461,15 +601,15 @@ class DBProfilingService:
             col_name = col['Field']
             if self.governance.is_sensitive_column(col_name):
                 # Use SQL fragment for masking
-                select_parts.append(f"'***MASKED***' AS `{col_name}`")
+                select_parts.append(f"'***MASKED***' AS {quote_identifier(col_name)}")
             else:
-                select_parts.append(f"`{col_name}`")
+                select_parts.append(quote_identifier(col_name))
         
         select_clause = ", ".join(select_parts)
-        query = f"SELECT {select_clause} FROM {dbname}.{table} LIMIT {limit}"
+        query = f"SELECT {select_clause} FROM {self._table_ref(dbname, table)} LIMIT %s"
         
         try:
-            result = self.mysql_service.execute_query(query)
+            result = self.mysql_service.execute_prepared(query, (int(limit),))
             return result if result else []
         except Exception as e:
             print(f"    Warning: Could not fetch sample rows: {e}")
@@ -494,23 +634,27 @@ class DBProfilingService:
         Returns:
             Dictionary with business context
         """
+        prompt = self._business_context_prompt(table, columns, sample_rows, table_comment)
+        
+        try:
+            result = self.heavy_llm.get_structured_output(prompt, BUSINESS_CONTEXT_SCHEMA)
+            return result if result else {}
+        except Exception as e:
+            print(f"    Warning: LLM business analysis failed: {e}")
+            return self._default_business_context(table, table_comment)
+    
+    def _business_context_prompt(
+        self,
+        table: str,
+        columns: List[Dict[str, Any]],
+        sample_rows: List[Dict[str, Any]],
+        table_comment: str
+    ) -> str:
+        """Prompt for the HEAVY LLM business analysis (answered with BUSINESS_CONTEXT_SCHEMA)"""
         schema_str = self._format_schema_for_llm(columns)
         samples_str = self._format_samples_for_llm(sample_rows)
         
-        json_schema = {
-            "type": "object",
-            "properties": {
-                "business_purpose": {"type": "string"},
-                "data_domain": {"type": "string"},
-                "business_impact": {"type": "string", "enum": ["HIGH", "MEDIUM", "LOW"]},
-                "description": {"type": "string"},
-                "typical_queries": {"type": "array", "items": {"type": "string"}},
-                "related_business_processes": {"type": "array", "items": {"type": "string"}}
-            },
-            "required": ["business_purpose", "description"]
-        }
-        
-        prompt = f"""
+        return f"""
 Analyze this database table and provide structured business metadata.
 
 Table Name: {table}
@@ -530,16 +674,14 @@ Provide comprehensive business context for this table including:
 - 3-5 typical natural language queries users might ask
 - Related business processes
 """
-        
-        try:
-            result = self.heavy_llm.get_structured_output(prompt, json_schema)
-            return result if result else {}
-        except Exception as e:
-            print(f"    Warning: LLM business analysis failed: {e}")
-            return {
-                "business_purpose": "Unknown",
-                "description": table_comment or f"Database table: {table}"
-            }
+    
+    @staticmethod
+    def _default_business_context(table: str, table_comment: str) -> Dict[str, Any]:
+        """Business context used when the LLM analysis fails"""
+        return {
+            "business_purpose": "Unknown",
+            "description": table_comment or f"Database table: {table}"
+        }
     
     def _analyze_column_semantics(
         self,
@@ -558,6 +700,27 @@ Provide comprehensive business context for this table including:
         Returns:
             Dictionary mapping column names to descriptions
         """
+        prompt = self._column_semantics_prompt(table, columns, stats)
+        if not prompt:
+            return {}
+        
+        try:
+            result = self.light_llm.get_structured_output(prompt, COLUMN_SEMANTICS_SCHEMA)
+            return result if result else {}
+        except Exception as e:
+            print(f"    Warning: LLM column analysis failed: {e}")
+            return {}
+    
+    def _column_semantics_prompt(
+        self,
+        table: str,
+        columns: List[Dict[str, Any]],
+        stats: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        Prompt for the LIGHT LLM column descriptions (answered with
+        COLUMN_SEMANTICS_SCHEMA), or None if every column is sensitive.
+        """
         # Prepare batch prompt for all non-sensitive columns
         column_info = []
         for col in columns:
@@ -580,21 +743,9 @@ Provide comprehensive business context for this table including:
             })
         
         if not column_info:
-            return {}
-        
-        json_schema = {
-            "type": "object",
-            "additionalProperties": {
-                "type": "object",
-                "properties": {
-                    "description": {"type": "string"},
-                    "semantic_meaning": {"type": "string"},
-                    "business_relevance": {"type": "string"}
-                }
-            }
-        }
+            return None
         
-        prompt = f"""
+        return f"""
 For each column in table '{table}', provide a concise semantic description.
 
 Columns:
@@ -605,13 +756,6 @@ Return a JSON object where keys are column names and values contain:
 - semantic_meaning: The semantic type/meaning
 - business_relevance: How it's used in business context
 """
-        
-        try:
-            result = self.light_llm.get_structured_output(prompt, json_schema)
-            return result if result else {}
-        except Exception as e:
-            print(f"    Warning: LLM column analysis failed: {e}")
-            return {}
     
     def _infer_virtual_tables(
         self,
@@ -1,4 +1,4 @@
-from .mysql_service import MySQLService
+from .mysql_service import MySQLService, quote_identifier
 
 class DBSchemaReaderService:
     def __init__(self, mysql_service: MySQLService):
@@ -11,8 +11,13 @@ class DBSchemaReaderService:
         return [row[0] for row in result if row[0] not in ('information_schema', 'mysql', 'performance_schema', 'sys')]
 
     def get_tables(self, database):
-        query = f"SHOW FULL TABLES FROM `{database}`"
-        result, headers = self.mysql_service.execute_query(query, asDict=False)
+        query = """
+            SELECT TABLE_NAME, TABLE_TYPE
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = %s
+            ORDER BY TABLE_NAME
+        """
+        result, headers = self.mysql_service.execute_prepared(query, (database,), asDict=False, governed=False)
         tables = []
         views = []
         print(result)
@@ -23,29 +28,38 @@ class DBSchemaReaderService:
             elif table_type.lower() == 'view':
                 views.append(table_name)
         return tables, views
-    
+
     def get_views(self, database):
         """Get list of views only"""
         tables, views = self.get_tables(database)
         return views
 
     def get_stored_procedures(self, database):
-        query = f"""
-            SELECT ROUTINE_NAME 
-            FROM information_schema.ROUTINES 
-            WHERE ROUTINE_SCHEMA = '{database}' AND ROUTINE_TYPE = 'PROCEDURE'
+        query = """
+            SELECT ROUTINE_NAME
+            FROM information_schema.ROUTINES
+            WHERE ROUTINE_SCHEMA = %s AND ROUTINE_TYPE = 'PROCEDURE'
         """
-        result = self.mysql_service.execute_query(query)
+        result = self.mysql_service.execute_prepared(query, (database,), governed=False)
         return [row['ROUTINE_NAME'] for row in result]
 
     def get_table_schema(self, database, table):
-        query = f"SHOW FULL COLUMNS FROM `{database}`.`{table}`"
-        result = self.mysql_service.execute_query(query)
+        # Same columns as SHOW FULL COLUMNS, but bindable so the statement is prepared once.
+        # Metadata is not governed: the `Key` column must not be masked as a sensitive value.
+        query = """
+            SELECT COLUMN_NAME AS `Field`, COLUMN_TYPE AS `Type`, COLLATION_NAME AS `Collation`,
+                   IS_NULLABLE AS `Null`, COLUMN_KEY AS `Key`, COLUMN_DEFAULT AS `Default`,
+                   EXTRA AS `Extra`, `PRIVILEGES` AS `Privileges`, COLUMN_COMMENT AS `Comment`
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+        """
+        result = self.mysql_service.execute_prepared(query, (database, table), governed=False)
 
         return [dict(row) for row in result]
 
     def get_view_schema(self, database, view):
-        query = f"SHOW CREATE VIEW `{database}`.`{view}`"
+        query = f"SHOW CREATE VIEW {quote_identifier(database)}.{quote_identifier(view)}"
         result = self.mysql_service.execute_query(query)
         if result:
             return {'Create View': result[0].get('Create View')}
@@ -53,7 +67,7 @@ class DBSchemaReaderService:
 
     def get_procedure_schema(self, database, procedure):
         query = f"""
-            SHOW CREATE PROCEDURE `{database}`.`{procedure}`
+            SHOW CREATE PROCEDURE {quote_identifier(database)}.{quote_identifier(procedure)}
         """
         result = self.mysql_service.execute_query(query)
         if result:
@@ -77,4 +91,4 @@ class DBSchemaReaderService:
             procedures = self.get_stored_procedures(db)
             for proc in procedures:
                 schema[db]['procedures'][proc] = self.get_procedure_schema(db, proc)
-        return schema
\ No newline at end of file
+        return schema
@@ -0,0 +1,117 @@
+"""
+Shared HTTP sessions for LLM providers
+
+Every provider call used to go through a bare `requests.post`, which opens a new
+TCP (and TLS) connection per call. This module keeps process-wide keep-alive
+connection pools instead:
+1. A `requests.Session` with a sized connection pool, used by the REST providers
+   (Gemini, Ollama and the OpenAI-compatible `Model`)
+2. An `httpx.Client` for the OpenAI SDK, with HTTP/2 enabled when the `h2`
+   package is installed
+3. Default (connect, read) timeouts so a stuck provider cannot hang a request
+
+Configuration (environment variables):
+- LLM_HTTP_POOL_CONNECTIONS: Number of host pools to keep (default 10)
+- LLM_HTTP_POOL_MAXSIZE: Keep-alive connections per host (default 20)
+- LLM_HTTP_CONNECT_TIMEOUT: Connect timeout in seconds (default 5)
+- LLM_HTTP_READ_TIMEOUT: Read timeout in seconds (default 120)
+- LLM_HTTP_CONNECT_RETRIES: Retries for failed connection attempts only (default 1)
+"""
+
+import atexit
+import os
+import threading
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# httpx (OpenAI SDK transport) and h2 are optional here
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_httpx_client = None
+
+
+def request_timeout() -> Tuple[float, float]:
+    """Default (connect, read) timeout for provider calls"""
+    return (
+        float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("LLM_HTTP_READ_TIMEOUT", "120"))
+    )
+
+
+def _pool_sizes() -> Tuple[int, int]:
+    return (
+        int(os.getenv("LLM_HTTP_POOL_CONNECTIONS", "10")),
+        int(os.getenv("LLM_HTTP_POOL_MAXSIZE", "20"))
+    )
+
+
+def create_session() -> requests.Session:
+    """Create a requests session with keep-alive connection pools for http and https"""
+    pool_connections, pool_maxsize = _pool_sizes()
+    # An int max_retries only retries connection failures, never a sent request
+    retries = int(os.getenv("LLM_HTTP_CONNECT_RETRIES", "1"))
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide session shared by all REST providers"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def get_httpx_client():
+    """
+    Process-wide httpx client for SDKs built on httpx (OpenAI).
+    Returns None if httpx is not installed, letting the SDK use its default client.
+    """
+    global _httpx_client
+    if httpx is None:
+        return None
+    if _httpx_client is None:
+        with _lock:
+            if _httpx_client is None:
+                connect, read = request_timeout()
+                _, pool_maxsize = _pool_sizes()
+                _httpx_client = httpx.Client(
+                    http2=HTTP2_AVAILABLE,
+                    timeout=httpx.Timeout(read, connect=connect),
+                    limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+                )
+    return _httpx_client
+
+
+def close_sessions():
+    """Close pooled connections (registered at exit)"""
+    global _session, _httpx_client
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        if _httpx_client is not None:
+            _httpx_client.close()
+            _httpx_client = None
+
+
+atexit.register(close_sessions)
@@ -1,27 +1,84 @@
+import functools
 import os
 import requests
 import json
 from typing import Optional, Dict, Any
-from typing import Protocol, List
+from typing import Iterator, Protocol, List
 from openai import OpenAI
 
 from src.models.model import Model
+from src.services.async_inference import AsyncInferenceMixin
+from src.services.batch_inference import BatchInferenceMixin, run_openai_batch
+from src.services.http_session import get_httpx_client, get_session, request_timeout
+from src.services.llm_errors import LLMResponseError, classify_error
+from src.services.streaming import iter_ndjson, iter_sse_data
+from src.services.token_usage import record_usage
 
-class GeminiService:
+
+def _structured_prompt(content: str, json_schema: Dict[str, Any]) -> str:
+    schema_str = json.dumps(json_schema, indent=2)
+    return f"""
+        Extract information from the following text based on the provided JSON schema. 
+        The final output MUST be a valid JSON object that adheres to this schema.
+
+        Schema:
+        {schema_str}
+
+        Text:
+        {content}
+
+        Output JSON:
+        """
+
+
+def _structured_messages(content: str, json_schema: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
+        {"role": "user", "content": _structured_prompt(content, json_schema)}
+    ]
+
+
+def _chat_messages(message: str, context: Optional[str] = None) -> List[Dict[str, str]]:
+    messages = []
+    if context:
+        messages.append({"role": "system", "content": f"Context: {context}"})
+    messages.append({"role": "user", "content": message})
+    return messages
+
+def _typed_stream_errors(provider: str):
+    """Raise transport and SDK errors of a streaming generator as typed LLM errors (see llm_errors.py)"""
+    def decorator(stream):
+        @functools.wraps(stream)
+        def run(*args, **kwargs) -> Iterator[str]:
+            try:
+                yield from stream(*args, **kwargs)
+            except Exception as err:
+                raise classify_error(provider, err) from err
+        return run
+    return decorator
+
+
+class GeminiService(AsyncInferenceMixin, BatchInferenceMixin):
     """
     Service class for interacting with Google Gemini LLM.
     Exposes methods for summarization, structured output, intent analysis, and general chat completion.
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, session: Optional[requests.Session] = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        self.api_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+        self.model = "gemini-2.5-flash"
+        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent"
+        self.stream_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:streamGenerateContent"
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY is required for GeminiService.")
+        # Shared keep-alive session; avoids a new TCP/TLS handshake per call
+        self.session = session or get_session()
+        self.timeout = request_timeout()
 
     def _call_gemini(self, prompt: str) -> str:
         """
         Private method to send a prompt to the Gemini API and handle the response.
+        Raises LLMProviderError / LLMResponseError on failure.
         """
         headers = {
             "Content-Type": "application/json",
@@ -40,24 +97,62 @@ class GeminiService:
         }
         
         try:
-            response = requests.post(self.api_url, headers=headers, params=params, json=data)
+            response = self.session.post(self.api_url, headers=headers, params=params, json=data, timeout=self.timeout)
             response.raise_for_status()  # This will raise an HTTPError for bad responses (4xx or 5xx)
             
             response_json = response.json()
             
             # The structure of the Gemini API response is nested
-            return response_json['candidates'][0]['content']['parts'][0]['text']
+            text = response_json['candidates'][0]['content']['parts'][0]['text']
+            usage = response_json.get("usageMetadata") or {}
+            record_usage("gemini", self.model, prompt, text, usage.get("promptTokenCount"), usage.get("candidatesTokenCount"))
+            return text
             
         except requests.exceptions.HTTPError as err:
             print(f"HTTP Error: {err}")
             print(f"Response content: {err.response.text}")
-            return "An error occurred during the API call."
+            raise classify_error("gemini", err) from err
         except (KeyError, IndexError) as err:
             print(f"Parsing Error: Could not find expected keys in the Gemini response. {err}")
-            return "An error occurred while parsing the API response."
+            raise LLMResponseError(f"Unexpected response shape: {err}", "gemini") from err
         except Exception as err:
             print(f"An unexpected error occurred: {err}")
-            return "An unexpected error occurred."
+            raise classify_error("gemini", err) from err
+
+    @_typed_stream_errors("gemini")
+    def _stream_gemini(self, prompt: str) -> Iterator[str]:
+        """
+        Private method to stream a prompt response from the Gemini API as text chunks.
+        Errors are raised as typed LLM errors, since a partially consumed stream has no sentinel value.
+        """
+        params = {
+            "key": self.api_key,
+            "alt": "sse"
+        }
+        data = {
+            "contents": [
+                {
+                    "parts": [
+                        {"text": prompt}
+                    ]
+                }
+            ]
+        }
+        chunks, usage = [], {}
+        with self.session.post(self.stream_url, params=params, json=data, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for payload in iter_sse_data(response.iter_lines(decode_unicode=True)):
+                event = json.loads(payload)
+                # Cumulative usage; the last event carries the final counts
+                usage = event.get("usageMetadata") or usage
+                candidates = event.get("candidates") or []
+                if not candidates:
+                    continue
+                for part in candidates[0].get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        chunks.append(part["text"])
+                        yield part["text"]
+        record_usage("gemini", self.model, prompt, "".join(chunks), usage.get("promptTokenCount"), usage.get("candidatesTokenCount"))
 
     def get_summary(self, content: str, max_words: int = 100) -> str:
         """
@@ -77,19 +172,7 @@ class GeminiService:
         """
         Extracts structured data from content based on a JSON schema.
         """
-        schema_str = json.dumps(json_schema, indent=2)
-        prompt = f"""
-        Extract information from the following text based on the provided JSON schema. 
-        The final output MUST be a valid JSON object that adheres to this schema.
-
-        Schema:
-        {schema_str}
-
-        Text:
-        {content}
-
-        Output JSON:
-        """
+        prompt = _structured_prompt(content, json_schema)
 
         # print("debug prompt\n----------\n", prompt)
         
@@ -98,9 +181,9 @@ class GeminiService:
         try:
             # Attempt to parse the string output from the model into a JSON object
             return json.loads(json_string.strip('```json\n').strip('```').strip())
-        except json.JSONDecodeError:
+        except json.JSONDecodeError as err:
             print("Error: The model did not return a valid JSON object.", json_string)
-            return {}
+            raise LLMResponseError("The model did not return a valid JSON object", "gemini") from err
 
     def analyze_intent(self, query: str) -> str:
         """
@@ -120,14 +203,27 @@ class GeminiService:
         """
         Provides a general chat completion response.
         """
+        return self._call_gemini(self._chat_prompt(message, context))
+
+    def stream_chat_completion(self, message: str, context: Optional[str] = None) -> Iterator[str]:
+        """
+        Streams a general chat completion response as text chunks.
+        """
+        return self._stream_gemini(self._chat_prompt(message, context))
+
+    def stream_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Iterator[str]:
+        """
+        Streams the raw JSON text of a structured output as it is generated.
+        """
+        return self._stream_gemini(_structured_prompt(content, json_schema))
+
+    @staticmethod
+    def _chat_prompt(message: str, context: Optional[str] = None) -> str:
         if context:
-            prompt = f"Context: {context}\n\nUser: {message}"
-        else:
-            prompt = f"User: {message}"
-            
-        return self._call_gemini(prompt)
+            return f"Context: {context}\n\nUser: {message}"
+        return f"User: {message}"
 
-class OpenAIService:
+class OpenAIService(AsyncInferenceMixin, BatchInferenceMixin):
     """
     Service class for interacting with OpenAI LLM.
     Exposes methods for summarization, structured output, intent analysis, and general chat completion.
@@ -137,7 +233,8 @@ class OpenAIService:
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY is required for OpenAIService.")
-        self.client = OpenAI(api_key=self.api_key)
+        # Pooled (HTTP/2 when available) client shared across instances
+        self.client = OpenAI(api_key=self.api_key, http_client=get_httpx_client())
         self.model = model
 
     def _call_openai(self, messages: List[Dict[str, str]], response_format: Optional[Dict] = None) -> str:
@@ -153,10 +250,43 @@ class OpenAIService:
                 kwargs["response_format"] = response_format
 
             response = self.client.chat.completions.create(**kwargs)
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            usage = getattr(response, "usage", None)
+            record_usage(
+                "openai", self.model, messages, content,
+                getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+            )
+            return content
         except Exception as err:
             print(f"OpenAI API Error: {err}")
-            return "An error occurred during the API call."
+            raise classify_error("openai", err) from err
+
+    @_typed_stream_errors("openai")
+    def _stream_openai(self, messages: List[Dict[str, str]], response_format: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Private method to stream a response from OpenAI API as text chunks.
+        Errors are raised as typed LLM errors, since a partially consumed stream has no sentinel value.
+        """
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            # Final chunk (with no choices) reports token usage
+            "stream_options": {"include_usage": True},
+        }
+        if response_format:
+            kwargs["response_format"] = response_format
+
+        chunks, usage = [], None
+        for chunk in self.client.chat.completions.create(**kwargs):
+            usage = getattr(chunk, "usage", None) or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                chunks.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        record_usage(
+            "openai", self.model, messages, "".join(chunks),
+            getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+        )
 
     def get_summary(self, content: str, max_words: int = 100) -> str:
         """
@@ -177,32 +307,61 @@ class OpenAIService:
         """
         Extracts structured data from content based on a JSON schema.
         """
-        schema_str = json.dumps(json_schema, indent=2)
-        prompt = f"""
-        Extract information from the following text based on the provided JSON schema. 
-        The final output MUST be a valid JSON object that adheres to this schema.
-
-        Schema:
-        {schema_str}
-
-        Text:
-        {content}
-
-        Output JSON:
-        """
-        
-        messages = [
-            {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
-            {"role": "user", "content": prompt}
-        ]
+        messages = _structured_messages(content, json_schema)
         
         json_string = self._call_openai(messages, response_format={"type": "json_object"})
         
         try:
             return json.loads(json_string)
-        except json.JSONDecodeError:
+        except json.JSONDecodeError as err:
             print("Error: The model did not return a valid JSON object.", json_string)
-            return {}
+            raise LLMResponseError("The model did not return a valid JSON object", "openai") from err
+
+    def _provider_structured_outputs(self, prompts: List[str], json_schema: Dict[str, Any]) -> List[Any]:
+        """
+        Structured outputs through the OpenAI Batch API (LLM_BATCH_MODE=provider).
+        Failed items hold their LLMError instead of a dict.
+        """
+        batch_lines = [
+            {
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": _structured_messages(prompt, json_schema),
+                    "response_format": {"type": "json_object"}
+                }
+            }
+            for i, prompt in enumerate(prompts)
+        ]
+        try:
+            bodies = run_openai_batch(self.client, batch_lines)
+        except Exception as err:
+            error = classify_error("openai", err)
+            return [error] * len(prompts)
+
+        results = []
+        for request in batch_lines:
+            body = bodies[request["custom_id"]]
+            if isinstance(body, Exception):
+                results.append(body)
+                continue
+            try:
+                content = body["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                results.append(LLMResponseError("The batch result has no message content", "openai"))
+                continue
+            usage = body.get("usage") or {}
+            record_usage(
+                "openai", self.model, request["body"]["messages"], content,
+                usage.get("prompt_tokens"), usage.get("completion_tokens")
+            )
+            try:
+                results.append(json.loads(content))
+            except (json.JSONDecodeError, TypeError):
+                results.append(LLMResponseError("The model did not return a valid JSON object", "openai"))
+        return results
 
     def analyze_intent(self, query: str) -> str:
         """
@@ -223,23 +382,36 @@ class OpenAIService:
         """
         Provides a general chat completion response.
         """
-        messages = []
-        if context:
-            messages.append({"role": "system", "content": f"Context: {context}"})
-        
-        messages.append({"role": "user", "content": message})
-            
-        return self._call_openai(messages)
+        return self._call_openai(_chat_messages(message, context))
 
-class OllamaService:
+    def stream_chat_completion(self, message: str, context: Optional[str] = None) -> Iterator[str]:
+        """
+        Streams a general chat completion response as text chunks.
+        """
+        return self._stream_openai(_chat_messages(message, context))
+
+    def stream_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Iterator[str]:
+        """
+        Streams the raw JSON text of a structured output as it is generated.
+        """
+        return self._stream_openai(_structured_messages(content, json_schema), response_format={"type": "json_object"})
+
+class OllamaService(AsyncInferenceMixin, BatchInferenceMixin):
     """
     Service class for interacting with Ollama (local LLM).
     Exposes methods for summarization, structured output, intent analysis, and general chat completion.
     """
 
-    def __init__(self, model: str = "llama3", base_url: str = os.getenv("LLM_API_BASE", "http://localhost:11434")):
+    def __init__(
+        self,
+        model: str = "llama3",
+        base_url: str = os.getenv("LLM_API_BASE", "http://localhost:11434"),
+        session: Optional[requests.Session] = None
+    ):
         self.model = model
         self.base_url = base_url
+        self.session = session or get_session()
+        self.timeout = request_timeout()
 
     def _call_ollama(self, messages: List[Dict[str, str]], format: Optional[str] = None) -> str:
         """
@@ -255,12 +427,47 @@ class OllamaService:
             payload["format"] = format
 
         try:
-            response = requests.post(url, json=payload)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
-            return response.json()['message']['content']
+            response_json = response.json()
+            content = response_json['message']['content']
+            record_usage(
+                "ollama", self.model, messages, content,
+                response_json.get("prompt_eval_count"), response_json.get("eval_count")
+            )
+            return content
         except Exception as err:
             print(f"Ollama API Error: {err}")
-            return "An error occurred during the API call."
+            raise classify_error("ollama", err) from err
+
+    @_typed_stream_errors("ollama")
+    def _stream_ollama(self, messages: List[Dict[str, str]], format: Optional[str] = None) -> Iterator[str]:
+        """
+        Private method to stream a response from Ollama API (NDJSON) as text chunks.
+        Errors are raised as typed LLM errors, since a partially consumed stream has no sentinel value.
+        """
+        url = f"{self.base_url}/api/chat"
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True
+        }
+        if format:
+            payload["format"] = format
+
+        chunks, final = [], {}
+        with self.session.post(url, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for chunk in iter_ndjson(response.iter_lines()):
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    chunks.append(content)
+                    yield content
+                if chunk.get("done"):
+                    # The final chunk carries the token counts
+                    final = chunk
+                    break
+        record_usage("ollama", self.model, messages, "".join(chunks), final.get("prompt_eval_count"), final.get("eval_count"))
 
     def get_summary(self, content: str, max_words: int = 100) -> str:
         """
@@ -281,32 +488,15 @@ class OllamaService:
         """
         Extracts structured data from content based on a JSON schema.
         """
-        schema_str = json.dumps(json_schema, indent=2)
-        prompt = f"""
-        Extract information from the following text based on the provided JSON schema. 
-        The final output MUST be a valid JSON object that adheres to this schema.
-
-        Schema:
-        {schema_str}
-
-        Text:
-        {content}
-
-        Output JSON:
-        """
-        
-        messages = [
-            {"role": "system", "content": "You are a helpful assistant that outputs JSON."},
-            {"role": "user", "content": prompt}
-        ]
+        messages = _structured_messages(content, json_schema)
         
         json_string = self._call_ollama(messages, format="json")
         
         try:
             return json.loads(json_string)
-        except json.JSONDecodeError:
+        except json.JSONDecodeError as err:
             print("Error: The model did not return a valid JSON object.", json_string)
-            return {}
+            raise LLMResponseError("The model did not return a valid JSON object", "ollama") from err
 
     def analyze_intent(self, query: str) -> str:
         """
@@ -327,23 +517,32 @@ class OllamaService:
         """
         Provides a general chat completion response.
         """
-        messages = []
-        if context:
-            messages.append({"role": "system", "content": f"Context: {context}"})
-        
-        messages.append({"role": "user", "content": message})
-            
-        return self._call_ollama(messages)
+        return self._call_ollama(_chat_messages(message, context))
+
+    def stream_chat_completion(self, message: str, context: Optional[str] = None) -> Iterator[str]:
+        """
+        Streams a general chat completion response as text chunks.
+        """
+        return self._stream_ollama(_chat_messages(message, context))
+
+    def stream_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Iterator[str]:
+        """
+        Streams the raw JSON text of a structured output as it is generated.
+        """
+        return self._stream_ollama(_structured_messages(content, json_schema), format="json")
 
 class InferenceServiceProtocol(Protocol):
     def get_summary(self, content: str, max_words: int = 100) -> str: ...
     def get_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Dict[str, Any]: ...
     def analyze_intent(self, query: str) -> str: ...
     def chat_completion(self, message: str, context: Optional[str] = None) -> str: ...
+    def stream_chat_completion(self, message: str, context: Optional[str] = None) -> Iterator[str]: ...
+    def stream_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Iterator[str]: ...
+    def get_structured_outputs(self, prompts: List[str], json_schema: Dict[str, Any], mode: Optional[str] = None) -> List[Any]: ...
 
 
 
-class ModelInferenceService:
+class ModelInferenceService(AsyncInferenceMixin, BatchInferenceMixin):
     """
     Generic inference service using a Model instance (OpenAI-compatible).
     Exposes the same protocol as GeminiService.
@@ -351,6 +550,27 @@ class ModelInferenceService:
     def __init__(self, model: Optional[Model] = None):
         self.model: Model = model or Model()
 
+    def _chat(self, messages: List[Dict[str, str]], **kwargs) -> Any:
+        try:
+            response = self.model.chat(messages, **kwargs)
+        except Exception as err:
+            print(f"Model API Error: {err}")
+            raise classify_error("model", err) from err
+        usage, content = {}, None
+        if isinstance(response, dict):
+            usage = response.get("usage") or {}
+            content = (response.get("choices") or [{}])[0].get("message", {}).get("content")
+        record_usage("model", self.model.model, messages, content, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        return response
+
+    @_typed_stream_errors("model")
+    def _stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        chunks = []
+        for chunk in self.model.chat_stream(messages, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        record_usage("model", self.model.model, messages, "".join(chunks))
+
     def get_summary(self, content: str, max_words: int = 100) -> str:
         prompt = f"""
         Summarize the following text in under {max_words} words.
@@ -361,13 +581,14 @@ class ModelInferenceService:
         Summary:
         """
         messages = [{"role": "user", "content": prompt}]
-        response = self.model.chat(messages)
+        response = self._chat(messages)
         # Try to extract summary from response
         if isinstance(response, dict):
             return response.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
         return str(response).strip()
 
-    def get_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _structured_request(content: str, json_schema: Dict[str, Any]):
         schema = {
             "name": "extracted_data",
             "schema": json_schema
@@ -384,21 +605,23 @@ class ModelInferenceService:
 
         Output JSON:
         """
-        messages = [{"role": "user", "content": prompt}]
-        response = self.model.chat(
+        return [{"role": "user", "content": prompt}], schema
+
+    def get_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Dict[str, Any]:
+        messages, schema = self._structured_request(content, json_schema)
+        response = self._chat(
             messages,
             response_format="json_schema",
             json_schema=schema
         )
-        # Try to extract JSON from response
+        # The endpoint returns a chat completion; the JSON object is the message content
         try:
-            if isinstance(response, str):
-                return json.loads(response.strip())
-            else:
-                return response
+            if isinstance(response, dict):
+                response = response["choices"][0]["message"]["content"]
+            return json.loads(response.strip())
         except Exception as e:
             print("Error parsing structured output:", e)
-            return {}
+            raise LLMResponseError(f"Could not parse structured output: {e}", "model") from e
 
     def analyze_intent(self, query: str) -> str:
         prompt = """
@@ -410,18 +633,28 @@ class ModelInferenceService:
         Intent:
         """ % query
         messages = [{"role": "user", "content": prompt}]
-        response = self.model.chat(messages)
+        response = self._chat(messages)
         if isinstance(response, dict):
             return response.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
         return str(response).strip()
 
     def chat_completion(self, message: str, context: Optional[str] = None) -> str:
+        response = self._chat(self._chat_messages(message, context))
+        if isinstance(response, dict):
+            return response.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+        return str(response).strip()
+
+    def stream_chat_completion(self, message: str, context: Optional[str] = None) -> Iterator[str]:
+        return self._stream(self._chat_messages(message, context))
+
+    def stream_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Iterator[str]:
+        messages, schema = self._structured_request(content, json_schema)
+        return self._stream(messages, response_format="json_schema", json_schema=schema)
+
+    @staticmethod
+    def _chat_messages(message: str, context: Optional[str] = None) -> List[Dict[str, str]]:
         if context:
             prompt = f"Context: {context}\n\nUser: {message}"
         else:
             prompt = f"User: {message}"
-        messages = [{"role": "user", "content": prompt}]
-        response = self.model.chat(messages)
-        if isinstance(response, dict):
-            return response.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-        return str(response).strip()
\ No newline at end of file
+        return [{"role": "user", "content": prompt}]
\ No newline at end of file
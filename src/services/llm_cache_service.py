@@ -0,0 +1,349 @@
+"""
+LLM Response Cache
+
+Disk-backed cache for inference service calls. Graph rebuilds re-profile the same
+tables and regression runs resend the same intent and SQL prompts, so identical
+calls are answered from a local SQLite file instead of a paid round trip:
+1. Entries are keyed by provider, model, method, prompt hash, JSON schema and temperature
+2. Entries expire after a TTL and the least recently used ones are evicted past a size bound
+3. A replay mode serves hits only and raises on a miss, so test runs never reach a provider
+
+Empty responses are never stored. In readonly and replay modes the SQLite file
+is opened read-only, so a replay run cannot modify a recorded fixture.
+
+Configuration (environment variables):
+- LLM_CACHE_ENABLED: Wrap the flow's inference service in the cache (default false)
+- LLM_CACHE_PATH: SQLite file (default cache/llm_cache.sqlite)
+- LLM_CACHE_TTL_SECONDS: Entry lifetime, 0 keeps entries forever (default 604800)
+- LLM_CACHE_MAX_ENTRIES: Maximum stored entries, 0 disables eviction (default 10000)
+- LLM_CACHE_MODE: readwrite, readonly (hits only, misses are not stored) or replay (misses raise)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, Iterator, List, Optional
+
+from .async_inference import AsyncInferenceMixin
+from .batch_inference import BatchInferenceMixin, structured_outputs
+
+CACHE_MODES = ("readwrite", "readonly", "replay")
+
+
+class LLMCacheMiss(KeyError):
+    """Raised in replay mode when a call has no cached response"""
+
+
+class LLMResponseCache:
+    """
+    SQLite store for LLM responses with TTL and LRU eviction.
+
+    One connection is shared across threads behind a lock; WAL journaling keeps
+    readers in other processes (parallel test runs) from blocking writers.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        readonly: bool = False
+    ):
+        """
+        Args:
+            path: SQLite file path (":memory:" for a process-local cache)
+            ttl_seconds: Entry lifetime in seconds, 0 keeps entries forever
+            max_entries: Maximum stored entries, 0 disables eviction
+            readonly: Open an existing file read-only (no WAL switch, no schema
+                creation); only get(key, touch=False) may be used
+
+        Raises:
+            FileNotFoundError: If readonly and the file does not exist
+        """
+        self.path = path or os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("LLM_CACHE_TTL_SECONDS", "604800"))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.readonly = readonly and self.path != ":memory:"
+
+        if self.readonly:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"LLM cache file {self.path} does not exist")
+            uri = f"file:{urllib.parse.quote(os.path.abspath(self.path))}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            return
+
+        if self.path != ":memory:":
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                method TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses(last_access)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: Optional[str],
+        method: str,
+        prompt: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+        temperature: Optional[float] = None
+    ) -> str:
+        """Stable cache key for one call"""
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        schema = json.dumps(json_schema, sort_keys=True) if json_schema is not None else ""
+        raw = "\x1f".join([provider, model or "", method, prompt_hash, schema, repr(temperature)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, touch: bool = True) -> Optional[Any]:
+        """
+        Return the cached response, or None if missing or expired.
+        With touch=False the file is not modified (no access time update, no expiry delete).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                if touch:
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._count -= 1
+                self.misses += 1
+                return None
+            if touch:
+                self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(response)
+
+    def set(self, key: str, response: Any, provider: str = "", model: Optional[str] = None, method: str = ""):
+        """Store a response and evict the least recently used entries past max_entries"""
+        now = time.time()
+        payload = json.dumps(response)
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, provider, model, method, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, method, payload, now, now)
+            )
+            if not exists:
+                self._count += 1
+            if self.max_entries and self._count > self.max_entries:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used ones (caller holds the lock)"""
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE key IN "
+                "(SELECT key FROM llm_responses ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+            self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedInferenceService(AsyncInferenceMixin, BatchInferenceMixin):
+    """
+    Wraps any InferenceServiceProtocol implementation with an LLMResponseCache.
+    Exposes the same protocol as the wrapped service.
+    """
+
+    def __init__(
+        self,
+        service,
+        cache: Optional[LLMResponseCache] = None,
+        mode: Optional[str] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None
+    ):
+        """
+        Args:
+            service: Inference service to wrap
+            cache: Response store (defaults to an LLMResponseCache from the environment,
+                opened read-only unless mode is readwrite; a missing file is an empty
+                cache in readonly mode and a ValueError in replay mode)
+            mode: readwrite, readonly or replay (defaults to LLM_CACHE_MODE)
+            provider: Provider name in the key (defaults to the service class name)
+            model: Model name in the key (defaults to the service's model name)
+            temperature: Sampling temperature in the key, if the service uses a fixed one
+        """
+        self.service = service
+        self.mode = (mode or os.getenv("LLM_CACHE_MODE", "readwrite")).lower()
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"LLM cache mode must be one of {', '.join(CACHE_MODES)}, got '{self.mode}'")
+        self.cache = cache if cache is not None else self._default_cache(self.mode)
+        self.provider = provider or type(service).__name__
+        self.model = model or self._model_name(service)
+        self.temperature = temperature if temperature is not None else getattr(service, "temperature", None)
+
+    @staticmethod
+    def _default_cache(mode: str) -> LLMResponseCache:
+        try:
+            return LLMResponseCache(readonly=mode != "readwrite")
+        except FileNotFoundError as err:
+            if mode == "replay":
+                raise ValueError(f"LLM_CACHE_MODE=replay needs a recorded cache: {err}") from err
+            print(f"⚠️ {err}; the readonly LLM cache starts empty")
+            return LLMResponseCache(":memory:")
+
+    @staticmethod
+    def _model_name(service) -> Optional[str]:
+        model = getattr(service, "model", None)
+        # ModelInferenceService holds a Model object whose name is `model`
+        if model is not None and not isinstance(model, str):
+            model = getattr(model, "model", None)
+        return model if isinstance(model, str) else None
+
+    @staticmethod
+    def _is_error(response: Any) -> bool:
+        return not response
+
+    def _cached(self, method: str, prompt: str, call, json_schema: Optional[Dict[str, Any]] = None):
+        key = self.cache.make_key(self.provider, self.model, method, prompt, json_schema, self.temperature)
+        response = self.cache.get(key, touch=self.mode == "readwrite")
+        if response is not None:
+            return response
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No cached {method} response for {self.provider}/{self.model} (key {key[:12]})")
+
+        response = call()
+        if self.mode == "readwrite" and not self._is_error(response):
+            self.cache.set(key, response, provider=self.provider, model=self.model, method=method)
+        return response
+
+    def _cached_stream(self, method: str, prompt: str, stream, json_schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Replay a hit as one chunk; on a miss pass chunks through and store the full text once complete"""
+        key = self.cache.make_key(self.provider, self.model, method, prompt, json_schema, self.temperature)
+        response = self.cache.get(key, touch=self.mode == "readwrite")
+        if response is not None:
+            yield response
+            return
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No cached {method} response for {self.provider}/{self.model} (key {key[:12]})")
+
+        chunks = []
+        for chunk in stream():
+            chunks.append(chunk)
+            yield chunk
+        text = "".join(chunks)
+        if self.mode == "readwrite" and text:
+            self.cache.set(key, text, provider=self.provider, model=self.model, method=method)
+
+    def get_summary(self, content: str, max_words: int = 100) -> str:
+        return self._cached(
+            f"get_summary:{max_words}", content,
+            lambda: self.service.get_summary(content, max_words)
+        )
+
+    def get_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Dict[str, Any]:
+        return self._cached(
+            "get_structured_output", content,
+            lambda: self.service.get_structured_output(content, json_schema),
+            json_schema=json_schema
+        )
+
+    def get_structured_outputs(
+        self,
+        prompts: List[str],
+        json_schema: Dict[str, Any],
+        mode: Optional[str] = None
+    ) -> List[Any]:
+        """Answer hits from the cache and send only the misses to the wrapped service as one batch"""
+        keys = [
+            self.cache.make_key(self.provider, self.model, "get_structured_output", prompt, json_schema, self.temperature)
+            for prompt in prompts
+        ]
+        results = [self.cache.get(key, touch=self.mode == "readwrite") for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+        if self.mode == "replay":
+            for i in misses:
+                results[i] = LLMCacheMiss(
+                    f"No cached get_structured_output response for {self.provider}/{self.model} (key {keys[i][:12]})"
+                )
+            return results
+
+        answers = structured_outputs(self.service, [prompts[i] for i in misses], json_schema, mode=mode)
+        for i, answer in zip(misses, answers):
+            results[i] = answer
+            if self.mode == "readwrite" and not isinstance(answer, Exception) and not self._is_error(answer):
+                self.cache.set(keys[i], answer, provider=self.provider, model=self.model, method="get_structured_output")
+        return results
+
+    def analyze_intent(self, query: str) -> str:
+        return self._cached("analyze_intent", query, lambda: self.service.analyze_intent(query))
+
+    def chat_completion(self, message: str, context: Optional[str] = None) -> str:
+        prompt = json.dumps([context, message])
+        return self._cached(
+            "chat_completion", prompt,
+            lambda: self.service.chat_completion(message, context)
+        )
+
+    def stream_chat_completion(self, message: str, context: Optional[str] = None) -> Iterator[str]:
+        return self._cached_stream(
+            # Same key as chat_completion: the streamed text is the full completion
+            "chat_completion", json.dumps([context, message]),
+            lambda: self.service.stream_chat_completion(message, context)
+        )
+
+    def stream_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Iterator[str]:
+        return self._cached_stream(
+            "structured_output:stream", content,
+            lambda: self.service.stream_structured_output(content, json_schema),
+            json_schema=json_schema
+        )
+
+
+def with_response_cache(service, **kwargs):
+    """Wrap service in a CachedInferenceService when LLM_CACHE_ENABLED is true"""
+    if os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true":
+        return CachedInferenceService(service, **kwargs)
+    return service
@@ -0,0 +1,88 @@
+"""
+Typed LLM errors
+
+Inference services raise these instead of returning error strings, so a failed
+call cannot be mistaken for model output further down the flow:
+- LLMProviderError: The call did not complete (HTTP status, timeout, connection).
+  `retryable` is True for timeouts, connection failures, 429 and 5xx responses
+- LLMResponseError: The provider answered but the response is unusable
+  (unexpected shape, invalid JSON for a structured call)
+- CircuitOpenError: The provider is skipped because its circuit breaker is open
+- AllProvidersFailedError: Every provider of a RoutingInferenceService failed
+
+LLMError derives from RuntimeError and LLMResponseError also from ValueError, so
+existing `except ValueError` / `except Exception` handlers keep working.
+"""
+
+from typing import List, Optional
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+class LLMError(RuntimeError):
+    """Base class for inference failures"""
+
+    def __init__(self, message: str, provider: Optional[str] = None):
+        super().__init__(f"[{provider}] {message}" if provider else message)
+        self.provider = provider
+
+
+class LLMProviderError(LLMError):
+    """The provider call failed before a usable response was received"""
+
+    def __init__(
+        self,
+        message: str,
+        provider: Optional[str] = None,
+        status_code: Optional[int] = None,
+        retryable: bool = False
+    ):
+        super().__init__(message, provider)
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+class LLMTimeoutError(LLMProviderError):
+    """The provider did not answer in time"""
+
+    def __init__(self, message: str, provider: Optional[str] = None):
+        super().__init__(message, provider, retryable=True)
+
+
+class LLMResponseError(LLMError, ValueError):
+    """The provider answered, but the response could not be used"""
+
+
+class CircuitOpenError(LLMError):
+    """The provider's circuit breaker is open"""
+
+
+class AllProvidersFailedError(LLMError):
+    """Every provider failed; `errors` holds the last error of each"""
+
+    def __init__(self, errors: List[Exception]):
+        summary = "; ".join(str(e) for e in errors) or "no providers available"
+        super().__init__(f"All LLM providers failed: {summary}")
+        self.errors = errors
+
+
+def classify_error(provider: str, err: Exception) -> LLMError:
+    """
+    Map a transport or SDK exception to a typed error. Duck-typed so it covers
+    requests, httpx and the OpenAI SDK without importing them.
+    """
+    if isinstance(err, LLMError):
+        return err
+    name = type(err).__name__
+    response = getattr(err, "response", None)
+    status_code = getattr(err, "status_code", None) or getattr(response, "status_code", None)
+    if isinstance(err, TimeoutError) or "Timeout" in name:
+        return LLMTimeoutError(f"{name}: {err}", provider)
+    if "Connection" in name:
+        return LLMProviderError(f"{name}: {err}", provider, retryable=True)
+    if status_code is not None:
+        return LLMProviderError(
+            f"HTTP {status_code}: {err}", provider,
+            status_code=status_code, retryable=status_code in RETRYABLE_STATUS_CODES
+        )
+    return LLMProviderError(f"{name}: {err}", provider)
@@ -0,0 +1,354 @@
+"""
+Local LLM Stand-in Server
+
+Deterministic replacement for a live LLM in tests and benchmarks. It speaks the
+two protocols the inference services already target:
+1. Ollama `POST /api/chat` (OllamaService), plain JSON or NDJSON streaming
+2. OpenAI-compatible `POST /chat/completions` and `/v1/chat/completions`
+   (Model / ModelInferenceService), plain JSON or SSE streaming
+
+Responses are replayed from recordings keyed by a hash of the chat messages
+(role and content; the volatile "Current Date Time" system message that Model
+adds is ignored). Misses return a configured default response, are forwarded
+to a real upstream and recorded, or fail with HTTP 404. A latency
+distribution is sampled before each response with a seeded RNG, so runs are
+reproducible. Token usage fields are filled in with the local estimator.
+
+Recordings file (JSONL): {"prompt_hash": "...", "response": "..."} per line;
+lines with "messages" instead of "prompt_hash" are hashed on load.
+
+Usage:
+    python -m src.services.llm_stand_in --recordings tests/llm_recordings.jsonl --latency lognormal:-0.5,0.4
+    NLQ_LLM_PROVIDER=ollama LLM_API_BASE=http://127.0.0.1:11435 python scripts/run_nlq_tests.py ...
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .token_usage import estimate_tokens
+
+_VOLATILE_PREFIXES = ("Current Date Time:",)
+
+
+def prompt_hash(messages: Union[str, List[Dict[str, Any]]]) -> str:
+    """Stable hash of a chat request (a plain string is treated as one user message)"""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    parts = [
+        f"{m.get('role', 'user')}\x1f{m.get('content', '')}"
+        for m in messages
+        if not (m.get("role") == "system" and str(m.get("content", "")).startswith(_VOLATILE_PREFIXES))
+    ]
+    return hashlib.sha256("\x1e".join(parts).encode("utf-8")).hexdigest()
+
+
+def parse_latency(spec: Optional[str]) -> Callable[[random.Random], float]:
+    """
+    Latency sampler from a spec string (seconds):
+    fixed:S, uniform:LO,HI, normal:MEAN,STD, lognormal:MU,SIGMA, exponential:MEAN.
+    Negative samples are clamped to 0.
+    """
+    if not spec:
+        return lambda rng: 0.0
+    kind, _, raw = spec.partition(":")
+    try:
+        args = [float(a) for a in raw.split(",")] if raw else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec '{spec}'")
+    samplers = {
+        "fixed": (1, lambda rng: args[0]),
+        "uniform": (2, lambda rng: rng.uniform(args[0], args[1])),
+        "normal": (2, lambda rng: rng.gauss(args[0], args[1])),
+        "lognormal": (2, lambda rng: rng.lognormvariate(args[0], args[1])),
+        "exponential": (1, lambda rng: rng.expovariate(1.0 / args[0]) if args[0] > 0 else 0.0),
+    }
+    if kind not in samplers or len(args) != samplers[kind][0]:
+        raise ValueError(f"Invalid latency spec '{spec}'")
+    sampler = samplers[kind][1]
+    return lambda rng: max(0.0, sampler(rng))
+
+
+class LLMStandInServer:
+    """
+    Threaded HTTP server replaying recorded LLM responses.
+    Use as a context manager or call start()/stop(); `url` is the base URL.
+    """
+
+    def __init__(
+        self,
+        recordings: Optional[str] = None,
+        latency: Optional[str] = None,
+        seed: int = 0,
+        default_response: Optional[str] = None,
+        upstream: Optional[str] = None,
+        record_path: Optional[str] = None,
+        chunk_delay: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Args:
+            recordings: JSONL recordings file to replay
+            latency: Latency distribution spec sampled per request (see parse_latency)
+            seed: RNG seed for the latency distribution
+            default_response: Content returned on a miss (otherwise 404 or upstream)
+            upstream: Base URL of a real server to forward misses to
+            record_path: Append forwarded responses here (defaults to recordings)
+            chunk_delay: Seconds between chunks of a streamed response
+            host: Bind address
+            port: Bind port (0 picks a free port)
+        """
+        self.responses: Dict[str, str] = {}
+        self.latency = parse_latency(latency)
+        self.rng = random.Random(seed)
+        self.default_response = default_response
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.record_path = record_path or recordings
+        self.chunk_delay = chunk_delay
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "forwarded": 0}
+        self._lock = threading.Lock()
+        if recordings and os.path.exists(recordings):
+            self.load(recordings)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def load(self, path: str):
+        """Load JSONL recordings (later lines win)"""
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    key = entry.get("prompt_hash") or prompt_hash(entry["messages"])
+                    self.responses[key] = entry["response"]
+
+    def add_response(self, messages: Union[str, List[Dict[str, Any]]], response: Union[str, Dict[str, Any]]):
+        """Register a response (dicts are stored as JSON text)"""
+        self.responses[prompt_hash(messages)] = response if isinstance(response, str) else json.dumps(response)
+
+    def start(self) -> "LLMStandInServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="llm-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    # --- Request handling ---
+
+    def _lookup(self, path: str, body: Dict[str, Any]) -> Optional[str]:
+        messages = body.get("messages") or []
+        key = prompt_hash(messages)
+        with self._lock:
+            self.stats["requests"] += 1
+            content = self.responses.get(key)
+            if content is not None:
+                self.stats["hits"] += 1
+                return content
+            self.stats["misses"] += 1
+        if self.upstream:
+            content = self._forward(path, body)
+            with self._lock:
+                self.stats["forwarded"] += 1
+                self.responses[key] = content
+                if self.record_path:
+                    with open(self.record_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps({"prompt_hash": key, "response": content}) + "\n")
+            return content
+        return self.default_response
+
+    def _forward(self, path: str, body: Dict[str, Any]) -> str:
+        """Non-streaming call to the upstream server; returns the message content"""
+        request = urllib.request.Request(
+            self.upstream + path,
+            data=json.dumps({**body, "stream": False}).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=300) as response:
+            data = json.loads(response.read())
+        if "message" in data:
+            return data["message"]["content"]
+        return data["choices"][0]["message"]["content"]
+
+    def _sleep_latency(self):
+        with self._lock:
+            delay = self.latency(self.rng)
+        if delay:
+            time.sleep(delay)
+
+    @staticmethod
+    def _chunks(content: str) -> List[str]:
+        """Split content into word-sized chunks that join back to the original"""
+        chunks, start = [], 0
+        for i, ch in enumerate(content):
+            if ch == " " and i > start:
+                chunks.append(content[start:i])
+                start = i
+        chunks.append(content[start:])
+        return [c for c in chunks if c]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start_stream(self, media_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type", media_type)
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    with server._lock:
+                        self._send_json(200, dict(server.stats))
+                elif self.path in ("/api/tags", "/v1/models", "/models"):
+                    self._send_json(200, {"models": [], "data": []})
+                else:
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": "Invalid JSON body"})
+                    return
+                if self.path == "/api/chat":
+                    handler = self._ollama
+                elif self.path in ("/chat/completions", "/v1/chat/completions"):
+                    handler = self._openai
+                else:
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+                    return
+
+                try:
+                    content = server._lookup(self.path, body)
+                except Exception as e:
+                    self._send_json(502, {"error": f"Upstream failed: {e}"})
+                    return
+                if content is None:
+                    self._send_json(404, {"error": f"No recorded response for prompt {prompt_hash(body.get('messages') or [])}"})
+                    return
+                server._sleep_latency()
+                handler(body, content)
+
+            def _usage(self, body: Dict[str, Any], content: str):
+                prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages") or [])
+                return estimate_tokens(prompt), estimate_tokens(content)
+
+            def _ollama(self, body: Dict[str, Any], content: str):
+                prompt_tokens, completion_tokens = self._usage(body, content)
+                model = body.get("model", "stand-in")
+                final = {
+                    "model": model, "done": True,
+                    "prompt_eval_count": prompt_tokens, "eval_count": completion_tokens
+                }
+                if not body.get("stream"):
+                    self._send_json(200, {**final, "message": {"role": "assistant", "content": content}})
+                    return
+                self._start_stream("application/x-ndjson")
+                for chunk in server._chunks(content):
+                    line = {"model": model, "done": False, "message": {"role": "assistant", "content": chunk}}
+                    self.wfile.write((json.dumps(line) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                final["message"] = {"role": "assistant", "content": ""}
+                self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+
+            def _openai(self, body: Dict[str, Any], content: str):
+                prompt_tokens, completion_tokens = self._usage(body, content)
+                model = body.get("model", "stand-in")
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+                if not body.get("stream"):
+                    self._send_json(200, {
+                        "id": "stand-in", "object": "chat.completion", "model": model,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": content}}],
+                        "usage": usage
+                    })
+                    return
+                self._start_stream("text/event-stream")
+                for chunk in server._chunks(content):
+                    event = {"object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": chunk}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                final = {"object": "chat.completion.chunk", "model": model, "choices": [], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic local LLM stand-in (Ollama and OpenAI-compatible)")
+    parser.add_argument("--recordings", help="JSONL recordings to replay")
+    parser.add_argument("--latency", default=None, help="Latency spec, e.g. fixed:0.2 or lognormal:-0.5,0.4")
+    parser.add_argument("--seed", type=int, default=0, help="Latency RNG seed")
+    parser.add_argument("--default-response", default=None, help="Content returned for unrecorded prompts")
+    parser.add_argument("--upstream", default=None, help="Forward misses to this server and record them")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    args = parser.parse_args()
+
+    server = LLMStandInServer(
+        recordings=args.recordings, latency=args.latency, seed=args.seed,
+        default_response=args.default_response, upstream=args.upstream,
+        chunk_delay=args.chunk_delay, host=args.host, port=args.port
+    )
+    print(f"🧪 LLM stand-in listening on {server.url} ({len(server.responses)} recorded responses)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
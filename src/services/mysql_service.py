@@ -1,24 +1,32 @@
 import mysql.connector
 import os
-import logging
+import json
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
+from .audit_log_service import AuditLogWriter
+from ..modules.columnar_result import ColumnarResult
+
 load_dotenv()
 
-# Configure audit logger
-audit_logger = logging.getLogger('mysql_audit')
-audit_logger.setLevel(logging.INFO)
-if not audit_logger.handlers:
-    handler = logging.FileHandler('logs/mysql_audit.log')
-    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-    audit_logger.addHandler(handler)
+# Audit trail is written as JSONL by a background thread, off the query hot path
+audit_writer = AuditLogWriter()
 
 class SecurityError(Exception):
     """Raised when a query violates data governance policies"""
     pass
 
+def quote_identifier(name: str) -> str:
+    """
+    Quote a MySQL identifier (database, table or column name) with backticks.
+    Identifiers cannot be bound as statement parameters, so this is the only
+    safe way to interpolate them into SQL.
+    """
+    return "`" + str(name).replace("`", "``") + "`"
+
 class MySQLService:
     def __init__(self, host=None, user=None, password=None, database=None, governance_service=None):
         """
@@ -58,8 +66,21 @@ class MySQLService:
         
         # Enable/disable governance
         self.governance_enabled = os.getenv("DATA_GOVERNANCE_ENABLED", "true").lower() == "true"
+        # Mask in SQL (sensitive values never leave MySQL) instead of post-processing rows
+        self.masking_pushdown = os.getenv("DATA_MASKING_PUSHDOWN", "false").lower() == "true"
 
-    def execute_query(self, sql: str, asDict: bool = True, schema_context: Optional[Dict] = None):
+        # Prepared statement handles for this connection, keyed by SQL text (LRU)
+        self._prepared: "OrderedDict[str, Any]" = OrderedDict()
+        self.prepared_cache_size = int(os.getenv("PREPARED_STATEMENT_CACHE_SIZE", "64"))
+
+    def execute_query(
+        self,
+        sql: str,
+        asDict: bool = True,
+        schema_context: Optional[Dict] = None,
+        columnar: bool = False,
+        params: Optional[tuple] = None
+    ):
         """
         Execute SQL query with data governance validation and result masking.
         
@@ -67,6 +88,9 @@ class MySQLService:
             sql: SQL query to execute
             asDict: Return results as dictionaries
             schema_context: Optional schema context for governance validation
+            columnar: Return a ColumnarResult (column names plus per-column arrays)
+                instead of rows; takes precedence over asDict
+            params: Values bound to %s placeholders in the SQL
             
         Returns:
             Query results (masked if governance is enabled)
@@ -82,20 +106,36 @@ class MySQLService:
                 self._audit_log("BLOCKED", sql, error_msg)
                 raise SecurityError(error_msg)
         
+        # Optionally rewrite sensitive projections into SQL masking expressions
+        executed_sql, masked_in_sql = sql, False
+        if self.masking_pushdown and self.governance_enabled and self.governance:
+            executed_sql, masked_in_sql = self.governance.mask_sql(sql)
+        
+        started = time.perf_counter()
         try:
+            if columnar:
+                return self._execute_columnar(executed_sql, started, params, audit_sql=sql, masked_in_sql=masked_in_sql)
+
             cursor = self.conn.cursor(dictionary=asDict)
-            cursor.execute(sql)
+            cursor.execute(executed_sql, params)
             if not asDict:
                 headers = [desc[0] for desc in cursor.description]
             result = cursor.fetchall()
             cursor.close()
-            
-            # Audit log successful query
-            self._audit_log("SUCCESS", sql, f"Returned {len(result)} rows")
+            latency_ms = (time.perf_counter() - started) * 1000
             
             # Mask sensitive data in results
+            masked_columns = 0
             if asDict and self.governance_enabled and self.governance:
-                result = self.governance.mask_results(result)
+                masked_columns = self._count_masked_columns(result[0].keys() if result else [])
+                if not masked_in_sql:
+                    result = self.governance.mask_results(result, in_place=True)
+            
+            # Audit log successful query
+            self._audit_log(
+                "SUCCESS", sql, f"Returned {len(result)} rows",
+                latency_ms=latency_ms, row_count=len(result), masked_columns=masked_columns
+            )
             
             if asDict:
                 return result
@@ -104,18 +144,177 @@ class MySQLService:
                 
         except Exception as e:
             # Audit log failed query
-            self._audit_log("ERROR", sql, str(e))
+            self._audit_log("ERROR", sql, str(e), latency_ms=(time.perf_counter() - started) * 1000)
             raise
     
-    def _audit_log(self, status: str, sql: str, message: str):
-        """Log query execution for audit trail"""
+    def execute_prepared(self, sql: str, params: tuple = (), asDict: bool = True, governed: bool = True):
+        """
+        Execute a parameterized statement through a cached server-side prepared statement.
+        The statement is parsed by MySQL once per connection; later calls only bind
+        new parameter values. Use %s placeholders for values and quote_identifier()
+        for identifiers.
+
+        Args:
+            sql: Statement with %s placeholders
+            params: Values to bind
+            asDict: Return rows as dictionaries
+            governed: Apply governance validation and masking. Pass False only for
+                information_schema metadata lookups, whose column names (e.g. COLUMN_KEY)
+                match sensitive keywords but hold no row data
+
+        Returns:
+            Query results (masked if governance is enabled); (rows, headers) if asDict is False
+
+        Raises:
+            SecurityError: If query violates data governance policies
+        """
+        governed = governed and self.governance_enabled and self.governance
+        if governed:
+            is_valid, error_msg = self.governance.validate_query(sql)
+            if not is_valid:
+                self._audit_log("BLOCKED", sql, error_msg)
+                raise SecurityError(error_msg)
+
+        started = time.perf_counter()
         try:
-            audit_logger.info(f"[{status}] SQL: {sql[:200]}... | Message: {message}")
-        except Exception:
-            pass  # Don't fail on logging errors
+            cursor = self._get_prepared_cursor(sql)
+            try:
+                cursor.execute(sql, tuple(params))
+                headers = list(cursor.column_names)
+                rows = [tuple(self._decode(v) for v in row) for row in cursor.fetchall()]
+            except Exception:
+                # Drop the handle; it is re-prepared on the next call
+                self._close_prepared(sql)
+                raise
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            if not asDict:
+                self._audit_log("SUCCESS", sql, f"Returned {len(rows)} rows", latency_ms=latency_ms, row_count=len(rows))
+                return rows, headers
+
+            result = [dict(zip(headers, row)) for row in rows]
+            masked_columns = 0
+            if governed:
+                masked_columns = self._count_masked_columns(headers)
+                result = self.governance.mask_results(result, in_place=True)
+            self._audit_log(
+                "SUCCESS", sql, f"Returned {len(result)} rows",
+                latency_ms=latency_ms, row_count=len(result), masked_columns=masked_columns
+            )
+            return result
+        except Exception as e:
+            self._audit_log("ERROR", sql, str(e), latency_ms=(time.perf_counter() - started) * 1000)
+            raise
+
+    def _get_prepared_cursor(self, sql: str):
+        """Get (or create) the prepared cursor for a statement, evicting the least recently used"""
+        cursor = self._prepared.get(sql)
+        if cursor is not None:
+            self._prepared.move_to_end(sql)
+            return cursor
+        cursor = self.conn.cursor(prepared=True)
+        self._prepared[sql] = cursor
+        while len(self._prepared) > self.prepared_cache_size:
+            _, evicted = self._prepared.popitem(last=False)
+            try:
+                evicted.close()
+            except Exception:
+                pass
+        return cursor
+
+    def _close_prepared(self, sql: Optional[str] = None):
+        """Close one cached prepared statement, or all of them"""
+        keys = [sql] if sql is not None else list(self._prepared.keys())
+        for key in keys:
+            cursor = self._prepared.pop(key, None)
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _decode(value: Any) -> Any:
+        """Binary protocol can return text as bytes; decode it like the text protocol does"""
+        if isinstance(value, (bytes, bytearray)):
+            try:
+                return value.decode("utf-8")
+            except UnicodeDecodeError:
+                return value
+        return value
+
+    def _execute_columnar(
+        self,
+        sql: str,
+        started: float,
+        params: Optional[tuple] = None,
+        audit_sql: Optional[str] = None,
+        masked_in_sql: bool = False
+    ) -> ColumnarResult:
+        """Execute a query and build a column-wise result, masking whole columns"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            result = ColumnarResult.from_cursor(cursor)
+        finally:
+            cursor.close()
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        masked_columns = 0
+        if self.governance_enabled and self.governance:
+            masked_columns = self._count_masked_columns(result.columns)
+            if not masked_in_sql:
+                result = self.governance.mask_columnar(result)
+
+        self._audit_log(
+            "SUCCESS", audit_sql or sql, f"Returned {len(result)} rows",
+            latency_ms=latency_ms, row_count=len(result), masked_columns=masked_columns
+        )
+        return result
+
+    def explain_query(self, sql: str) -> Dict[str, Any]:
+        """
+        Get the MySQL query plan for a query without executing it.
+
+        Args:
+            sql: SQL query to explain
+
+        Returns:
+            Parsed EXPLAIN FORMAT=JSON plan
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"EXPLAIN FORMAT=JSON {sql.strip().rstrip(';')}")
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        return json.loads(row[0]) if row else {}
+
+    def _count_masked_columns(self, columns) -> int:
+        """Count result columns that governance will mask"""
+        return sum(
+            1 for key in columns
+            if self.governance.is_partial_mask_column(key) or self.governance.is_sensitive_column(key)
+        )
+
+    def _audit_log(
+        self,
+        status: str,
+        sql: str,
+        message: str,
+        latency_ms: Optional[float] = None,
+        row_count: Optional[int] = None,
+        masked_columns: Optional[int] = None
+    ):
+        """Queue an audit record (non-blocking, never raises)"""
+        audit_writer.log(
+            status, sql, message,
+            latency_ms=latency_ms, row_count=row_count, masked_columns=masked_columns
+        )
     
     def run_sql(self, sql):
         return self.conn.info_query(sql)
     
     def shutdown(self):
+        self._close_prepared()
         self.conn.close()
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from src.modules.semantic_graph import SemanticGraph
 from src.services.inference import GeminiService, InferenceServiceProtocol, ModelInferenceService
 from src.services.vector_service import GraphVectorService
@@ -71,11 +71,45 @@ class NLQIntentAnalyzer:
         refined = self.model.chat_completion(prompt)
         return refined.strip()
 
-    def analyze_intent(self, user_query: str, graph: SemanticGraph) -> Optional[Dict[str, Any]]:
+    def retrieve_nodes(self, user_query: str, graph: SemanticGraph) -> List[str]:
+        """
+        Candidate graph nodes for the intent prompt: the vector search hits when
+        a vector service is set, otherwise every node. Does not call the LLM, so
+        the flow runs it in parallel with query refinement.
+        """
+        return [node_id for node_id, _ in self.retrieve_nodes_with_distances(user_query, graph)]
+
+    def retrieve_nodes_with_distances(self, user_query: str, graph: SemanticGraph) -> List[Tuple[str, Optional[float]]]:
+        """
+        Like retrieve_nodes, as (node_id, distance) pairs best first. The
+        distance is None when no vector service is set.
+        """
+        if self.vector_service:
+            # Use vector service to filter relevant nodes
+            # We assume the graph has been indexed previously
+            scored_nodes = self.vector_service.search_nodes_with_distances(user_query, k=16)
+            node_names = [node_id for node_id, _ in scored_nodes]
+            print(f"Filtered graph nodes using Vector DB. Retained {len(node_names)} nodes.")
+            print(f"Nodes: {', '.join(node_names)}")
+            return scored_nodes
+        return [(node_id, None) for node_id in graph.node_properties.keys()]
+
+    def analyze_intent(
+        self,
+        user_query: str,
+        graph: SemanticGraph,
+        node_names: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Analyze the user query and extract start_node, end_node, and condition
         for semantic graph path search.
 
+        Args:
+            user_query: Query to analyze
+            graph: The semantic graph
+            node_names: Candidate nodes retrieved beforehand (see retrieve_nodes);
+                retrieved from user_query when omitted
+
         Returns:
             dict with keys: start_node, end_node, condition
             or None if extraction fails.
@@ -101,28 +135,21 @@ class NLQIntentAnalyzer:
         }
 
         # Optionally, provide node names/types as context for Gemini
-        if self.vector_service:
-            # Use vector service to filter relevant nodes
-            # We assume the graph has been indexed previously
-            refined_query = user_query
-
-            node_names = self.vector_service.search_nodes(refined_query, k=16)
-            nodes_with_properties = [
-                self._format_node_context(node, graph)
-                for node in node_names
-            ]
-            print(f"Filtered graph nodes using Vector DB. Retained {len(node_names)} nodes.")
-            print(f"Nodes: {', '.join(node_names)}")
-        else:
-            node_names = list(graph.node_properties.keys())
-            nodes_with_properties = [
-                self._format_node_context(node, graph)
-                for node in node_names
-            ]
+        if node_names is None:
+            node_names = self.retrieve_nodes(user_query, graph)
+        nodes_with_properties = [
+            self._format_node_context(node, graph)
+            for node in node_names
+        ]
             
+        # Literals of the query that are known values of categorical columns
+        value_index = graph.value_index()
+        known_values = value_index.describe(value_index.find_in_text(user_query))
+        
         context = (
             "Available nodes in the schema graph:\n" +
             "\n".join(nodes_with_properties) +
+            (f"\n\nKnown column values mentioned in the query:\n{known_values}" if known_values else "") +
             "\n\nGiven the following user query, extract the start_node, end_node, and condition for a path search."
         )
 
@@ -0,0 +1,338 @@
+"""
+Query Pagination Service
+
+Pages through the results of an already-generated SQL query without re-running
+intent extraction or SQL generation:
+1. The first page runs the generated SQL with LIMIT page_size + 1 (never past
+   a LIMIT the generated SQL already has)
+2. The SQL and paging position are kept server-side for a short time behind an
+   opaque cursor token returned to the client
+3. Follow-up pages use keyset (seek) pagination on the ORDER BY columns when they
+   are unqualified names of unique output columns with a uniform direction, and
+   fall back to OFFSET otherwise (expressions, qualified keys, star or repeated
+   output names, mixed directions, NULL, string or masked sort keys, several
+   DESC keys)
+4. MySQL sorts NULLs first ascending and last descending, so a DESC key also
+   seeks into the NULL rows after the last value. Tied rows already returned are
+   skipped by comparing keys in Python, which is why string keys (compared by
+   the column collation in MySQL) use OFFSET
+"""
+
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from src.modules.sql_parser import parse_sql
+
+
+class PaginationError(Exception):
+    """Raised when a cursor token is unknown or expired"""
+    pass
+
+
+class QueryServiceProtocol(Protocol):
+    """Protocol for services that execute parameterized SQL"""
+    def execute_query(self, sql: str, asDict: bool = True, schema_context: Optional[Dict] = None,
+                      columnar: bool = False, params: Optional[tuple] = None) -> Any: ...
+
+
+class QueryPaginator:
+    """
+    Cursor-based pagination over generated SQL with a short-lived in-memory store.
+    """
+
+    def __init__(
+        self,
+        query_service: QueryServiceProtocol,
+        ttl_seconds: Optional[float] = None,
+        max_cursors: Optional[int] = None,
+        max_page_size: Optional[int] = None
+    ):
+        """
+        Initialize paginator.
+
+        Args:
+            query_service: Service used to execute page queries (e.g. MySQLService)
+            ttl_seconds: How long a cursor stays valid
+            max_cursors: Maximum cursors kept in memory (oldest evicted first)
+            max_page_size: Upper bound on the requested page size
+        """
+        self.query_service = query_service
+        self.ttl_seconds = ttl_seconds or float(os.getenv("PAGINATION_CURSOR_TTL", "300"))
+        self.max_cursors = max_cursors or int(os.getenv("PAGINATION_MAX_CURSORS", "1000"))
+        self.max_page_size = max_page_size or int(os.getenv("PAGINATION_MAX_PAGE_SIZE", "1000"))
+        self._cursors: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def first_page(self, sql: str, page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Run the first page of a generated query.
+
+        Args:
+            sql: Generated SQL
+            page_size: Rows per page
+
+        Returns:
+            Tuple of (rows, next_cursor); next_cursor is None on the last page
+        """
+        page_size = self._clamp_page_size(page_size)
+        base_sql = self._strip_terminator(sql)
+        body, limit, base_offset = self._split_limit(base_sql)
+
+        state = {
+            "sql": base_sql,
+            "body": body,
+            "limit": limit,
+            "base_offset": base_offset,
+            "page_size": page_size,
+            "offset": 0,
+            "columns": [],
+            "order_by": self._parse_order_by(body)
+        }
+        rows = self._offset_page(state)
+        state["columns"] = list(rows[0].keys()) if rows else []
+        return self._finish_page(state, rows)
+
+    def next_page(self, cursor: str) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
+        """
+        Fetch the page a cursor points to.
+
+        Args:
+            cursor: Token returned with the previous page
+
+        Returns:
+            Tuple of (sql, rows, next_cursor)
+
+        Raises:
+            PaginationError: If the cursor is unknown or expired
+        """
+        state = self._get_cursor(cursor)
+        keyset = self._keyset_clause(state)
+        columns = ", ".join(f"`{col}`" for col in state["columns"])
+        inner = self._escape(state["sql"])
+
+        if keyset:
+            predicate, order, params = keyset
+            skip = state["ties"]
+            page_sql = (
+                f"SELECT {columns} FROM ({inner}) AS _page "
+                f"WHERE {predicate} ORDER BY {order} LIMIT %s"
+            )
+            rows = self.query_service.execute_query(page_sql, params=params + (skip + state["page_size"] + 1,))
+            rows = rows[skip:]
+            print(f"📄 Keyset page after {state['last_key']} (skipped {skip} tied rows)")
+        else:
+            rows = self._offset_page(state)
+            print(f"📄 Offset page at {state['offset']}")
+
+        return state["sql"], *self._finish_page(state, rows)
+
+    def _offset_page(self, state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Run the query body with LIMIT/OFFSET, honouring any LIMIT in the original SQL.
+        The body is executed as generated so governance validates the real projection.
+        """
+        count = state["page_size"] + 1
+        if state["limit"] is not None:
+            count = min(count, state["limit"] - state["offset"])
+            if count <= 0:
+                return []
+        page_sql = f"{self._escape(state['body'])} LIMIT %s OFFSET %s"
+        return self.query_service.execute_query(
+            page_sql, params=(count, state["base_offset"] + state["offset"])
+        )
+
+    def _finish_page(self, state: Dict[str, Any], rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Trim the look-ahead row and store a cursor for the next page"""
+        page_size = state["page_size"]
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if not has_more:
+            return rows, None
+
+        new_state = dict(state)
+        new_state["offset"] = state["offset"] + len(rows)
+        keys = self._order_key_columns(state)
+        if keys:
+            last_key = tuple(rows[-1][col] for col in keys)
+            ties = sum(1 for row in rows if tuple(row[col] for col in keys) == last_key)
+            if last_key == state.get("last_key"):
+                ties += state.get("ties", 0)
+            new_state["last_key"] = last_key
+            new_state["ties"] = ties
+        return rows, self._store_cursor(new_state)
+
+    def _order_key_columns(self, state: Dict[str, Any]) -> Optional[List[str]]:
+        """Result column names usable as a keyset, or None to use OFFSET"""
+        order_by = state.get("order_by")
+        if not order_by or not state["columns"]:
+            return None
+        if len({direction for _, direction in order_by}) != 1:
+            return None
+
+        # The keyset page selects the result columns by name from a derived
+        # table, so every key must be one of the (unique) projection names
+        names = self._projection_names(state["body"])
+        if names is None:
+            return None
+        keys = []
+        for expr, _ in order_by:
+            if expr.isdigit():
+                index = int(expr) - 1
+                if index < 0 or index >= len(names):
+                    return None
+                name = names[index]
+            else:
+                # Qualified keys (u.id) may name a column the projection does not output
+                match = re.fullmatch(r'`?(\w+)`?', expr)
+                if not match:
+                    return None
+                name = match.group(1)
+            if name not in names or name not in state["columns"]:
+                return None
+            keys.append(name)
+
+        # Masked values cannot be used to seek
+        governance = getattr(self.query_service, "governance", None)
+        if governance and getattr(self.query_service, "governance_enabled", True):
+            if any(governance.is_partial_mask_column(k) or governance.is_sensitive_column(k) for k in keys):
+                return None
+        return keys
+
+    @staticmethod
+    def _projection_names(body: str) -> Optional[List[str]]:
+        """
+        Output column names of the query, or None when they are unknown (star
+        projections) or repeated, which a derived table rejects (MySQL error 1060)
+        """
+        query = parse_sql(body)
+        if not query.selects or any(item.is_star for item in query.selects[0].items):
+            return None
+        names = [item.output_name for item in query.selects[0].items]
+        if len({name.lower() for name in names}) != len(names):
+            return None
+        return names
+
+    def _keyset_clause(self, state: Dict[str, Any]) -> Optional[Tuple[str, str, tuple]]:
+        """Build (WHERE predicate, ORDER BY, params) for a keyset page"""
+        keys = self._order_key_columns(state)
+        last_key = state.get("last_key")
+        if not keys or last_key is None:
+            return None
+        # Ties are matched with Python equality, not the column collation
+        if any(value is None or isinstance(value, (str, bytes)) for value in last_key):
+            return None
+        direction = state["order_by"][0][1]
+        order = ", ".join(f"`{col}` {direction}" for col in keys)
+        if direction == "ASC":
+            # NULLs sort first, so they were all on earlier pages
+            cols = ", ".join(f"`{col}`" for col in keys)
+            placeholders = ", ".join(["%s"] * len(keys))
+            return f"({cols}) >= ({placeholders})", order, tuple(last_key)
+        # NULLs sort last and never match a comparison; with several keys they
+        # can also follow inside a group of equal leading keys
+        if len(keys) > 1:
+            return None
+        return f"(`{keys[0]}` <= %s OR `{keys[0]}` IS NULL)", order, tuple(last_key)
+
+    def _parse_order_by(self, body: str) -> Optional[List[Tuple[str, str]]]:
+        """Parse the top-level ORDER BY clause into (expression, direction) pairs"""
+        depth = 0
+        position = None
+        upper = body.upper()
+        for i, ch in enumerate(body):
+            if ch == '(':
+                depth += 1
+            elif ch == ')':
+                depth -= 1
+            elif (depth == 0 and upper.startswith("ORDER", i)
+                    and (i == 0 or not (body[i - 1].isalnum() or body[i - 1] in '_`'))
+                    and re.match(r'ORDER\s+BY\b', upper[i:])):
+                position = i
+        if position is None:
+            return None
+
+        clause = re.sub(r'^ORDER\s+BY\s+', '', body[position:], flags=re.IGNORECASE).strip()
+        items = []
+        for item in self._split_top_level(clause):
+            match = re.fullmatch(r'(.+?)(?:\s+(ASC|DESC))?', item.strip(), re.IGNORECASE | re.DOTALL)
+            if not match:
+                return None
+            items.append((match.group(1).strip(), (match.group(2) or "ASC").upper()))
+        return items or None
+
+    def _split_limit(self, sql: str) -> Tuple[str, Optional[int], int]:
+        """Split off a trailing top-level LIMIT clause into (body, limit, offset)"""
+        match = re.search(
+            r'\s+LIMIT\s+(\d+)(?:\s*,\s*(\d+)|\s+OFFSET\s+(\d+))?\s*$', sql, re.IGNORECASE
+        )
+        if not match:
+            return sql, None, 0
+        head = sql[:match.start()]
+        if head.count('(') != head.count(')'):
+            return sql, None, 0
+        if match.group(2) is not None:
+            # LIMIT offset, count
+            return head, int(match.group(2)), int(match.group(1))
+        return head, int(match.group(1)), int(match.group(3) or 0)
+
+    @staticmethod
+    def _split_top_level(clause: str) -> List[str]:
+        """Split on commas outside parentheses"""
+        parts, depth, current = [], 0, []
+        for ch in clause:
+            if ch == '(':
+                depth += 1
+            elif ch == ')':
+                depth -= 1
+            if ch == ',' and depth == 0:
+                parts.append("".join(current))
+                current = []
+            else:
+                current.append(ch)
+        parts.append("".join(current))
+        return [p for p in parts if p.strip()]
+
+    @staticmethod
+    def _strip_terminator(sql: str) -> str:
+        return sql.strip().rstrip(';').strip()
+
+    @staticmethod
+    def _escape(sql: str) -> str:
+        """Escape literal % signs so the SQL can be combined with bound parameters"""
+        return sql.replace('%', '%%')
+
+    def _clamp_page_size(self, page_size: int) -> int:
+        page_size = int(page_size)
+        if page_size <= 0:
+            raise ValueError("page_size must be a positive integer")
+        return min(page_size, self.max_page_size)
+
+    def _store_cursor(self, state: Dict[str, Any]) -> str:
+        """Store paging state and return a new cursor token"""
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._evict_expired()
+            self._cursors[token] = {"state": state, "expires_at": time.monotonic() + self.ttl_seconds}
+            while len(self._cursors) > self.max_cursors:
+                self._cursors.popitem(last=False)
+        return token
+
+    def _get_cursor(self, token: str) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_expired()
+            entry = self._cursors.get(token)
+        if entry is None:
+            raise PaginationError("Unknown or expired cursor. Please re-run the query.")
+        return entry["state"]
+
+    def _evict_expired(self):
+        """Drop expired cursors. Caller holds the lock."""
+        now = time.monotonic()
+        expired = [token for token, entry in self._cursors.items() if entry["expires_at"] <= now]
+        for token in expired:
+            del self._cursors[token]
@@ -0,0 +1,162 @@
+"""
+Query Plan Cache
+
+In-memory cache of what the flow derived for a question, so repeats skip
+refinement, retrieval, intent extraction, path finding and SQL generation
+and go straight to the cost check and execution:
+1. Questions are keyed by a normalized form: case, punctuation, whitespace and
+   filler words ("please", "show me", "the", ...) are ignored, so
+   "Top 10 sellers by revenue?" and "top 10 sellers by revenue" share an entry.
+   Numbers (with their sign), comparison operators, negations and connectives
+   are kept
+2. Entries hold the intent, the join path and the final (executed) SQL
+3. Entries expire after a TTL and the least recently used ones are evicted past
+   a size bound
+4. Entries belong to one graph snapshot (graph object and version); when the
+   graph changes, the whole cache is dropped on the next access
+
+Configuration (environment variables):
+- QUERY_CACHE_ENABLED: Serve repeated questions from the cache (default true)
+- QUERY_CACHE_MAX_ENTRIES: Maximum cached questions (default 1000)
+- QUERY_CACHE_TTL_SECONDS: Entry lifetime, 0 keeps entries until evicted (default 3600)
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Phrasing that does not change what is asked
+FILLER_WORDS = frozenset("""
+a an the please kindly me us i we you can could would will show list give get find display tell
+what whats is are was were there do does did
+""".split())
+
+# "amount > 100" and "amount < 100" ask for different rows
+COMPARISON_OPERATOR = re.compile(r"(<=|>=|!=|<>|<|>|=)")
+
+_WORD = re.compile(r"(?<![a-z0-9.])-[0-9]+(?:\.[0-9]+)?|[a-z0-9]+(?:\.[0-9]+)?|<=|>=|!=|<>|<|>|=")
+
+
+def normalize_operator(operator: str) -> str:
+    """Single spelling for operators with two ("<>" and "!=")"""
+    return "!=" if operator == "<>" else operator
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cased words, signed numbers and comparison operators without punctuation and filler words, single-spaced"""
+    words = _WORD.findall(query.lower().replace("'", ""))
+    return " ".join(normalize_operator(word) for word in words if word not in FILLER_WORDS)
+
+
+class QueryPlanCache:
+    """LRU + TTL cache of intent, path and SQL per normalized question and graph snapshot"""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        clock=time.monotonic
+    ):
+        """
+        Args:
+            enabled: Serve and store entries (defaults to QUERY_CACHE_ENABLED)
+            max_entries: Maximum cached questions, least recently used evicted first
+            ttl_seconds: Entry lifetime in seconds, 0 keeps entries until evicted
+            clock: Time source, injectable for tests
+        """
+        self.enabled = enabled if enabled is not None else os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+        self.max_entries = max_entries or int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._snapshot = None
+        self._counts = {"hit": 0, "miss": 0, "invalidated": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _graph_snapshot(graph) -> Tuple[int, int]:
+        return (id(graph), graph.version)
+
+    def _check_snapshot(self, graph):
+        """Drop every entry if the graph changed since they were stored (lock held)"""
+        snapshot = self._graph_snapshot(graph)
+        if snapshot != self._snapshot:
+            if self._entries:
+                print(f"🗑️ Query cache invalidated: graph changed ({len(self._entries)} entries dropped)")
+                self._counts["invalidated"] += 1
+            self._entries.clear()
+            self._snapshot = snapshot
+
+    def get(self, query: str, graph) -> Optional[Dict[str, Any]]:
+        """
+        Cached plan of a question for the current graph snapshot.
+
+        Returns:
+            {"intent": {...}, "path": [...], "sql": str} or None on a miss
+        """
+        if not self.enabled:
+            return None
+        key = normalize_query(query)
+        with self._lock:
+            self._check_snapshot(graph)
+            entry = self._entries.get(key)
+            if entry and self.ttl_seconds and self._clock() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._counts["miss"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts["hit"] += 1
+            return dict(entry[1])
+
+    def put(self, query: str, graph, intent: Dict[str, Any], path: list, sql: str):
+        """Store the plan that produced working SQL for a question"""
+        key = normalize_query(query)
+        # Questions made only of filler words would all share one key
+        if not self.enabled or not key:
+            return
+        plan = {"intent": dict(intent), "path": list(path), "sql": sql}
+        with self._lock:
+            self._check_snapshot(graph)
+            self._entries[key] = (self._clock(), plan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._snapshot = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Hit and miss counts, hit rate and current size"""
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._entries)
+        lookups = counts["hit"] + counts["miss"]
+        return {**counts, "entries": size, "hit_rate": counts["hit"] / lookups if lookups else 0.0}
+
+    def to_prometheus(self) -> str:
+        """Counters in the Prometheus text exposition format"""
+        stats = self.snapshot()
+        return "\n".join([
+            "# HELP nlq_query_cache_lookups_total Query plan cache lookups",
+            "# TYPE nlq_query_cache_lookups_total counter",
+            f'nlq_query_cache_lookups_total{{result="hit"}} {stats["hit"]}',
+            f'nlq_query_cache_lookups_total{{result="miss"}} {stats["miss"]}',
+            "# HELP nlq_query_cache_invalidations_total Query plan cache drops on graph changes",
+            "# TYPE nlq_query_cache_invalidations_total counter",
+            f"nlq_query_cache_invalidations_total {stats['invalidated']}",
+            "# HELP nlq_query_cache_entries Cached questions",
+            "# TYPE nlq_query_cache_entries gauge",
+            f"nlq_query_cache_entries {stats['entries']}",
+        ]) + "\n"
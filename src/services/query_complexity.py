@@ -0,0 +1,172 @@
+"""
+Query Complexity Classifier
+
+Decides whether a query needs the analyst refinement LLM call or can go
+straight to intent extraction:
+1. Prescreen (no I/O): long queries, multi-step or comparative wording
+   ("per", "compare", "top", "trend", ...), several conditions ("and", "or",
+   negations) and vague references ("it", "those", "stuff") mark a query as
+   complex. Complex queries are refined in parallel with vector retrieval
+2. Confidence check for prescreened-simple queries, from the vector search
+   distances: the best hit must be close enough and the top hits must stay
+   within a few tables. Otherwise the query is refined after retrieval
+3. Every decision is counted by reason, and skipped queries that later needed
+   an SQL correction are counted too, so thresholds can be tuned from the hit
+   rate (snapshot) or the /metrics endpoint (to_prometheus)
+
+Configuration (environment variables):
+- REFINE_SKIP_ENABLED: Allow skipping refinement (default true)
+- REFINE_SKIP_MAX_WORDS: Longest query considered simple (default 12)
+- REFINE_SKIP_MAX_DISTANCE: Largest vector distance of the best hit (default 0.8)
+- REFINE_SKIP_MAX_TABLES: Most distinct tables among the top hits (default 2)
+- REFINE_SKIP_TOP_K: Hits inspected for the table spread (default 5)
+"""
+
+import os
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Wording that implies grouping, comparison, ranking or time arithmetic
+COMPLEX_TERMS = (
+    "per", "each", "every", "compare", "compared", "comparison", "versus", "vs",
+    "trend", "growth", "ratio", "percent", "percentage", "share", "rank", "ranking",
+    "top", "bottom", "most", "least", "highest", "lowest", "best", "worst",
+    "between", "except", "without", "never", "not", "both", "either",
+    "previous", "prior", "cumulative", "running", "median", "distribution",
+    "over", "since", "change", "difference",
+)
+# Connectives that add a second condition
+CONNECTIVES = ("and", "or", "but", "while", "whereas", "which", "who", "that")
+# References that only make sense with context the query does not carry
+VAGUE_TERMS = ("it", "they", "them", "those", "these", "this", "stuff", "things", "something", "etc")
+
+_WORD = re.compile(r"[a-z0-9_']+")
+
+
+class QueryComplexityClassifier:
+    """Heuristic plus vector-confidence classifier with decision counters"""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        max_words: Optional[int] = None,
+        max_distance: Optional[float] = None,
+        max_tables: Optional[int] = None,
+        top_k: Optional[int] = None
+    ):
+        """
+        Args:
+            enabled: Allow skipping refinement (defaults to REFINE_SKIP_ENABLED)
+            max_words: Longest query considered simple
+            max_distance: Largest vector distance of the best hit for a confident match
+            max_tables: Most distinct tables among the top hits
+            top_k: Hits inspected for the table spread
+        """
+        self.enabled = enabled if enabled is not None else os.getenv("REFINE_SKIP_ENABLED", "true").lower() == "true"
+        self.max_words = max_words or int(os.getenv("REFINE_SKIP_MAX_WORDS", "12"))
+        self.max_distance = max_distance if max_distance is not None else float(os.getenv("REFINE_SKIP_MAX_DISTANCE", "0.8"))
+        self.max_tables = max_tables or int(os.getenv("REFINE_SKIP_MAX_TABLES", "2"))
+        self.top_k = top_k or int(os.getenv("REFINE_SKIP_TOP_K", "5"))
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._corrected_after_skip = 0
+        # Best-hit distances of prescreened-simple queries, for threshold tuning
+        self._distances = deque(maxlen=500)
+        self._lock = threading.Lock()
+
+    def prescreen(self, query: str) -> Dict[str, Any]:
+        """
+        Heuristic pass. Returns {"simple": bool, "reasons": [...]}; a simple
+        verdict still needs check_confidence before refinement is skipped.
+        """
+        if not self.enabled:
+            return {"simple": False, "reasons": ["disabled"]}
+        words = _WORD.findall(query.lower())
+        reasons = []
+        if len(words) > self.max_words:
+            reasons.append("long_query")
+        if any(word in COMPLEX_TERMS for word in words):
+            reasons.append("complex_terms")
+        if any(word in CONNECTIVES for word in words) or "," in query:
+            reasons.append("multiple_conditions")
+        if any(word in VAGUE_TERMS for word in words):
+            reasons.append("vague_reference")
+        return {"simple": not reasons, "reasons": reasons}
+
+    def check_confidence(self, scored_nodes: Sequence[Tuple[str, Optional[float]]]) -> Dict[str, Any]:
+        """
+        Vector pass over (node_id, distance) hits, best first.
+        Returns {"simple": bool, "reasons": [...], "top_distance": float | None}.
+        """
+        distances = [distance for _, distance in scored_nodes if distance is not None]
+        if not distances:
+            return {"simple": False, "reasons": ["no_vector_scores"], "top_distance": None}
+        top_distance = distances[0]
+        with self._lock:
+            self._distances.append(top_distance)
+        reasons = []
+        if top_distance > self.max_distance:
+            reasons.append("low_confidence")
+        tables = {node_id.split(".")[0] for node_id, _ in scored_nodes[:self.top_k]}
+        if len(tables) > self.max_tables:
+            reasons.append("ambiguous_tables")
+        return {"simple": not reasons, "reasons": reasons, "top_distance": top_distance}
+
+    # --- Hit-rate accounting ---
+
+    def record(self, skipped: bool, reasons: List[str]):
+        """Count one routing decision (the first reason labels refined queries)"""
+        key = ("skipped", "simple") if skipped else ("refined", reasons[0] if reasons else "unknown")
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def record_correction_after_skip(self):
+        """A query whose refinement was skipped needed an SQL correction"""
+        with self._lock:
+            self._corrected_after_skip += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Decision counts, skip hit rate and best-hit distance quantiles"""
+        with self._lock:
+            counts = dict(self._counts)
+            corrected = self._corrected_after_skip
+            distances = sorted(self._distances)
+        total = sum(counts.values())
+        skipped = counts.get(("skipped", "simple"), 0)
+        quantiles = {}
+        if distances:
+            for q in (50, 90):
+                quantiles[f"p{q}"] = distances[min(len(distances) - 1, len(distances) * q // 100)]
+        return {
+            "queries": total,
+            "skipped": skipped,
+            "skip_rate": skipped / total if total else 0.0,
+            "corrected_after_skip": corrected,
+            "refined_by_reason": {reason: n for (decision, reason), n in counts.items() if decision == "refined"},
+            "top_distance": quantiles,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._corrected_after_skip = 0
+            self._distances.clear()
+
+    def to_prometheus(self) -> str:
+        """Counters in the Prometheus text exposition format"""
+        with self._lock:
+            counts = sorted(self._counts.items())
+            corrected = self._corrected_after_skip
+        lines = [
+            "# HELP nlq_refine_decisions_total Query refinement routing decisions",
+            "# TYPE nlq_refine_decisions_total counter",
+        ]
+        for (decision, reason), n in counts:
+            lines.append(f'nlq_refine_decisions_total{{decision="{decision}",reason="{reason}"}} {n}')
+        lines += [
+            "# HELP nlq_refine_skipped_corrected_total Skipped-refinement queries that needed SQL correction",
+            "# TYPE nlq_refine_skipped_corrected_total counter",
+            f"nlq_refine_skipped_corrected_total {corrected}",
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,241 @@
+"""
+Query Cost Guard
+
+Runs a pre-flight `EXPLAIN FORMAT=JSON` on generated SQL before it reaches the
+database and decides whether the query is cheap enough to execute:
+1. Estimate the number of rows MySQL will examine across all joined tables
+2. Detect full table scans on tables above a size threshold
+3. Pick an action for expensive queries: reject, append a LIMIT, or send the
+   query back to the LLM for correction with the plan as feedback
+
+Table sizes come from the profiled `row_count` stored on table nodes of the
+semantic graph, falling back to the optimizer estimate when no profile exists.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from src.modules.semantic_graph import SemanticGraph
+from src.modules.sql_parser import parse_sql
+
+
+class ExplainServiceProtocol(Protocol):
+    """Protocol for services that can return an EXPLAIN plan"""
+    def explain_query(self, sql: str) -> Dict[str, Any]: ...
+
+
+class QueryCostGuard:
+    """
+    Pre-flight cost check for generated SQL based on the MySQL query plan.
+    """
+
+    ACTIONS = ("reject", "limit", "correct")
+
+    def __init__(
+        self,
+        explain_service: ExplainServiceProtocol,
+        graph: Optional[SemanticGraph] = None,
+        enabled: Optional[bool] = None,
+        max_rows_examined: Optional[int] = None,
+        full_scan_threshold: Optional[int] = None,
+        action: Optional[str] = None,
+        auto_limit: Optional[int] = None
+    ):
+        """
+        Initialize the cost guard.
+
+        Args:
+            explain_service: Service exposing explain_query (e.g. MySQLService)
+            graph: Semantic graph with profiled row counts on table nodes
+            enabled: Enable the guard (defaults to QUERY_COST_GUARD_ENABLED)
+            max_rows_examined: Maximum estimated rows examined before acting
+            full_scan_threshold: Table size above which a full scan is flagged
+            action: What to do with expensive queries: reject, limit or correct
+            auto_limit: Row limit appended when action is "limit"
+        """
+        self.explain_service = explain_service
+        self.graph = graph
+
+        if enabled is None:
+            enabled = os.getenv("QUERY_COST_GUARD_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        self.max_rows_examined = max_rows_examined if max_rows_examined is not None else int(os.getenv("QUERY_COST_MAX_ROWS", "1000000"))
+        self.full_scan_threshold = full_scan_threshold if full_scan_threshold is not None else int(os.getenv("QUERY_COST_FULL_SCAN_THRESHOLD", "100000"))
+        self.action = (action or os.getenv("QUERY_COST_ACTION", "correct")).lower()
+        self.auto_limit = auto_limit if auto_limit is not None else int(os.getenv("QUERY_COST_AUTO_LIMIT", "1000"))
+
+        if self.action not in self.ACTIONS:
+            raise ValueError(f"Unknown query cost action '{self.action}'. Expected one of {self.ACTIONS}.")
+
+    def estimate(self, sql: str) -> Dict[str, Any]:
+        """
+        Run EXPLAIN on a query and summarize its cost.
+
+        Args:
+            sql: SQL query to estimate
+
+        Returns:
+            Dict with rows_examined, full_scans (table, alias, rows) and the raw plan
+        """
+        plan = self.explain_service.explain_query(sql)
+        aliases = self._extract_table_aliases(sql)
+
+        rows_examined = 0
+        full_scans = []
+        for table in self._iter_plan_tables(plan):
+            alias = table.get("table_name", "")
+            table_name = aliases.get(alias.lower(), alias)
+            per_scan = self._to_number(table.get("rows_examined_per_scan"))
+            loops = table.get("_loops", 1)
+            rows_examined += per_scan * loops
+
+            if table.get("access_type") == "ALL":
+                table_rows = self._profiled_row_count(table_name)
+                if table_rows is None:
+                    table_rows = per_scan
+                if table_rows >= self.full_scan_threshold:
+                    full_scans.append({"table": table_name, "alias": alias, "rows": table_rows})
+
+        return {
+            "rows_examined": int(rows_examined),
+            "full_scans": full_scans,
+            "plan": plan
+        }
+
+    def check(self, sql: str) -> Dict[str, Any]:
+        """
+        Decide what to do with a query before it is executed.
+
+        Args:
+            sql: SQL query to check
+
+        Returns:
+            Dict with keys:
+            - verdict: "ok", "reject", "limit" or "correct"
+            - sql: SQL to execute (LIMIT appended when verdict is "limit")
+            - reason: Human-readable explanation, None when ok
+            - estimate: Output of estimate(), None when the guard is disabled
+        """
+        if not self.enabled:
+            return {"verdict": "ok", "sql": sql, "reason": None, "estimate": None}
+
+        try:
+            estimate = self.estimate(sql)
+        except Exception as e:
+            # Plans for invalid SQL fail here; leave it to execution and correction
+            print(f"⚠️  EXPLAIN failed, skipping cost guard: {e}")
+            return {"verdict": "ok", "sql": sql, "reason": None, "estimate": None}
+
+        problems = []
+        if estimate["rows_examined"] > self.max_rows_examined:
+            problems.append(
+                f"estimated {estimate['rows_examined']} rows examined "
+                f"(limit {self.max_rows_examined})"
+            )
+        for scan in estimate["full_scans"]:
+            problems.append(f"full table scan on '{scan['table']}' ({scan['rows']} rows)")
+
+        if not problems:
+            return {"verdict": "ok", "sql": sql, "reason": None, "estimate": estimate}
+
+        reason = "Query is too expensive: " + "; ".join(problems)
+        verdict = self.action
+        new_sql = sql
+        if verdict == "limit":
+            if self.has_limit(sql):
+                # A LIMIT is already present, nothing cheaper to append
+                verdict = "reject"
+            else:
+                new_sql = self.apply_limit(sql, self.auto_limit)
+
+        return {"verdict": verdict, "sql": new_sql, "reason": reason, "estimate": estimate}
+
+    def format_feedback(self, result: Dict[str, Any]) -> str:
+        """
+        Format a check() result as feedback for SQL correction.
+
+        Args:
+            result: Output of check()
+
+        Returns:
+            Error message describing the cost problem and the plan summary
+        """
+        lines = [result.get("reason") or "Query is too expensive."]
+        estimate = result.get("estimate") or {}
+        for table in self._iter_plan_tables(estimate.get("plan", {})):
+            lines.append(
+                f"- table {table.get('table_name')}: access_type={table.get('access_type')}, "
+                f"key={table.get('key')}, rows_examined_per_scan={table.get('rows_examined_per_scan')}"
+            )
+        lines.append(
+            "Rewrite the query to use indexed filters or join columns, avoid full scans "
+            "on large tables, and add a LIMIT when returning raw rows."
+        )
+        return "\n".join(lines)
+
+    @staticmethod
+    def has_limit(sql: str) -> bool:
+        """Check if the outermost query ends with a LIMIT clause"""
+        return re.search(r'\bLIMIT\s+\d+(\s*,\s*\d+|\s+OFFSET\s+\d+)?\s*;?\s*$', sql, re.IGNORECASE) is not None
+
+    @staticmethod
+    def apply_limit(sql: str, limit: int) -> str:
+        """Append a LIMIT clause to a query"""
+        return f"{sql.strip().rstrip(';').rstrip()} LIMIT {int(limit)}"
+
+    def _profiled_row_count(self, table_name: str) -> Optional[int]:
+        """Get profiled row count for a table node in the graph"""
+        if not self.graph:
+            return None
+        node = self.graph.node_properties.get(table_name)
+        if not node or node.get("type") != "table":
+            return None
+        row_count = node.get("properties", {}).get("row_count")
+        return int(row_count) if row_count is not None else None
+
+    def _iter_plan_tables(self, node: Any, loops: float = 1) -> List[Dict[str, Any]]:
+        """
+        Collect all table access entries from an EXPLAIN FORMAT=JSON plan.
+        Each entry is annotated with `_loops`, the number of times it is scanned
+        inside its nested loop.
+        """
+        tables = []
+        if isinstance(node, dict):
+            if "nested_loop" in node:
+                current_loops = loops
+                for item in node["nested_loop"]:
+                    item_tables = self._iter_plan_tables(item, current_loops)
+                    tables.extend(item_tables)
+                    if item_tables:
+                        produced = self._to_number(item_tables[-1].get("rows_produced_per_join"))
+                        current_loops = max(produced, 1)
+            for key, value in node.items():
+                if key == "nested_loop":
+                    continue
+                if key == "table" and isinstance(value, dict):
+                    entry = {k: v for k, v in value.items() if not isinstance(v, (dict, list))}
+                    entry["_loops"] = loops
+                    tables.append(entry)
+                    tables.extend(self._iter_plan_tables(
+                        {k: v for k, v in value.items() if isinstance(v, (dict, list))}, loops
+                    ))
+                elif isinstance(value, (dict, list)):
+                    tables.extend(self._iter_plan_tables(value, loops))
+        elif isinstance(node, list):
+            for item in node:
+                tables.extend(self._iter_plan_tables(item, loops))
+        return tables
+
+    def _extract_table_aliases(self, sql: str) -> Dict[str, str]:
+        """Map table aliases used in FROM/JOIN clauses to table names"""
+        # Shares the cached parse with governance validation of the same SQL
+        return parse_sql(sql).table_aliases()
+
+    @staticmethod
+    def _to_number(value: Any) -> float:
+        """Convert plan numbers (sometimes strings) to float"""
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
@@ -0,0 +1,338 @@
+"""
+Routing Inference Service
+
+Wraps several inference services (providers) behind the InferenceServiceProtocol:
+1. Providers are tried in order; each has a circuit breaker that opens after
+   consecutive failures and lets a single probe call through after a cool-down
+2. Retryable failures (timeouts, connection errors, 429/5xx) are retried on the
+   same provider with full-jitter exponential backoff before failing over
+3. Optional hedging: if the primary has not answered within its p95 latency, the
+   same call is fired at the next provider and the first valid answer wins.
+   The provider clients are synchronous, so a losing call that has already
+   started cannot be stopped: it runs to completion in the hedge pool, keeps its
+   connection until then and its tokens are still recorded. Hedging trades that
+   extra cost for tail latency
+
+Failures propagate as typed errors (see llm_errors.py); when every provider fails
+AllProvidersFailedError carries the last error of each. An empty structured
+output is treated as a failure instead of being passed downstream.
+
+Configuration (environment variables):
+- LLM_ROUTER_MAX_RETRIES: Retries per provider for retryable errors (default 2)
+- LLM_ROUTER_BACKOFF_BASE: Backoff base in seconds (default 0.5)
+- LLM_ROUTER_BACKOFF_MAX: Backoff cap in seconds (default 8)
+- LLM_ROUTER_HEDGE: Enable hedged requests (default false)
+- LLM_ROUTER_HEDGE_DELAY: Hedge delay in seconds until enough latencies are recorded (default 2.0)
+- LLM_CIRCUIT_FAILURE_THRESHOLD: Consecutive failures that open a circuit (default 5)
+- LLM_CIRCUIT_RESET_SECONDS: Seconds an open circuit waits before a probe call (default 30)
+"""
+
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .async_inference import AsyncInferenceMixin
+from .batch_inference import BatchInferenceMixin
+from .llm_errors import (
+    AllProvidersFailedError,
+    CircuitOpenError,
+    LLMError,
+    LLMProviderError,
+    LLMResponseError,
+    classify_error,
+)
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker: closed -> open after `failure_threshold`
+    failures, half-open (one probe call) after `reset_timeout` seconds, closed
+    again on a successful probe.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold or int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.reset_timeout = reset_timeout if reset_timeout is not None else float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """True if a call could be sent now (does not reserve the probe slot)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.reset_timeout
+            return self.state == self.CLOSED or not self._probing
+
+    def allow(self) -> bool:
+        """True if a call may be sent now (reserves the probe slot when half-open)"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile (0-100), or None until min_samples are recorded"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class ProviderRoute:
+    """One provider with its breaker and latency stats"""
+
+    def __init__(self, name: str, service, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.service = service
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+
+
+class RoutingInferenceService(AsyncInferenceMixin, BatchInferenceMixin):
+    """
+    Failover, retry and hedging across several inference services.
+    Exposes the same protocol as the wrapped services; in a batch
+    (get_structured_outputs) every item is routed on its own.
+    """
+
+    def __init__(
+        self,
+        providers: List[Any],
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        hedge: Optional[bool] = None,
+        hedge_delay: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            providers: Services in priority order, or (name, service) tuples
+            max_retries: Retries per provider for retryable errors
+            backoff_base: Backoff base in seconds (attempt n sleeps up to base * 2**n)
+            backoff_max: Backoff cap in seconds
+            hedge: Fire the next provider when the primary is slower than its p95
+            hedge_delay: Hedge delay used until the primary has enough latency samples
+            sleep: Sleep function (injectable for tests)
+        """
+        if not providers:
+            raise ValueError("RoutingInferenceService needs at least one provider")
+        self.routes = []
+        for provider in providers:
+            name, service = provider if isinstance(provider, tuple) else (type(provider).__name__, provider)
+            self.routes.append(ProviderRoute(name, service))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_ROUTER_MAX_RETRIES", "2"))
+        self.backoff_base = backoff_base if backoff_base is not None else float(os.getenv("LLM_ROUTER_BACKOFF_BASE", "0.5"))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv("LLM_ROUTER_BACKOFF_MAX", "8"))
+        self.hedge = hedge if hedge is not None else os.getenv("LLM_ROUTER_HEDGE", "false").lower() == "true"
+        self.hedge_delay = hedge_delay if hedge_delay is not None else float(os.getenv("LLM_ROUTER_HEDGE_DELAY", "2.0"))
+        self._sleep = sleep
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    # --- Routing ---
+
+    def _available(self) -> List[ProviderRoute]:
+        return [route for route in self.routes if route.breaker.available()]
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(cap, base * 2**attempt)]"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _validate(route: ProviderRoute, method: str, result: Any) -> Any:
+        if method == "get_structured_output" and not result:
+            raise LLMResponseError("Empty structured output", route.name)
+        return result
+
+    def _call_route(self, route: ProviderRoute, method: str, args: tuple) -> Any:
+        """Call one provider with retries; updates its breaker and latency stats"""
+        attempt = 0
+        while True:
+            if not route.breaker.allow():
+                raise CircuitOpenError("Circuit open", route.name)
+            started = time.monotonic()
+            try:
+                result = self._validate(route, method, getattr(route.service, method)(*args))
+            except Exception as err:
+                error = classify_error(route.name, err)
+                route.breaker.record_failure()
+                retryable = isinstance(error, LLMProviderError) and error.retryable
+                if not retryable or attempt >= self.max_retries:
+                    raise error from err
+                delay = self._backoff(attempt)
+                print(f"⚠️ {route.name} {method} failed ({error}); retrying in {delay:.2f}s")
+                self._sleep(delay)
+                attempt += 1
+                continue
+            route.breaker.record_success()
+            route.latency.record(time.monotonic() - started)
+            return result
+
+    def _route(self, method: str, *args) -> Any:
+        routes = self._available()
+        if not routes:
+            raise AllProvidersFailedError([CircuitOpenError("Circuit open", route.name) for route in self.routes])
+        if self.hedge and len(routes) > 1:
+            return self._hedged(routes, method, args)
+
+        errors = []
+        for route in routes:
+            try:
+                return self._call_route(route, method, args)
+            except LLMError as err:
+                print(f"⚠️ {route.name} failed for {method}: {err}")
+                errors.append(err)
+        raise AllProvidersFailedError(errors)
+
+    def _hedged(self, routes: List[ProviderRoute], method: str, args: tuple) -> Any:
+        """
+        Start the primary; after its p95 latency (or hedge_delay) start the next
+        provider as well. Return the first valid result. A provider that fails
+        outright triggers the next one immediately. Cancelling the losers only
+        stops calls that have not started; running ones finish in the background.
+        """
+        executor = self._get_executor()
+        pending = {}
+        errors = []
+        remaining = list(routes)
+
+        def launch():
+            route = remaining.pop(0)
+            # Copy the caller's context so token usage is attributed to its flow stage
+            context = contextvars.copy_context()
+            pending[executor.submit(context.run, self._call_route, route, method, args)] = route
+
+        launch()
+        while pending:
+            primary = next(iter(pending.values()))
+            delay = primary.latency.percentile(95) or self.hedge_delay
+            done, _ = wait(list(pending), timeout=delay if remaining else None, return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"⏱️ {primary.name} slower than {delay:.2f}s; hedging {method} to {remaining[0].name}")
+                launch()
+                continue
+            for future in done:
+                route = pending.pop(future)
+                try:
+                    result = future.result()
+                except LLMError as err:
+                    errors.append(err)
+                    continue
+                # Only queued calls can be cancelled; running ones finish and are discarded
+                for other in pending:
+                    other.cancel()
+                return result
+            if not pending and remaining:
+                launch()
+        raise AllProvidersFailedError(errors)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=max(4, 2 * len(self.routes)), thread_name_prefix="llm-hedge"
+                    )
+        return self._executor
+
+    def provider_states(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state, failure count and p95 latency per provider"""
+        return {
+            route.name: {
+                "state": route.breaker.state,
+                "failures": route.breaker.failures,
+                "p95_seconds": route.latency.percentile(95)
+            }
+            for route in self.routes
+        }
+
+    # --- InferenceServiceProtocol ---
+
+    def get_summary(self, content: str, max_words: int = 100) -> str:
+        return self._route("get_summary", content, max_words)
+
+    def get_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Dict[str, Any]:
+        return self._route("get_structured_output", content, json_schema)
+
+    def analyze_intent(self, query: str) -> str:
+        return self._route("analyze_intent", query)
+
+    def chat_completion(self, message: str, context: Optional[str] = None) -> str:
+        return self._route("chat_completion", message, context)
+
+    def stream_chat_completion(self, message: str, context: Optional[str] = None) -> Iterator[str]:
+        return self._stream("stream_chat_completion", message, context)
+
+    def stream_structured_output(self, content: str, json_schema: Dict[str, Any]) -> Iterator[str]:
+        return self._stream("stream_structured_output", content, json_schema)
+
+    def _stream(self, method: str, *args) -> Iterator[str]:
+        """Fail over until the first chunk arrives; after that errors propagate (no hedging)"""
+        errors = []
+        for route in self._available():
+            if not route.breaker.allow():
+                continue
+            started = time.monotonic()
+            emitted = False
+            try:
+                for chunk in getattr(route.service, method)(*args):
+                    emitted = True
+                    yield chunk
+            except Exception as err:
+                error = classify_error(route.name, err)
+                route.breaker.record_failure()
+                if emitted:
+                    raise error from err
+                print(f"⚠️ {route.name} failed for {method}: {error}")
+                errors.append(error)
+                continue
+            route.breaker.record_success()
+            route.latency.record(time.monotonic() - started)
+            return
+        raise AllProvidersFailedError(errors)
@@ -191,13 +191,15 @@ class SchemaGraphService:
             columns = self.db_reader.get_table_schema(self.dbname, table)
             for col in columns:
                 if col.get('Key') == 'MUL':
-                    fk_query = f"""
+                    fk_query = """
                         SELECT REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
                         FROM information_schema.KEY_COLUMN_USAGE
-                        WHERE TABLE_SCHEMA = '{self.dbname}' AND TABLE_NAME = '{table}' AND COLUMN_NAME = '{col['Field']}'
+                        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s
                             AND REFERENCED_TABLE_NAME IS NOT NULL
                     """
-                    fk_result = self.db_reader.mysql_service.execute_query(fk_query)
+                    fk_result = self.db_reader.mysql_service.execute_prepared(
+                        fk_query, (self.dbname, table, col['Field']), governed=False
+                    )
                     for fk in fk_result:
                         ref_table = fk['REFERENCED_TABLE_NAME']
                         ref_col = fk['REFERENCED_COLUMN_NAME']
@@ -0,0 +1,270 @@
+"""
+Semantic Answer Cache
+
+Reuses the intent, path and SQL of earlier questions that are worded
+differently but ask the same thing ("best-selling products" vs "products
+with highest sales"):
+1. Every question whose SQL executed is embedded and stored with its intent,
+   path and SQL, tagged with the graph fingerprint (SemanticGraph.fingerprint())
+2. A new question is embedded and matched against entries of the current graph
+   fingerprint only; the best hit must reach the similarity threshold (cosine)
+3. Guards against near-identical wording that asks for different data: both
+   questions must carry the same literals (numbers, dates, quoted strings and
+   categorical values) and the same negations, since embeddings barely move
+   between "top 5" and "top 10" or "shipped" and "not shipped"
+4. Optionally a light LLM confirms that both questions have the same answer
+   before the cached SQL is reused
+5. Entries of other graph fingerprints are deleted the first time a new
+   fingerprint is seen
+
+Two stores share the embedding function of GraphVectorService: a collection in
+its Chroma PersistentClient (entries survive restarts) or an in-process index.
+
+Configuration (environment variables):
+- SEMANTIC_CACHE_ENABLED: Look up and store answers (default true)
+- SEMANTIC_CACHE_BACKEND: chroma or local (default chroma)
+- SEMANTIC_CACHE_COLLECTION: Chroma collection name (default answer_cache)
+- SEMANTIC_CACHE_MIN_SIMILARITY: Cosine similarity required for a hit (default 0.92)
+- SEMANTIC_CACHE_VERIFY: Confirm hits with the light LLM (default true)
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+from src.services.query_cache import normalize_query
+from src.services.sql_template_cache import extract_literals
+
+# Words that flip the meaning of an otherwise identical question
+NEGATIONS = frozenset(("not", "no", "never", "without", "except", "excluding", "non", "none", "nobody"))
+
+EQUIVALENCE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "equivalent": {
+            "type": "boolean",
+            "description": "True if both questions ask for exactly the same data."
+        }
+    },
+    "required": ["equivalent"]
+}
+
+
+class AnswerStoreProtocol(Protocol):
+    """Vector store for cached answers; distances are cosine distances (1 - similarity)"""
+    def add(self, entry_id: str, document: str, metadata: Dict[str, Any]) -> None: ...
+    def query(self, document: str, k: int, graph_version: str) -> List[Tuple[float, Dict[str, Any]]]: ...
+    def prune(self, graph_version: str) -> None: ...
+
+
+class ChromaAnswerStore:
+    """Answer entries in a collection of the vector service's Chroma PersistentClient"""
+
+    def __init__(self, vector_service, collection_name: Optional[str] = None):
+        """
+        Args:
+            vector_service: GraphVectorService whose client and embedding function are reused
+            collection_name: Collection to store answers in (defaults to SEMANTIC_CACHE_COLLECTION)
+        """
+        self.collection = vector_service.client.get_or_create_collection(
+            name=collection_name or os.getenv("SEMANTIC_CACHE_COLLECTION", "answer_cache"),
+            embedding_function=vector_service.embedding_fn,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def add(self, entry_id: str, document: str, metadata: Dict[str, Any]):
+        self.collection.upsert(ids=[entry_id], documents=[document], metadatas=[metadata])
+
+    def query(self, document: str, k: int, graph_version: str) -> List[Tuple[float, Dict[str, Any]]]:
+        results = self.collection.query(query_texts=[document], n_results=k, where={"graph_version": graph_version})
+        if not results["metadatas"] or not results["metadatas"][0]:
+            return []
+        return list(zip(results["distances"][0], results["metadatas"][0]))
+
+    def prune(self, graph_version: str):
+        self.collection.delete(where={"graph_version": {"$ne": graph_version}})
+
+
+class LocalAnswerStore:
+    """In-process answer index with brute-force cosine search"""
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]]):
+        """
+        Args:
+            embed: Embedding function over a list of texts, e.g. GraphVectorService.embedding_fn
+        """
+        self.embed = embed
+        self._entries: Dict[str, Tuple[List[float], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> List[float]:
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def add(self, entry_id: str, document: str, metadata: Dict[str, Any]):
+        vector = self._unit(self.embed([document])[0])
+        with self._lock:
+            self._entries[entry_id] = (vector, metadata)
+
+    def query(self, document: str, k: int, graph_version: str) -> List[Tuple[float, Dict[str, Any]]]:
+        vector = self._unit(self.embed([document])[0])
+        with self._lock:
+            entries = [entry for entry in self._entries.values() if entry[1]["graph_version"] == graph_version]
+        scored = [(1.0 - sum(a * b for a, b in zip(vector, other)), metadata) for other, metadata in entries]
+        return sorted(scored, key=lambda item: item[0])[:k]
+
+    def prune(self, graph_version: str):
+        with self._lock:
+            self._entries = {
+                entry_id: entry for entry_id, entry in self._entries.items()
+                if entry[1]["graph_version"] == graph_version
+            }
+
+
+def question_guard(question: str, value_index=None) -> Tuple[List[str], List[str]]:
+    """Literals and negations of a question; a cached answer is only reused if both match"""
+    _, literals = extract_literals(question, value_index)
+    negations = sorted(word for word in normalize_query(question).split() if word in NEGATIONS)
+    return sorted(f"{literal.kind}:{literal.text.lower()}" for literal in literals), negations
+
+
+class SemanticAnswerCache:
+    """Embedding-similarity cache of intent, path and SQL per graph fingerprint"""
+
+    def __init__(
+        self,
+        store: AnswerStoreProtocol,
+        verifier=None,
+        enabled: Optional[bool] = None,
+        min_similarity: Optional[float] = None,
+        verify: Optional[bool] = None,
+        top_k: int = 3
+    ):
+        """
+        Args:
+            store: ChromaAnswerStore or LocalAnswerStore
+            verifier: Light inference service for the equivalence check (any
+                service with get_structured_output); None skips the check
+            enabled: Look up and store answers (defaults to SEMANTIC_CACHE_ENABLED)
+            min_similarity: Cosine similarity required for a hit
+            verify: Confirm hits with the verifier (defaults to SEMANTIC_CACHE_VERIFY)
+            top_k: Nearest entries inspected per lookup
+        """
+        self.store = store
+        self.verifier = verifier
+        self.enabled = enabled if enabled is not None else os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.min_similarity = min_similarity if min_similarity is not None else float(os.getenv("SEMANTIC_CACHE_MIN_SIMILARITY", "0.92"))
+        self.verify = verify if verify is not None else os.getenv("SEMANTIC_CACHE_VERIFY", "true").lower() == "true"
+        self.top_k = top_k
+        self._pruned_version = None
+        self._counts = {"hit": 0, "miss": 0, "guarded": 0, "unverified": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, result: str):
+        with self._lock:
+            self._counts[result] += 1
+
+    def _graph_version(self, graph) -> str:
+        version = graph.fingerprint()
+        if version != self._pruned_version:
+            self._pruned_version = version
+            self.store.prune(version)
+        return version
+
+    def _equivalent(self, question: str, cached_question: str, sql: str) -> bool:
+        prompt = (
+            "Two questions were asked against the same database. Decide whether they ask for exactly the same data, "
+            "so that the SQL written for the first one also answers the second one.\n\n"
+            f"Question 1: {cached_question}\n"
+            f"SQL for question 1: {sql}\n"
+            f"Question 2: {question}\n\n"
+            "Respond ONLY with a JSON object: { \"equivalent\": true | false }"
+        )
+        result = self.verifier.get_structured_output(prompt, EQUIVALENCE_SCHEMA)
+        return isinstance(result, dict) and result.get("equivalent") is True
+
+    def lookup(self, question: str, graph) -> Optional[Dict[str, Any]]:
+        """
+        Cached plan of an equivalent earlier question.
+
+        Returns:
+            {"intent", "path", "sql", "question", "similarity"} or None on a miss
+        """
+        if not self.enabled:
+            return None
+        try:
+            hits = self.store.query(question, self.top_k, self._graph_version(graph))
+        except Exception as e:
+            print(f"⚠️ Semantic cache lookup failed: {e}")
+            return None
+
+        guard = question_guard(question, graph.value_index())
+        guarded = False
+        for distance, metadata in hits:
+            similarity = 1.0 - distance
+            if similarity < self.min_similarity:
+                break
+            if json.loads(metadata["guard"]) != [list(part) for part in guard]:
+                guarded = True
+                continue
+            plan = {
+                "intent": json.loads(metadata["intent"]),
+                "path": json.loads(metadata["path"]),
+                "sql": metadata["sql"],
+                "question": metadata["question"],
+                "similarity": similarity,
+            }
+            if self.verify and self.verifier is not None:
+                try:
+                    equivalent = self._equivalent(question, plan["question"], plan["sql"])
+                except Exception as e:
+                    print(f"⚠️ Semantic cache equivalence check failed: {e}")
+                    equivalent = False
+                if not equivalent:
+                    print(f"🔍 Semantic cache candidate rejected by verifier: {plan['question']}")
+                    self._count("unverified")
+                    return None
+            print(f"🔍 Semantic cache hit ({similarity:.3f}): {plan['question']}")
+            self._count("hit")
+            return plan
+        self._count("guarded" if guarded else "miss")
+        return None
+
+    def add(self, question: str, graph, intent: Dict[str, Any], path: list, sql: str):
+        """Store the plan of a question whose SQL executed"""
+        if not self.enabled or not normalize_query(question):
+            return
+        try:
+            version = self._graph_version(graph)
+            metadata = {
+                "graph_version": version,
+                "question": question,
+                "sql": sql,
+                "path": json.dumps(list(path)),
+                "intent": json.dumps(intent),
+                "guard": json.dumps([list(part) for part in question_guard(question, graph.value_index())]),
+            }
+            entry_id = hashlib.sha256(f"{version}:{normalize_query(question)}".encode("utf-8")).hexdigest()
+            self.store.add(entry_id, question, metadata)
+        except Exception as e:
+            print(f"⚠️ Semantic cache store failed: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lookup outcome counts (guarded: similar but different literals or negations)"""
+        with self._lock:
+            return dict(self._counts)
+
+    def to_prometheus(self) -> str:
+        """Counters in the Prometheus text exposition format"""
+        stats = self.snapshot()
+        lines = [
+            "# HELP nlq_semantic_cache_lookups_total Semantic answer cache lookups",
+            "# TYPE nlq_semantic_cache_lookups_total counter",
+        ]
+        for result in ("hit", "miss", "guarded", "unverified"):
+            lines.append(f'nlq_semantic_cache_lookups_total{{result="{result}"}} {stats[result]}')
+        return "\n".join(lines) + "\n"
@@ -100,6 +100,26 @@ class SQLGenerationService:
         else:
             return f"{indent_str}• {key}: {str(value)}"
 
+    def _sensitivity_index(self, graph: SemanticGraph):
+        """Sensitive attribute nodes of the graph, or None when governance is off"""
+        if not (self.governance_enabled and self.governance):
+            return None
+        return graph.sensitivity_index(self.governance)
+
+    def known_values(self, text: str, path: List[str], graph: SemanticGraph) -> str:
+        """
+        Prompt lines for literals in the text that are known values of columns
+        of the path's tables (sensitive columns excluded), from the graph's value index.
+        """
+        value_index = graph.value_index()
+        matches = value_index.find_in_text(text, tables=[node.split('.')[0] for node in path])
+        sensitivity = self._sensitivity_index(graph)
+        if sensitivity is not None:
+            for match in matches:
+                match["columns"] = [c for c in match["columns"] if not sensitivity.is_sensitive(c["column"])]
+            matches = [match for match in matches if match["columns"]]
+        return value_index.describe(matches)
+
     def path_to_sql_prompt(self, path: List[str], graph: SemanticGraph) -> str:
         """
         Compose a prompt for Gemini to generate SQL, embedding edge properties and node info.
@@ -117,6 +137,7 @@ class SQLGenerationService:
         
         # Gather table schema details for each table node in the path
         # Filter out sensitive columns if governance is enabled
+        sensitivity = self._sensitivity_index(graph)
         schema_descriptions = []
         for node in path:
             # Get node properties from graph
@@ -136,15 +157,12 @@ class SQLGenerationService:
             # Get associated columns/attributes
             neighbors = graph.get_neighbors_by_condition(node_id=node, condition="association")
             
-            # Filter sensitive columns from schema
-            if self.governance_enabled and self.governance:
-                filtered_neighbors = {}
-                for neighbor, edge_data in neighbors.items():
-                    # Extract column name from node ID (format: "table.column")
-                    col_name = neighbor.split('.')[-1] if '.' in neighbor else neighbor
-                    if not self.governance.is_sensitive_column(col_name):
-                        filtered_neighbors[neighbor] = edge_data
-                neighbors = filtered_neighbors
+            # Filter sensitive columns from schema (precomputed per graph)
+            if sensitivity is not None:
+                neighbors = {
+                    neighbor: edge_data for neighbor, edge_data in neighbors.items()
+                    if not sensitivity.is_sensitive(neighbor)
+                }
             
             # Add columns/attributes
             if neighbors:
@@ -213,6 +231,9 @@ class SQLGenerationService:
         """
         prompt = self.path_to_sql_prompt(path, graph)
         if user_query:
+            known_values = self.known_values(user_query, path, graph)
+            if known_values:
+                prompt += f"\nKnown column values mentioned in the query (use these exact literals and columns in WHERE filters):\n{known_values}\n"
             prompt = f"\n\nUser Query: {user_query} \n\n" + prompt
         schema = {
             "type": "object",
@@ -223,11 +244,14 @@ class SQLGenerationService:
         }
         result = self.model.get_structured_output(prompt, schema)
         if isinstance(result, dict) and "sql" in result:
-            sql = result["sql"]
+            # Stored spelling for literals that are known categorical values
+            sql = graph.value_index().canonicalize_sql(result["sql"])
             
             # Validate generated SQL against governance policies
             if self.governance_enabled and self.governance:
-                is_valid, error_msg = self.governance.validate_query(sql)
+                is_valid, error_msg = self.governance.validate_query(
+                    sql, sensitivity_index=self._sensitivity_index(graph)
+                )
                 if not is_valid:
                     # Try to sanitize the SQL instead of failing
                     print(f"⚠️  Generated SQL violates governance: {error_msg}")
@@ -267,11 +291,12 @@ class SQLGenerationService:
             return result["sql"]
         raise ValueError("LLM did not return a valid corrected SQL object.")
 
-    def run_sql(self, sql: str) -> List[Any]:
+    def run_sql(self, sql: str, columnar: bool = False) -> Any:
         """
         Run the SQL query using MySQLService and return the results.
+        With columnar=True the results are a ColumnarResult instead of row dicts.
         """
-        return self.sql_service.execute_query(sql)
+        return self.sql_service.execute_query(sql, columnar=columnar)
 
     def generate_and_run(self, path: List[str], graph: SemanticGraph, user_query: str = "") -> Dict[str, Any]:
         """
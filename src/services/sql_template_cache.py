@@ -0,0 +1,306 @@
+"""
+SQL Template Cache
+
+Questions that differ only in their literals ("orders for customer 123" and
+"orders for customer 456") share one generated SQL shape. Executed SQL is
+generalized into a parameterized template, and later questions of the same
+shape are answered by binding their literals without the LLM SQL call:
+1. Literals are extracted from the question: quoted strings, ISO dates,
+   numbers, and known categorical values (SemanticGraph.value_index()).
+   The question with literals replaced by typed placeholders (comparison
+   operators kept), plus the join path, is the template key
+2. After a query executes, each question literal must appear exactly once in
+   the SQL (numbers as numeric tokens, strings and values as string literals,
+   optionally inside LIKE wildcards); those positions become typed slots.
+   SQL that does not contain every literal exactly once is not templated
+3. On a match the new literals are type-checked against the slots (an integer
+   slot such as LIMIT rejects 2.5, a date slot rejects non-dates, a value slot
+   only takes known values of its column) and bound with SQL quoting; any
+   mismatch falls back to LLM generation
+4. Templates belong to one graph snapshot and are dropped when the graph changes;
+   the least recently used are evicted past a size bound
+
+Configuration (environment variables):
+- SQL_TEMPLATE_CACHE_ENABLED: Learn and bind SQL templates (default true)
+- SQL_TEMPLATE_CACHE_MAX_ENTRIES: Maximum stored templates (default 500)
+"""
+
+import datetime
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.modules.value_index import normalize_literal
+from src.services.query_cache import COMPARISON_OPERATOR, FILLER_WORDS, normalize_operator
+
+# Quoted strings (not apostrophes inside words), ISO dates, then plain numbers
+_QUESTION_LITERAL = re.compile(
+    r"(?<!\w)'([^']+)'(?!\w)"
+    r"|\"([^\"]+)\""
+    r"|(?<![\w.-])(\d{4}-\d{2}-\d{2})(?![\w.])"
+    r"|(?<![\w.])(-?\d+(?:\.\d+)?)(?![\w.])"
+)
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_SQL_STRING = re.compile(r"'((?:[^'\\]|''|\\.)*)'")
+_SQL_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+
+# Slots a question literal of each kind may fill
+_PLACEHOLDER = {"int": "<num>", "decimal": "<num>", "date": "<text>", "string": "<text>"}
+
+
+class Literal:
+    """A literal extracted from a question"""
+
+    def __init__(self, kind: str, text: str, column: Optional[str] = None):
+        self.kind = kind  # int, decimal, date, string or value
+        self.text = text
+        self.column = column  # value literals: the categorical column holding it
+
+    @property
+    def placeholder(self) -> str:
+        return f"<value:{self.column}>" if self.kind == "value" else _PLACEHOLDER[self.kind]
+
+    def __repr__(self):
+        return f"Literal({self.kind}, {self.text!r})"
+
+
+def _match_values(words: List[str], value_index) -> List[Union[str, Literal]]:
+    """Replace the longest runs of words that are known categorical values"""
+    tokens: List[Union[str, Literal]] = []
+    i = 0
+    while i < len(words):
+        for n in range(min(value_index.max_words, len(words) - i), 0, -1):
+            columns = value_index.lookup(" ".join(words[i:i + n]))
+            # A value held by several columns does not say which one to filter
+            if len(columns) == 1:
+                tokens.append(Literal("value", columns[0]["value"], columns[0]["column"]))
+                i += n
+                break
+        else:
+            tokens.append(words[i])
+            i += 1
+    return tokens
+
+
+def extract_literals(question: str, value_index=None) -> Tuple[str, List[Literal]]:
+    """
+    Split a question into its shape and its literals.
+
+    Returns:
+        (shape, literals): the normalized question with typed placeholders, and
+        the literals in question order
+    """
+    tokens: List[Union[str, Literal]] = []
+
+    def add_text(text: str):
+        # Comparison operators stay in the shape: "> <num>" and "< <num>" are different templates
+        for i, part in enumerate(COMPARISON_OPERATOR.split(text)):
+            if i % 2:
+                tokens.append(normalize_operator(part))
+                continue
+            words = normalize_literal(part.replace("'", "")).split()
+            tokens.extend(_match_values(words, value_index) if value_index is not None and len(value_index) else words)
+
+    position = 0
+    for match in _QUESTION_LITERAL.finditer(question):
+        add_text(question[position:match.start()])
+        single, double, date, number = match.groups()
+        if date:
+            tokens.append(Literal("date", date))
+        elif number:
+            tokens.append(Literal("decimal" if "." in number else "int", number))
+        else:
+            text = single if single is not None else double
+            tokens.append(Literal("date" if _ISO_DATE.fullmatch(text) else "string", text))
+        position = match.end()
+    add_text(question[position:])
+
+    literals = [token for token in tokens if isinstance(token, Literal)]
+    shape = " ".join(
+        token.placeholder if isinstance(token, Literal) else token
+        for token in tokens
+        if isinstance(token, Literal) or token not in FILLER_WORDS
+    )
+    return shape, literals
+
+
+def _unquote(content: str) -> str:
+    return content.replace("''", "'").replace("\\'", "'").replace("\\\\", "\\")
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def generalize_sql(sql: str, literals: List[Literal]) -> Optional[List[Union[str, Dict[str, Any]]]]:
+    """
+    Turn executed SQL into template parts: SQL text and slot dicts
+    {"index", "kind", "prefix", "suffix"}. None if a literal is missing from
+    the SQL or appears more than once.
+    """
+    strings = [(m.start(), m.end(), _unquote(m.group(1))) for m in _SQL_STRING.finditer(sql)]
+    numbers = [
+        (m.start(), m.end(), m.group(0)) for m in _SQL_NUMBER.finditer(sql)
+        if not any(start <= m.start() < end for start, end, _ in strings)
+    ]
+
+    slots = []
+    for index, literal in enumerate(literals):
+        found = []
+        if literal.kind in ("int", "decimal"):
+            found = [
+                (start, end, "", "") for start, end, text in numbers
+                if float(text) == float(literal.text)
+            ]
+        else:
+            wanted = normalize_literal(literal.text)
+            for start, end, content in strings:
+                # LIKE patterns keep their wildcards around the slot
+                stripped = content.strip("%")
+                if normalize_literal(stripped) == wanted and stripped:
+                    prefix = content[:len(content) - len(content.lstrip("%"))]
+                    suffix = content[len(content.rstrip("%")):]
+                    found.append((start, end, prefix, suffix))
+        if len(found) != 1:
+            return None
+        start, end, prefix, suffix = found[0]
+        slots.append((start, end, {"index": index, "kind": literal.kind, "prefix": prefix, "suffix": suffix}))
+
+    slots.sort(key=lambda slot: slot[0])
+    if any(a[1] > b[0] for a, b in zip(slots, slots[1:])):
+        return None
+    parts: List[Union[str, Dict[str, Any]]] = []
+    position = 0
+    for start, end, slot in slots:
+        parts.append(sql[position:start])
+        parts.append(slot)
+        position = end
+    parts.append(sql[position:])
+    return parts
+
+
+def bind_template(parts: List[Union[str, Dict[str, Any]]], literals: List[Literal]) -> Optional[str]:
+    """Render template parts with new literals, or None if a literal does not fit its slot"""
+    sql = []
+    for part in parts:
+        if isinstance(part, str):
+            sql.append(part)
+            continue
+        literal = literals[part["index"]]
+        kind = part["kind"]
+        if kind == "int":
+            if literal.kind != "int":
+                return None
+            sql.append(str(int(literal.text)))
+        elif kind == "decimal":
+            if literal.kind not in ("int", "decimal"):
+                return None
+            sql.append(literal.text)
+        elif kind == "date":
+            try:
+                datetime.date.fromisoformat(literal.text)
+            except ValueError:
+                return None
+            sql.append(_quote(part["prefix"] + literal.text + part["suffix"]))
+        elif kind == "value":
+            if literal.kind != "value":
+                return None
+            sql.append(_quote(part["prefix"] + literal.text + part["suffix"]))
+        else:
+            if literal.kind not in ("string", "date"):
+                return None
+            sql.append(_quote(part["prefix"] + literal.text + part["suffix"]))
+    return "".join(sql)
+
+
+class SQLTemplateCache:
+    """Parameterized SQL per question shape and join path, learned from executed queries"""
+
+    def __init__(self, enabled: Optional[bool] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            enabled: Learn and bind templates (defaults to SQL_TEMPLATE_CACHE_ENABLED)
+            max_entries: Maximum stored templates, least recently used evicted first
+        """
+        self.enabled = enabled if enabled is not None else os.getenv("SQL_TEMPLATE_CACHE_ENABLED", "true").lower() == "true"
+        self.max_entries = max_entries or int(os.getenv("SQL_TEMPLATE_CACHE_MAX_ENTRIES", "500"))
+        self._templates: "OrderedDict[Tuple[str, Tuple[str, ...]], List[Any]]" = OrderedDict()
+        self._snapshot = None
+        self._counts = {"hit": 0, "miss": 0, "rejected": 0, "learned": 0}
+        self._lock = threading.Lock()
+
+    def _check_snapshot(self, graph):
+        """Drop every template if the graph changed since they were learned (lock held)"""
+        snapshot = (id(graph), graph.version)
+        if snapshot != self._snapshot:
+            self._templates.clear()
+            self._snapshot = snapshot
+
+    def learn(self, question: str, path: List[str], sql: str, graph) -> bool:
+        """Store executed SQL as a template for the question's shape; False if it cannot be generalized"""
+        if not self.enabled:
+            return False
+        shape, literals = extract_literals(question, graph.value_index())
+        if not literals:
+            return False
+        parts = generalize_sql(sql, literals)
+        if parts is None:
+            return False
+        key = (shape, tuple(path))
+        with self._lock:
+            self._check_snapshot(graph)
+            self._templates[key] = parts
+            self._templates.move_to_end(key)
+            self._counts["learned"] += 1
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+        print(f"🧩 Learned SQL template for: {shape}")
+        return True
+
+    def bind(self, question: str, path: List[str], graph) -> Optional[str]:
+        """SQL for the question from a learned template, or None on a miss or type mismatch"""
+        if not self.enabled:
+            return None
+        shape, literals = extract_literals(question, graph.value_index())
+        if not literals:
+            return None
+        key = (shape, tuple(path))
+        with self._lock:
+            self._check_snapshot(graph)
+            parts = self._templates.get(key)
+            if parts is None:
+                self._counts["miss"] += 1
+                return None
+            self._templates.move_to_end(key)
+        sql = bind_template(parts, literals)
+        with self._lock:
+            self._counts["hit" if sql is not None else "rejected"] += 1
+        if sql is None:
+            print(f"🧩 SQL template rejected (literal types do not match) for: {shape}")
+        return sql
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Hit, miss, type-mismatch and learn counts and current size"""
+        with self._lock:
+            return {**self._counts, "templates": len(self._templates)}
+
+    def to_prometheus(self) -> str:
+        """Counters in the Prometheus text exposition format"""
+        stats = self.snapshot()
+        lines = [
+            "# HELP nlq_sql_template_lookups_total SQL template lookups (rejected: literal types did not match)",
+            "# TYPE nlq_sql_template_lookups_total counter",
+        ]
+        for result in ("hit", "miss", "rejected"):
+            lines.append(f'nlq_sql_template_lookups_total{{result="{result}"}} {stats[result]}')
+        lines += [
+            "# HELP nlq_sql_templates_learned_total Executed queries generalized into templates",
+            "# TYPE nlq_sql_templates_learned_total counter",
+            f"nlq_sql_templates_learned_total {stats['learned']}",
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,63 @@
+"""
+Streaming helpers
+
+Wire-format helpers shared by the streaming LLM providers and the streaming API:
+1. Decoding provider streams: Server-Sent Events (`data:` lines, used by Gemini and
+   OpenAI-compatible APIs) and newline-delimited JSON (used by Ollama)
+2. Encoding flow events for clients as SSE or NDJSON
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def iter_sse_data(lines: Iterable[Any]) -> Iterator[str]:
+    """
+    Yield the data payload of each Server-Sent Event.
+
+    Multi-line data fields are joined with newlines, comments and other fields
+    are ignored, and the OpenAI-style `[DONE]` terminator ends the stream.
+    """
+    data = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r\n")
+        if not line:
+            if data:
+                payload = "\n".join(data)
+                data = []
+                if payload == "[DONE]":
+                    return
+                yield payload
+            continue
+        if line.startswith("data:"):
+            value = line[5:]
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        payload = "\n".join(data)
+        if payload != "[DONE]":
+            yield payload
+
+
+def iter_ndjson(lines: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """Yield one decoded object per non-empty line"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def encode_sse(event: Dict[str, Any], default: Optional[Callable] = None) -> str:
+    """Encode a flow event as one SSE message named after its `event` field"""
+    return f"event: {event.get('event', 'message')}\ndata: {json.dumps(event, default=default)}\n\n"
+
+
+def encode_ndjson(event: Dict[str, Any], default: Optional[Callable] = None) -> str:
+    """Encode a flow event as one NDJSON line"""
+    return json.dumps(event, default=default) + "\n"
@@ -18,7 +18,7 @@ class TestInference(unittest.TestCase):
         self.api_key = "test-key"
         self.gemini = inference.GeminiService(api_key=self.api_key)
 
-    @patch("inference.requests.post")
+    @patch("requests.Session.post")
     def test_call_gemini_success(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -32,7 +32,7 @@ class TestInference(unittest.TestCase):
         result = self.gemini._call_gemini("prompt")
         self.assertEqual(result, "response text")
 
-    @patch("inference.requests.post")
+    @patch("requests.Session.post")
     def test_call_gemini_bad_format(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {}
@@ -42,7 +42,7 @@ class TestInference(unittest.TestCase):
         with self.assertRaises(RuntimeError):
             self.gemini._call_gemini("prompt")
 
-    @patch("inference.requests.post")
+    @patch("requests.Session.post")
     def test_get_summary(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -56,7 +56,7 @@ class TestInference(unittest.TestCase):
         summary = self.gemini.get_summary("content", max_words=10)
         self.assertEqual(summary, "summary text")
 
-    @patch("inference.requests.post")
+    @patch("requests.Session.post")
     def test_get_structured_output_valid_json(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -71,7 +71,7 @@ class TestInference(unittest.TestCase):
         result = self.gemini.get_structured_output("content", schema)
         self.assertEqual(result, {"a": 1, "b": 2})
 
-    @patch("inference.requests.post")
+    @patch("requests.Session.post")
     def test_get_structured_output_json_with_extra_text(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -86,7 +86,7 @@ class TestInference(unittest.TestCase):
         result = self.gemini.get_structured_output("content", schema)
         self.assertEqual(result, {"a": 1, "b": 2})
 
-    @patch("inference.requests.post")
+    @patch("requests.Session.post")
     def test_get_structured_output_invalid_json(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -101,7 +101,7 @@ class TestInference(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.gemini.get_structured_output("content", schema)
 
-    @patch("inference.requests.post")
+    @patch("requests.Session.post")
     def test_analyze_intent(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -115,7 +115,7 @@ class TestInference(unittest.TestCase):
         result = self.gemini.analyze_intent("query")
         self.assertEqual(result, "intent text")
 
-    @patch("inference.requests.post")
+    @patch("requests.Session.post")
     def test_chat_completion(self, mock_post):
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -0,0 +1,161 @@
+"""
+Token Usage Accounting
+
+Captures prompt and completion token counts of every LLM call and attributes
+them to the flow stage that made the call:
+1. Inference services report provider usage (OpenAI `usage`, Gemini
+   `usageMetadata`, Ollama `prompt_eval_count`/`eval_count`); when a provider
+   reports nothing the counts come from a local estimator (tiktoken if
+   installed, otherwise ~4 characters per token)
+2. `track_stage(name, state)` scopes calls to a stage through a context variable
+   and adds the stage totals to `state["token_usage"]`
+3. A process-wide UsageMeter keeps counters per (stage, provider, model) and
+   renders them in the Prometheus text format for the `/metrics` endpoint
+"""
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+# tiktoken gives exact counts for OpenAI models and close ones for the others
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+_USAGE_FIELDS = ("calls", "estimated_calls", "prompt_chars", "prompt_tokens", "completion_tokens", "total_tokens")
+
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("llm_usage_stage", default=None)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Token count of text (exact with tiktoken, ~4 characters per token otherwise)"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return max(1, (len(text) + 3) // 4)
+
+
+def _prompt_text(prompt: Union[str, List[Dict[str, str]], None]) -> str:
+    if isinstance(prompt, list):
+        return "\n".join(str(message.get("content", "")) for message in prompt)
+    return prompt or ""
+
+
+def _empty_usage() -> Dict[str, int]:
+    return {field: 0 for field in _USAGE_FIELDS}
+
+
+class UsageMeter:
+    """Process-wide token counters per (stage, provider, model)"""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, provider: str, model: str, usage: Dict[str, int]):
+        with self._lock:
+            counters = self._counters.setdefault((stage, provider, model), _empty_usage())
+            for field in _USAGE_FIELDS:
+                counters[field] += usage.get(field, 0)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"stage": stage, "provider": provider, "model": model, **counters}
+                for (stage, provider, model), counters in sorted(self._counters.items())
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+    def to_prometheus(self) -> str:
+        """Counters in the Prometheus text exposition format"""
+        metrics = [
+            ("nlq_llm_calls_total", "calls", "LLM calls"),
+            ("nlq_llm_estimated_calls_total", "estimated_calls", "LLM calls with locally estimated token counts"),
+            ("nlq_llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent"),
+            ("nlq_llm_completion_tokens_total", "completion_tokens", "Completion tokens received"),
+            ("nlq_llm_prompt_chars_total", "prompt_chars", "Prompt size in characters"),
+        ]
+        rows = self.snapshot()
+        lines = []
+        for name, field, help_text in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for row in rows:
+                labels = ",".join(
+                    f'{key}="{_escape_label(row[key])}"' for key in ("stage", "provider", "model")
+                )
+                lines.append(f"{name}{{{labels}}} {row[field]}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_meter = UsageMeter()
+
+
+def get_meter() -> UsageMeter:
+    return _meter
+
+
+def record_usage(
+    provider: str,
+    model: Optional[str],
+    prompt: Union[str, List[Dict[str, str]], None] = None,
+    completion: Optional[str] = None,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Record one LLM call. Provider-reported counts are used when given; missing
+    counts are estimated from the prompt (text or chat messages) and completion.
+    """
+    prompt_text = _prompt_text(prompt)
+    estimated = prompt_tokens is None or completion_tokens is None
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(prompt_text)
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(completion if isinstance(completion, str) else None)
+    usage = {
+        "calls": 1,
+        "estimated_calls": int(estimated),
+        "prompt_chars": len(prompt_text),
+        "prompt_tokens": int(prompt_tokens),
+        "completion_tokens": int(completion_tokens),
+        "total_tokens": int(prompt_tokens) + int(completion_tokens),
+    }
+
+    current = _current_stage.get()
+    stage = current[0] if current else "unscoped"
+    if current:
+        totals = current[1]
+        for field in _USAGE_FIELDS:
+            totals[field] += usage[field]
+    _meter.record(stage, provider, model or "", usage)
+    return usage
+
+
+@contextmanager
+def track_stage(stage: str, state: Optional[dict] = None) -> Iterator[Dict[str, int]]:
+    """
+    Attribute LLM calls made inside the block to `stage`. With a flow state the
+    totals are added to state["token_usage"][stage] (accumulated across retries).
+    """
+    totals = _empty_usage()
+    token = _current_stage.set((stage, totals))
+    try:
+        yield totals
+    finally:
+        _current_stage.reset(token)
+        if state is not None and totals["calls"]:
+            stage_usage = state.setdefault("token_usage", {}).setdefault(stage, _empty_usage())
+            for field in _USAGE_FIELDS:
+                stage_usage[field] += totals[field]
@@ -216,6 +216,13 @@ class GraphVectorService:
         """
         Retrieves the top-k most relevant node IDs for a given query.
         """
+        return [node_id for node_id, _ in self.search_nodes_with_distances(query, k)]
+
+    def search_nodes_with_distances(self, query: str, k: int = 50) -> list[tuple]:
+        """
+        Retrieves the top-k most relevant nodes as (node_id, distance) pairs,
+        best first. Lower distances are closer matches.
+        """
         results = self.collection.query(
             query_texts=[query],
             n_results=k
@@ -223,7 +230,11 @@ class GraphVectorService:
         
         # results['ids'] is a list of lists (one per query)
         if results['metadatas']:
-            return [meta.get('node_id') for meta in results['metadatas'][0]]
+            distances = (results.get('distances') or [[]])[0] or [None] * len(results['metadatas'][0])
+            return [
+                (meta.get('node_id'), distance)
+                for meta, distance in zip(results['metadatas'][0], distances)
+            ]
         return []
 
 def retrieve_context(nl_query: str) -> str:
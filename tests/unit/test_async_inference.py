@@ -0,0 +1,108 @@
+"""
+Unit tests for the async inference layer
+
+Tests that the concurrency limiter caps in-flight calls, that fan-out keeps
+input order and that a timed-out call does not fail the others.
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.async_inference import (
+    AsyncInferenceMixin,
+    ConcurrencyLimiter,
+    gather_llm_calls,
+    run_concurrently,
+)
+
+
+class SlowInferenceService(AsyncInferenceMixin):
+    """Blocking fake provider that records peak concurrency"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def chat_completion(self, message, context=None):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(float(context) if context else self.delay)
+        with self._lock:
+            self.active -= 1
+        return f"reply to {message}"
+
+    def get_structured_output(self, content, json_schema):
+        return {"content": content}
+
+
+class TestAsyncInference(unittest.TestCase):
+    """Test suite for AsyncInferenceMixin and gather_llm_calls"""
+
+    def test_limiter_caps_concurrency_and_keeps_order(self):
+        """Test that fan-out never exceeds the limit and results keep input order"""
+        service = SlowInferenceService()
+        service.limiter = ConcurrencyLimiter(limit=2)
+
+        async def main():
+            return await gather_llm_calls([service.achat_completion(str(i)) for i in range(6)])
+
+        results = asyncio.run(main())
+        self.assertEqual(results, [f"reply to {i}" for i in range(6)])
+        self.assertEqual(service.peak, 2)
+
+    def test_timeout_does_not_fail_other_calls(self):
+        """Test that a timed-out call returns TimeoutError in place"""
+        service = SlowInferenceService()
+        service.limiter = ConcurrencyLimiter(limit=4)
+
+        async def main():
+            return await gather_llm_calls([
+                service.achat_completion("slow", context="0.5", timeout=0.05),
+                service.aget_structured_output("fast", {"type": "object"}),
+            ])
+
+        slow, fast = asyncio.run(main())
+        self.assertIsInstance(slow, asyncio.TimeoutError)
+        self.assertEqual(fast, {"content": "fast"})
+
+    def test_run_concurrently_returns_exceptions_in_place(self):
+        """Test the synchronous helper used by the profiler"""
+        def boom():
+            raise RuntimeError("provider down")
+
+        ok, failed = run_concurrently([lambda: "ok", boom])
+        self.assertEqual(ok, "ok")
+        self.assertIsInstance(failed, RuntimeError)
+
+    def test_limit_is_shared_across_threads_and_loops(self):
+        """Test that concurrent run_concurrently callers, each with its own event loop, share one cap"""
+        service = SlowInferenceService()
+        limiter = ConcurrencyLimiter(limit=2)
+        results = {}
+
+        def caller(name):
+            results[name] = run_concurrently(
+                [lambda i=i: service.chat_completion(f"{name}{i}") for i in range(3)], limiter=limiter
+            )
+
+        threads = [threading.Thread(target=caller, args=(name,)) for name in "ab"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results["b"], ["reply to b0", "reply to b1", "reply to b2"])
+        self.assertEqual(service.peak, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+Unit tests for batched structured output
+
+Tests order-preserving parallel batches with per-item errors, multi-item
+packing with individual retries, cache-aware batches and the OpenAI Batch API
+round trip.
+"""
+
+import unittest
+import os
+import sys
+import json
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services import batch_inference
+from src.services.batch_inference import (
+    BatchInferenceMixin,
+    pack_prompt,
+    parallel_structured_output_batches,
+    run_openai_batch,
+)
+from src.services.llm_cache_service import CachedInferenceService, LLMResponseCache
+from src.services.inference import OpenAIService
+from src.services.llm_errors import LLMProviderError, LLMResponseError
+
+SCHEMA = {"type": "object", "properties": {"answer": {"type": "string"}}, "required": ["answer"]}
+
+
+class FakeService(BatchInferenceMixin):
+    """Answers {"answer": prompt}; prompts starting with "fail" raise, packed prompts skip "skip" items"""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.prompts = []
+
+    def get_structured_output(self, content, json_schema):
+        self.prompts.append(content)
+        if "### Request" in content:
+            items = content.split("### Request ")[1:]
+            return {"results": [
+                {"index": int(item.split("\n", 1)[0]), "output": {"answer": item.split("\n", 1)[1].strip()}}
+                for item in items if "skip" not in item
+            ]}
+        if content.startswith("fail"):
+            raise LLMProviderError("boom", "fake")
+        return {"answer": content}
+
+
+class FakeOpenAIClient:
+    """In-memory stand-in for the files and batches endpoints of the OpenAI SDK"""
+
+    def __init__(self):
+        self.uploaded = None
+        self.polls = 0
+        self.files = SimpleNamespace(create=self._create_file, content=self._content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve, cancel=lambda batch_id: None)
+
+    def _create_file(self, file, purpose):
+        self.uploaded = [json.loads(line) for line in file[1].read().decode("utf-8").splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        return SimpleNamespace(id="batch-1", status="validating")
+
+    def _retrieve(self, batch_id):
+        self.polls += 1
+        status = "completed" if self.polls >= 2 else "in_progress"
+        return SimpleNamespace(id=batch_id, status=status, output_file_id="file-out", error_file_id="file-err")
+
+    def _content(self, file_id):
+        lines = []
+        for request in self.uploaded:
+            ok = request["custom_id"] != "1"
+            if (file_id == "file-out") != ok:
+                continue
+            body = {"choices": [{"message": {"content": '{"answer": "x"}'}}], "usage": {"prompt_tokens": 3}}
+            # Request 2 succeeds without a message, as a content-filtered completion can
+            if request["custom_id"] == "2":
+                body = {"choices": []}
+            lines.append(json.dumps({
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200 if ok else 400, "body": body if ok else {"error": {"message": "bad"}}}
+            }))
+        return SimpleNamespace(text="\n".join(lines))
+
+
+class TestBatchInference(unittest.TestCase):
+    """Test suite for get_structured_outputs"""
+
+    def test_parallel_keeps_order_with_per_item_errors(self):
+        """Test that results map one-to-one and a failed item does not fail the batch"""
+        results = FakeService().get_structured_outputs(["a", "fail", "c"], SCHEMA, mode="parallel")
+        self.assertEqual(results[0], {"answer": "a"})
+        self.assertIsInstance(results[1], LLMProviderError)
+        self.assertEqual(results[2], {"answer": "c"})
+
+    def test_batches_share_one_fan_out(self):
+        """Test that batches on two services go out in one run_concurrently call and map back per batch"""
+        heavy, light = FakeService(), FakeService()
+        fan_outs = []
+        run_concurrently = batch_inference.run_concurrently
+
+        def recording(funcs):
+            fan_outs.append(len(funcs))
+            return run_concurrently(funcs)
+
+        with mock.patch.object(batch_inference, "run_concurrently", recording):
+            business, columns = parallel_structured_output_batches([
+                (heavy.get_structured_output, ["a", "fail"], SCHEMA, "heavy"),
+                (light.get_structured_output, ["c"], {"type": "object", "required": ["other"]}, "light"),
+            ])
+        self.assertEqual(fan_outs, [3])
+        self.assertEqual(business[0], {"answer": "a"})
+        self.assertIsInstance(business[1], LLMProviderError)
+        self.assertIsInstance(columns[0], LLMResponseError)
+        self.assertEqual((heavy.prompts, light.prompts), (["a", "fail"], ["c"]))
+
+    def test_pack_mode_retries_unanswered_items(self):
+        """Test that packed prompts are unpacked by index and skipped items retried alone"""
+        service = FakeService()
+        prompts = [f"q{i}" for i in range(5)] + ["skip me"]
+        os.environ["LLM_BATCH_PACK_SIZE"] = "4"
+        try:
+            results = service.get_structured_outputs(prompts, SCHEMA, mode="pack")
+        finally:
+            del os.environ["LLM_BATCH_PACK_SIZE"]
+        self.assertEqual([r["answer"] for r in results], prompts)
+        self.assertEqual(len(service.prompts), 3)
+        self.assertIn("skip me", service.prompts)
+        self.assertIn("index", json.dumps(pack_prompt(["a"], SCHEMA)["schema"]))
+
+    def test_cache_sends_only_misses(self):
+        """Test that cached items are answered locally and the rest go out as one batch"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            service = FakeService()
+            cached = CachedInferenceService(service, cache=LLMResponseCache(os.path.join(tmpdir, "c.sqlite")))
+            cached.get_structured_output("a", SCHEMA)
+            results = cached.get_structured_outputs(["a", "b", "fail"], SCHEMA, mode="parallel")
+            self.assertEqual(results[:2], [{"answer": "a"}, {"answer": "b"}])
+            self.assertIsInstance(results[2], LLMProviderError)
+            self.assertEqual(service.prompts, ["a", "b", "fail"])
+            cached.cache.close()
+
+    def test_openai_batch_api_round_trip(self):
+        """Test upload, polling and mapping of output and error files back to requests"""
+        client = FakeOpenAIClient()
+        requests = [
+            {"custom_id": str(i), "method": "POST", "url": "/v1/chat/completions", "body": {"messages": []}}
+            for i in range(3)
+        ]
+        results = run_openai_batch(client, requests, poll_seconds=0, sleep=lambda s: None)
+        self.assertEqual(client.polls, 2)
+        self.assertEqual(results["0"]["choices"][0]["message"]["content"], '{"answer": "x"}')
+        self.assertIsInstance(results["1"], LLMProviderError)
+        self.assertEqual(results["1"].status_code, 400)
+        self.assertIn("2", results)
+
+    def test_openai_provider_batch_guards_each_item(self):
+        """Test that a completion without message content fails only its own item"""
+        service = OpenAIService(api_key="test")
+        service.client = FakeOpenAIClient()
+        with mock.patch.dict(os.environ, {"LLM_BATCH_POLL_SECONDS": "0"}):
+            results = service._provider_structured_outputs(["a", "b", "c"], SCHEMA)
+        self.assertEqual(results[0], {"answer": "x"})
+        self.assertIsInstance(results[1], LLMProviderError)
+        self.assertIsInstance(results[2], LLMResponseError)
+
+
+if __name__ == '__main__':
+    unittest.main()
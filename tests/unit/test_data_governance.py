@@ -106,6 +106,22 @@ class TestDataGovernanceService(unittest.TestCase):
         self.assertFalse(is_valid, "SELECT * should be blocked in strict mode")
         self.assertIn("SELECT *", error, "Error should mention SELECT *")
     
+    def test_validate_query_checks_nested_selects(self):
+        """Test that sensitive columns in CTEs and subqueries are blocked"""
+        queries = [
+            "WITH t AS (SELECT user_id, password AS p FROM users) SELECT user_id FROM t",
+            "SELECT x.user_id FROM (SELECT user_id, api_token FROM users) x",
+            "SELECT user_id, (SELECT MAX(secret) FROM vault) AS s FROM users",
+        ]
+        for sql in queries:
+            with self.subTest(sql=sql):
+                is_valid, error = self.governance.validate_query(sql)
+                self.assertFalse(is_valid)
+        
+        # Sensitive names in string literals or aliases are not column access
+        is_valid, _ = self.governance.validate_query("SELECT user_id AS password_reset, 'token' AS kind FROM users")
+        self.assertTrue(is_valid)
+    
     # Test: SQL Sanitization
     def test_sanitize_sql_masks_sensitive_columns(self):
         """Test that SQL sanitization replaces sensitive columns with masked values"""
@@ -125,6 +141,43 @@ class TestDataGovernanceService(unittest.TestCase):
         self.assertIn("'***MASKED***' AS pwd", sanitized)
         self.assertIn("user_id AS id", sanitized)
     
+    def test_sanitize_sql_masks_subquery_projection(self):
+        """Test that sanitization rewrites projections inside derived tables"""
+        sql = "SELECT x.user_id, x.pwd FROM (SELECT user_id, password AS pwd FROM users) x"
+        sanitized = self.governance.sanitize_sql(sql)
+        
+        self.assertIn("(SELECT user_id, '***MASKED***' AS pwd FROM users) x", sanitized)
+        self.assertTrue(self.governance.validate_query(sanitized)[0])
+    
+    def test_mask_sql_pushes_masking_into_projection(self):
+        """Test that sensitive projections are rewritten into SQL masking expressions"""
+        sql = "SELECT u.user_id, u.email, COUNT(*) AS token_count FROM users u GROUP BY u.user_id, u.email"
+        rewritten, complete = self.governance.mask_sql(sql)
+        
+        self.assertTrue(complete)
+        self.assertTrue(rewritten.startswith("SELECT u.user_id, CASE WHEN CAST(u.email AS CHAR) IS NULL"))
+        self.assertIn("CONCAT(LEFT(CAST(u.email AS CHAR), 1), '***@', SUBSTRING_INDEX(CAST(u.email AS CHAR), '@', -1))", rewritten)
+        self.assertIn("END AS `email`", rewritten)
+        self.assertIn("'***MASKED***' AS token_count", rewritten)
+        self.assertTrue(rewritten.endswith("FROM users u GROUP BY u.user_id, u.email"))
+        
+        # Unresolvable projections still need the Python post-pass
+        self.assertEqual(self.governance.mask_sql("SELECT * FROM users"), ("SELECT * FROM users", False))
+    
+    def test_mask_sql_keeps_order_of_masked_columns(self):
+        """Test that ORDER BY on a masked output sorts by the original value, not the masked one"""
+        rewritten, _ = self.governance.mask_sql("SELECT u.user_id, u.email FROM users u ORDER BY email DESC, 1 LIMIT 5")
+        self.assertTrue(rewritten.endswith("END AS `email` FROM users u ORDER BY u.email DESC, 1 LIMIT 5"))
+        
+        rewritten, _ = self.governance.mask_sql(
+            "SELECT u.user_id, COUNT(*) AS token_count FROM users u GROUP BY u.user_id ORDER BY 2 DESC"
+        )
+        self.assertTrue(rewritten.endswith("GROUP BY u.user_id ORDER BY COUNT(*) DESC"))
+        
+        # A set operation can only be ordered by output names, so masking stays in Python
+        sql = "SELECT email FROM users UNION SELECT email FROM sellers ORDER BY email"
+        self.assertEqual(self.governance.mask_sql(sql), (sql, False))
+    
     # Test: Result Masking
     def test_mask_results_full_masking(self):
         """Test that sensitive values in results are fully masked"""
@@ -166,6 +219,57 @@ class TestDataGovernanceService(unittest.TestCase):
         self.assertIn("***", masked[0]["phone_number"])
         self.assertNotEqual(masked[0]["phone_number"], "+1-555-123-4567")
     
+    def test_mask_results_in_place_uses_schema_plan(self):
+        """Test in-place masking and the per-schema masking plan"""
+        results = [
+            {"user_id": 1, "email": "john.doe@example.com", "password": "secret123"},
+            {"user_id": 2, "email": "jane@company.org", "password": "password456"}
+        ]
+        
+        self.assertEqual(
+            self.governance.masking_plan(list(results[0].keys())),
+            (["email"], ["password"])
+        )
+        
+        copied = self.governance.mask_results(results)
+        self.assertEqual(results[0]["password"], "secret123")  # Input untouched by default
+        
+        masked = self.governance.mask_results(results, in_place=True)
+        self.assertIs(masked, results)
+        self.assertEqual(results[1]["password"], "***MASKED***")
+        self.assertEqual(results[0]["email"], copied[0]["email"])
+        self.assertEqual(results[0]["user_id"], 1)
+        
+        # Without sensitive columns the result is still a copy unless in_place
+        plain = [{"user_id": 1, "username": "john"}]
+        copied = self.governance.mask_results(plain)
+        self.assertIsNot(copied, plain)
+        self.assertIsNot(copied[0], plain[0])
+        self.assertEqual(copied, plain)
+        self.assertIs(self.governance.mask_results(plain, in_place=True), plain)
+    
+    def test_mask_columnar_masks_whole_columns(self):
+        """Test column-wise masking of a columnar result"""
+        from src.modules.columnar_result import ColumnarResult
+
+        result = ColumnarResult(
+            ["user_id", "email", "password"],
+            {
+                "user_id": [1, 2],
+                "email": ["john.doe@example.com", "jane@company.org"],
+                "password": ["secret123", "password456"]
+            }
+        )
+
+        masked = self.governance.mask_columnar(result)
+
+        self.assertEqual(list(masked.column("password")), ["***MASKED***", "***MASKED***"])
+        self.assertEqual(list(masked.column("user_id")), [1, 2])
+        self.assertIn("@example.com", masked.column("email")[0])
+        self.assertNotEqual(masked.column("email")[0], "john.doe@example.com")
+        # Same values as row-wise masking
+        self.assertEqual(masked.to_rows(), self.governance.mask_results(result.to_rows()))
+
     # Test: Schema Filtering
     def test_get_safe_columns_filters_sensitive(self):
         """Test that sensitive columns are filtered from schema"""
@@ -220,6 +324,28 @@ class TestDataGovernanceService(unittest.TestCase):
         finally:
             os.unlink(csv_path)
     
+    def test_reload_keywords_invalidates_cached_decisions(self):
+        """Test that reloading the keyword CSV drops memoized column decisions"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+            f.write("keyword,mask_type\n")
+            f.write("salary,full\n")
+            csv_path = f.name
+        
+        try:
+            custom_governance = DataGovernanceService(sensitive_keywords_csv=csv_path)
+            self.assertTrue(custom_governance.is_sensitive_column("base_salary"))
+            self.assertFalse(custom_governance.is_sensitive_column("bonus"))
+            
+            with open(csv_path, 'w') as f:
+                f.write("keyword,mask_type\n")
+                f.write("bonus,full\n")
+            custom_governance.reload_keywords()
+            
+            self.assertFalse(custom_governance.is_sensitive_column("base_salary"))
+            self.assertTrue(custom_governance.is_sensitive_column("bonus"))
+        finally:
+            os.unlink(csv_path)
+    
     # Test: Governance Summary
     def test_get_governance_summary(self):
         """Test that governance summary returns correct configuration"""
@@ -0,0 +1,88 @@
+"""
+Unit tests for LexicalIntentIndex
+
+Tests table, column and categorical value matches, the ambiguity and coverage
+checks that send a query to the LLM, and caching on the graph version.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.modules.lexical_index import singularize, tokenize
+from src.modules.semantic_graph import SemanticGraph
+
+
+def build_graph():
+    graph = SemanticGraph()
+    graph.add_node("users", node_type="table", properties={"description": "Registered customers"})
+    graph.add_node("orders", node_type="table", properties={"description": "Customer purchases"})
+    graph.add_node("payments", node_type="table")
+    graph.add_node("users.gender", node_type="attribute",
+                   properties={"is_categorical": True, "sample_values": ["Male", "Female"]})
+    graph.add_node("users.is_active", node_type="attribute")
+    graph.add_node("orders.order_status", node_type="attribute",
+                   properties={"is_categorical": True, "sample_values": ["Delivered", "Pending"]})
+    graph.add_node("orders.payment_method", node_type="attribute",
+                   properties={"is_categorical": True, "sample_values": ["COD", "Card"]})
+    graph.add_node("payments.payment_status", node_type="attribute",
+                   properties={"is_categorical": True, "sample_values": ["Pending", "Paid"]})
+    graph.add_edge("users", "orders", condition="foreign_key")
+    graph.add_edge("orders", "payments", condition="foreign_key")
+    return graph
+
+
+class TestLexicalIntentIndex(unittest.TestCase):
+    """Test suite for LexicalIntentIndex.resolve"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.graph = build_graph()
+        self.index = self.graph.lexical_index()
+
+    def test_tokenize(self):
+        """Test singular forms and underscore splitting"""
+        self.assertEqual([singularize(w) for w in ("orders", "categories", "boxes", "status")],
+                         ["order", "category", "box", "status"])
+        self.assertEqual(tokenize("Order_Items"), ["order", "item"])
+
+    def test_table_and_value_matches(self):
+        """Test that table names anchor the intent and categorical values become conditions"""
+        intent = self.index.resolve("How many users are there?")["intent"]
+        self.assertEqual(intent, {"start_node": ["users"], "end_node": ["users"], "condition": ""})
+
+        intent = self.index.resolve("How many users are female?")["intent"]
+        self.assertEqual(intent["condition"], "users.gender = 'Female'")
+
+        intent = self.index.resolve("List active users")["intent"]
+        self.assertEqual(intent["start_node"], ["users"])
+
+        intent = self.index.resolve("Show users with their orders")["intent"]
+        self.assertEqual((intent["start_node"], intent["end_node"]), (["users"], ["orders"]))
+
+    def test_table_name_inside_column_name(self):
+        """Test that "COD payment" filters orders instead of joining payments"""
+        result = self.index.resolve("Show all orders with COD payment")
+        self.assertEqual(result["tables"], ["orders"])
+        self.assertEqual(result["intent"]["condition"], "orders.payment_method = 'COD'")
+
+    def test_unresolved_queries_fall_back(self):
+        """Test the reasons that leave a query to the LLM"""
+        self.assertEqual(self.index.resolve("Show pending")["reason"], "ambiguous_match")
+        self.assertEqual(self.index.resolve("how many are there")["reason"], "no_content_words")
+        self.assertEqual(self.index.resolve("revenue forecast next quarter")["reason"], "no_table")
+        self.assertEqual(self.index.resolve("users who churned after the spring campaign")["reason"], "low_coverage")
+
+    def test_index_rebuilt_when_graph_changes(self):
+        """Test caching on the graph version"""
+        self.assertIs(self.graph.lexical_index(), self.index)
+        self.graph.add_node("reviews", node_type="table")
+        self.assertIsNot(self.graph.lexical_index(), self.index)
+        self.assertEqual(self.graph.lexical_index().resolve("list reviews")["tables"], ["reviews"])
+
+
+if __name__ == '__main__':
+    unittest.main()
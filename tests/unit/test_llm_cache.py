@@ -0,0 +1,153 @@
+"""
+Unit tests for the LLM response cache
+
+Tests cache hits across instances, key separation by model and schema,
+TTL expiry, LRU eviction and the readonly/replay modes.
+"""
+
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.llm_cache_service import CachedInferenceService, LLMCacheMiss, LLMResponseCache
+
+
+class FakeInferenceService:
+    """Counts provider calls and echoes the prompt"""
+
+    def __init__(self, model="fake-model"):
+        self.model = model
+        self.calls = 0
+
+    def get_structured_output(self, content, json_schema):
+        self.calls += 1
+        return {"content": content}
+
+    def chat_completion(self, message, context=None):
+        self.calls += 1
+        if message == "fail":
+            return ""
+        return f"reply to {message}"
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    """Test suite for LLMResponseCache and CachedInferenceService"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache", "llm.sqlite")
+
+    def tearDown(self):
+        """Clean up after tests"""
+        self.tmpdir.cleanup()
+
+    def test_hits_are_persisted_across_instances(self):
+        """Test that a response stored by one process is served to the next"""
+        schema = {"type": "object"}
+        service = FakeInferenceService()
+        cached = CachedInferenceService(service, LLMResponseCache(self.path), mode="readwrite")
+        self.assertEqual(cached.get_structured_output("q", schema), {"content": "q"})
+        self.assertEqual(cached.get_structured_output("q", schema), {"content": "q"})
+        self.assertEqual(service.calls, 1)
+
+        reopened = CachedInferenceService(service, LLMResponseCache(self.path), mode="readwrite")
+        reopened.get_structured_output("q", schema)
+        self.assertEqual(service.calls, 1)
+
+        # Different schema or model is a different key
+        reopened.get_structured_output("q", {"type": "array"})
+        CachedInferenceService(FakeInferenceService("other"), reopened.cache).get_structured_output("q", schema)
+        self.assertEqual(service.calls, 2)
+
+    def test_errors_are_not_cached(self):
+        """Test that empty responses are returned but never stored"""
+        service = FakeInferenceService()
+        cached = CachedInferenceService(service, LLMResponseCache(":memory:"), mode="readwrite")
+        cached.chat_completion("fail")
+        cached.chat_completion("fail")
+        self.assertEqual(service.calls, 2)
+        self.assertEqual(len(cached.cache), 0)
+
+    def test_ttl_and_lru_eviction(self):
+        """Test that expired entries miss and the least recently used entry is evicted"""
+        cache = LLMResponseCache(":memory:", ttl_seconds=0.05, max_entries=0)
+        cache.set("a", "1")
+        self.assertEqual(cache.get("a"), "1")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+
+        cache = LLMResponseCache(":memory:", ttl_seconds=0, max_entries=2)
+        cache.set("a", "1")
+        time.sleep(0.01)
+        cache.set("b", "2")
+        time.sleep(0.01)
+        cache.get("a")
+        cache.set("c", "3")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+
+    def test_readonly_and_replay_modes(self):
+        """Test that readonly never stores and replay raises on a miss"""
+        service = FakeInferenceService()
+        cache = LLMResponseCache(":memory:")
+        readonly = CachedInferenceService(service, cache, mode="readonly")
+        self.assertEqual(readonly.chat_completion("hi"), "reply to hi")
+        self.assertEqual(len(cache), 0)
+
+        CachedInferenceService(service, cache, mode="readwrite").chat_completion("hi")
+        replay = CachedInferenceService(service, cache, mode="replay")
+        calls = service.calls
+        self.assertEqual(replay.chat_completion("hi"), "reply to hi")
+        self.assertEqual(service.calls, calls)
+        with self.assertRaises(LLMCacheMiss):
+            replay.chat_completion("hi", context="other context")
+
+        with self.assertRaises(ValueError):
+            CachedInferenceService(service, cache, mode="bogus")
+
+    def test_replay_opens_file_read_only(self):
+        """Test that replay and readonly modes never modify the cache file"""
+        service = FakeInferenceService()
+        writer = CachedInferenceService(service, LLMResponseCache(self.path), mode="readwrite")
+        writer.chat_completion("hi")
+        writer.cache.close()
+        with open(self.path, "rb") as f:
+            recorded = f.read()
+
+        with mock.patch.dict(os.environ, {"LLM_CACHE_PATH": self.path}):
+            replay = CachedInferenceService(service, mode="replay")
+            readonly = CachedInferenceService(service, mode="readonly")
+        self.assertTrue(replay.cache.readonly and readonly.cache.readonly)
+        self.assertEqual(replay.chat_completion("hi"), "reply to hi")
+        self.assertEqual(readonly.chat_completion("new"), "reply to new")
+        with self.assertRaises(sqlite3.OperationalError):
+            replay.cache.set("key", "value")
+        replay.cache.close()
+        readonly.cache.close()
+
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), recorded)
+
+    def test_missing_file_outside_readwrite_mode(self):
+        """Test that a missing file is an empty cache when readonly and a configuration error on replay"""
+        service = FakeInferenceService()
+        with mock.patch.dict(os.environ, {"LLM_CACHE_PATH": self.path}):
+            readonly = CachedInferenceService(service, mode="readonly")
+            with self.assertRaises(ValueError):
+                CachedInferenceService(service, mode="replay")
+        self.assertEqual(readonly.chat_completion("hi"), "reply to hi")
+        self.assertEqual(len(readonly.cache), 0)
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Unit tests for the local LLM stand-in server
+
+Tests replay by prompt hash over the Ollama and OpenAI-compatible endpoints,
+misses, injected latency and streamed responses.
+"""
+
+import unittest
+import os
+import sys
+import json
+import time
+import urllib.error
+import urllib.request
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.llm_stand_in import LLMStandInServer, parse_latency, prompt_hash
+
+
+def post(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read().decode("utf-8")
+
+
+class TestLLMStandIn(unittest.TestCase):
+    """Test suite for LLMStandInServer"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.messages = [{"role": "user", "content": "How many customers?"}]
+        self.server = LLMStandInServer().start()
+        self.server.add_response(self.messages, {"sql": "SELECT COUNT(*) FROM customers"})
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.server.stop()
+
+    def test_replays_on_both_protocols(self):
+        """Test that a recorded prompt is replayed with usage on /api/chat and /chat/completions"""
+        ollama = json.loads(post(f"{self.server.url}/api/chat", {"model": "m", "messages": self.messages}))
+        self.assertEqual(json.loads(ollama["message"]["content"])["sql"], "SELECT COUNT(*) FROM customers")
+        self.assertGreater(ollama["prompt_eval_count"], 0)
+
+        openai = json.loads(post(f"{self.server.url}/v1/chat/completions", {"messages": self.messages}))
+        self.assertEqual(openai["choices"][0]["message"]["content"], ollama["message"]["content"])
+        self.assertEqual(openai["usage"]["total_tokens"], ollama["prompt_eval_count"] + ollama["eval_count"])
+        self.assertEqual(self.server.stats["hits"], 2)
+
+    def test_miss_returns_404(self):
+        """Test that an unrecorded prompt fails unless a default response is set"""
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            post(f"{self.server.url}/api/chat", {"messages": [{"role": "user", "content": "unknown"}]})
+        self.assertEqual(ctx.exception.code, 404)
+
+        self.server.default_response = "fallback"
+        body = json.loads(post(f"{self.server.url}/chat/completions", {"messages": [{"role": "user", "content": "x"}]}))
+        self.assertEqual(body["choices"][0]["message"]["content"], "fallback")
+
+    def test_streams_reassemble(self):
+        """Test that NDJSON and SSE streams join back to the recorded content"""
+        expected = json.dumps({"sql": "SELECT COUNT(*) FROM customers"})
+        lines = post(f"{self.server.url}/api/chat", {"messages": self.messages, "stream": True}).splitlines()
+        chunks = [json.loads(line) for line in lines]
+        self.assertEqual("".join(c["message"]["content"] for c in chunks), expected)
+        self.assertTrue(chunks[-1]["done"])
+
+        events = [
+            line[len("data: "):]
+            for line in post(f"{self.server.url}/chat/completions", {"messages": self.messages, "stream": True}).splitlines()
+            if line.startswith("data: ")
+        ]
+        self.assertEqual(events[-1], "[DONE]")
+        content = "".join(
+            choice["delta"].get("content", "") for event in events[:-1] for choice in json.loads(event)["choices"]
+        )
+        self.assertEqual(content, expected)
+
+    def test_latency_and_hashing(self):
+        """Test injected latency, spec parsing and that the date-time system message is ignored"""
+        self.server.latency = parse_latency("fixed:0.2")
+        started = time.monotonic()
+        post(f"{self.server.url}/api/chat", {"messages": self.messages})
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+        with self.assertRaises(ValueError):
+            parse_latency("uniform:1")
+        dated = [{"role": "system", "content": "Current Date Time: 2024-01-01"}] + self.messages
+        self.assertEqual(prompt_hash(dated), prompt_hash(self.messages))
+        self.assertEqual(prompt_hash("How many customers?"), prompt_hash(self.messages))
+
+
+if __name__ == '__main__':
+    unittest.main()
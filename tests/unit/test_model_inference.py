@@ -0,0 +1,68 @@
+"""
+Unit tests for ModelInferenceService
+
+Runs the `model` provider against the local LLM stand-in, so the full path
+Model.chat -> /chat/completions -> response parsing (and the streaming
+variant with its typed errors) is exercised.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.models.model import Model
+from src.services.inference import ModelInferenceService
+from src.services.llm_errors import LLMProviderError, LLMResponseError
+from src.services.llm_stand_in import LLMStandInServer
+
+SQL_SCHEMA = {
+    "type": "object",
+    "properties": {"sql": {"type": "string"}},
+    "required": ["sql"]
+}
+
+
+class TestModelInferenceService(unittest.TestCase):
+    """Test suite for ModelInferenceService"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.server = LLMStandInServer().start()
+        model = Model(model_name="stand-in", api_base=self.server.url, api_key="test")
+        self.service = ModelInferenceService(model)
+
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.server.stop()
+
+    def test_structured_output_parses_message_content(self):
+        """Test that the JSON object in choices[0].message.content is returned, not the completion"""
+        content = "How many customers?"
+        messages, _ = ModelInferenceService._structured_request(content, SQL_SCHEMA)
+        self.server.add_response(messages, {"sql": "SELECT COUNT(*) FROM customers"})
+
+        result = self.service.get_structured_output(content, SQL_SCHEMA)
+        self.assertEqual(result, {"sql": "SELECT COUNT(*) FROM customers"})
+        self.assertEqual(self.server.stats["hits"], 1)
+
+    def test_structured_output_rejects_non_json_content(self):
+        """Test that content that is not JSON raises LLMResponseError"""
+        self.server.default_response = "not json"
+        with self.assertRaises(LLMResponseError):
+            self.service.get_structured_output("How many customers?", SQL_SCHEMA)
+
+    def test_stream_raises_typed_errors(self):
+        """Test that a failed stream raises LLMProviderError instead of the raw HTTP error"""
+        with self.assertRaises(LLMProviderError) as ctx:
+            list(self.service.stream_chat_completion("unrecorded question"))
+        self.assertEqual(ctx.exception.status_code, 404)
+
+        self.server.default_response = "streamed answer"
+        self.assertEqual("".join(self.service.stream_chat_completion("unrecorded question")), "streamed answer")
+
+
+if __name__ == '__main__':
+    unittest.main()
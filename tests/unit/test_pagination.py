@@ -0,0 +1,146 @@
+"""
+Unit tests for QueryPaginator
+
+Tests ORDER BY / LIMIT parsing, keyset vs OFFSET page queries,
+and cursor expiry.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.pagination_service import QueryPaginator, PaginationError
+
+
+class FakeQueryService:
+    """Records executed SQL and returns queued row sets"""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.calls = []
+
+    def execute_query(self, sql, asDict=True, schema_context=None, columnar=False, params=None):
+        self.calls.append((sql, params))
+        return self.pages.pop(0)
+
+
+def rows(*values):
+    return [{"seller": f"s{v}", "revenue": v} for v in values]
+
+
+class TestQueryPaginator(unittest.TestCase):
+    """Test suite for QueryPaginator"""
+
+    def test_parse_order_by_and_limit(self):
+        """Test parsing of top-level ORDER BY and LIMIT clauses"""
+        paginator = QueryPaginator(FakeQueryService([]))
+        sql = "SELECT s.name, SUM(o.total) AS revenue FROM (SELECT * FROM t ORDER BY x) s ORDER BY revenue DESC, s.name DESC LIMIT 5, 10"
+
+        body, limit, offset = paginator._split_limit(sql)
+        self.assertEqual((limit, offset), (10, 5))
+        self.assertEqual(paginator._parse_order_by(body), [("revenue", "DESC"), ("s.name", "DESC")])
+
+    def test_keyset_pagination_on_order_by_column(self):
+        """Test that follow-up pages seek on the ORDER BY column"""
+        service = FakeQueryService([rows(9, 8, 7), rows(8, 7, 6, 5)])
+        paginator = QueryPaginator(service)
+        sql = "SELECT seller, SUM(total) AS revenue FROM orders GROUP BY seller ORDER BY revenue DESC;"
+
+        first, cursor = paginator.first_page(sql, 2)
+        self.assertEqual([r["revenue"] for r in first], [9, 8])
+        self.assertTrue(service.calls[0][0].endswith("ORDER BY revenue DESC LIMIT %s OFFSET %s"))
+        self.assertEqual(service.calls[0][1], (3, 0))
+
+        sql_out, second, next_cursor = paginator.next_page(cursor)
+        page_sql, params = service.calls[1]
+        self.assertIn("WHERE (`revenue` <= %s OR `revenue` IS NULL)", page_sql)
+        self.assertEqual(params, (8, 1 + 2 + 1))
+        # The row already returned for the last key is skipped
+        self.assertEqual([r["revenue"] for r in second], [7, 6])
+        self.assertIsNotNone(next_cursor)
+
+    def test_offset_fallback_for_expressions(self):
+        """Test OFFSET fallback when ORDER BY is not an output column"""
+        service = FakeQueryService([rows(1, 2, 3), rows(3)])
+        paginator = QueryPaginator(service)
+        sql = "SELECT seller, total AS revenue FROM orders ORDER BY LOWER(seller)"
+
+        _, cursor = paginator.first_page(sql, 2)
+        _, page, next_cursor = paginator.next_page(cursor)
+
+        self.assertEqual(service.calls[1][1], (3, 2))
+        self.assertNotIn("WHERE (", service.calls[1][0])
+        self.assertEqual(len(page), 1)
+        self.assertIsNone(next_cursor)
+
+    def test_offset_fallback_for_qualified_or_duplicate_keys(self):
+        """Test OFFSET when the ORDER BY key is qualified or the projection repeats a name"""
+        for sql in (
+            "SELECT o.id, u.name FROM orders o JOIN users u ON u.id = o.user_id ORDER BY u.id",
+            "SELECT o.id, u.id, u.name FROM orders o JOIN users u ON u.id = o.user_id ORDER BY name",
+            "SELECT * FROM orders ORDER BY id",
+        ):
+            page = [{"id": i, "name": f"n{i}"} for i in (1, 2, 3)]
+            service = FakeQueryService([page, page[2:]])
+            paginator = QueryPaginator(service)
+            _, cursor = paginator.first_page(sql, 2)
+            paginator.next_page(cursor)
+            self.assertNotIn("_page", service.calls[1][0], sql)
+            self.assertEqual(service.calls[1][1], (3, 2))
+
+        # An unqualified key that is a unique output column still seeks
+        page = [{"id": i, "name": f"n{i}"} for i in (1, 2, 3)]
+        service = FakeQueryService([page, page[2:]])
+        paginator = QueryPaginator(service)
+        _, cursor = paginator.first_page("SELECT o.id, u.name FROM orders o JOIN users u ON u.id = o.user_id ORDER BY id", 2)
+        paginator.next_page(cursor)
+        self.assertIn("WHERE (`id`) >= (%s)", service.calls[1][0])
+
+    def test_keyset_keeps_nulls_and_avoids_collation_ties(self):
+        """Test that DESC pages reach NULL keys and string or multi-column DESC keys use OFFSET"""
+        page = [{"seller": "s", "revenue": v} for v in (9, 8, 7)]
+        service = FakeQueryService([page, [{"seller": "s", "revenue": None}]])
+        paginator = QueryPaginator(service)
+        _, cursor = paginator.first_page("SELECT seller, revenue FROM s ORDER BY revenue DESC", 2)
+        paginator.next_page(cursor)
+        self.assertIn("`revenue` IS NULL", service.calls[1][0])
+
+        for sql, page in (
+            ("SELECT seller, revenue FROM s ORDER BY seller", [{"seller": x, "revenue": 1} for x in ("a", "Foo", "foo")]),
+            ("SELECT seller, revenue FROM s ORDER BY revenue DESC, seller DESC",
+             [{"seller": "s", "revenue": v} for v in (3, 2, 1)]),
+        ):
+            service = FakeQueryService([page, page[2:]])
+            paginator = QueryPaginator(service)
+            _, cursor = paginator.first_page(sql, 2)
+            paginator.next_page(cursor)
+            self.assertNotIn("_page", service.calls[1][0], sql)
+            self.assertEqual(service.calls[1][1], (3, 2))
+
+    def test_respects_original_limit(self):
+        """Test that paging never goes past a LIMIT in the generated SQL"""
+        service = FakeQueryService([rows(1, 2, 3)])
+        paginator = QueryPaginator(service)
+        paginator.first_page("SELECT seller, total AS revenue FROM orders LIMIT 2", 5)
+        self.assertEqual(service.calls[0][1], (2, 0))
+
+    def test_escapes_percent_literals(self):
+        """Test that LIKE patterns survive parameter binding"""
+        service = FakeQueryService([rows(1)])
+        QueryPaginator(service).first_page("SELECT seller FROM s WHERE seller LIKE '%shop%'", 5)
+        self.assertIn("'%%shop%%'", service.calls[0][0])
+
+    def test_expired_cursor_raises(self):
+        """Test that unknown or expired cursors are rejected"""
+        service = FakeQueryService([rows(3, 2, 1)])
+        paginator = QueryPaginator(service, ttl_seconds=0.000001)
+        _, cursor = paginator.first_page("SELECT seller, total AS revenue FROM orders", 2)
+        with self.assertRaises(PaginationError):
+            paginator.next_page(cursor)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
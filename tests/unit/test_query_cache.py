@@ -0,0 +1,98 @@
+"""
+Unit tests for QueryPlanCache
+
+Tests query normalization, LRU and TTL eviction and invalidation when the
+graph snapshot changes.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.modules.semantic_graph import SemanticGraph
+from src.services.query_cache import QueryPlanCache, normalize_query
+
+INTENT = {"start_node": ["sellers"], "end_node": ["orders"], "condition": ""}
+
+
+class FakeClock:
+    """Manually advanced time source"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQueryPlanCache(unittest.TestCase):
+    """Test suite for QueryPlanCache"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.graph = SemanticGraph()
+        self.graph.add_node("sellers", node_type="table")
+        self.clock = FakeClock()
+        self.cache = QueryPlanCache(enabled=True, max_entries=2, ttl_seconds=60, clock=self.clock)
+
+    def test_normalize_query(self):
+        """Test that case, punctuation and filler words are ignored but numbers and negations kept"""
+        self.assertEqual(normalize_query("Top 10 sellers by revenue?"), normalize_query("top 10 sellers  by revenue"))
+        self.assertEqual(normalize_query("Please show me the orders"), "orders")
+        self.assertEqual(normalize_query("What's the average rating above 4.5?"), "average rating above 4.5")
+        self.assertNotEqual(normalize_query("top 10 sellers"), normalize_query("top 5 sellers"))
+        self.assertNotEqual(normalize_query("orders not shipped"), normalize_query("orders shipped"))
+
+    def test_normalize_keeps_operators_and_signs(self):
+        """Test that comparison operators and negative numbers are part of the key"""
+        for a, b in (
+            ("orders with amount > 100", "orders with amount < 100"),
+            ("orders with amount >= 100", "orders with amount > 100"),
+            ("orders with amount = 100", "orders with amount != 100"),
+            ("balance above -5", "balance above 5"),
+        ):
+            self.assertNotEqual(normalize_query(a), normalize_query(b))
+        self.assertEqual(normalize_query("amount <> 3"), normalize_query("amount != 3"))
+        self.assertEqual(normalize_query("e-commerce orders since 2024-01-05"), "e commerce orders since 2024 01 05")
+
+        self.cache.put("orders with amount > 100", self.graph, INTENT, [], "SELECT * FROM orders WHERE amount > 100")
+        self.assertIsNone(self.cache.get("orders with amount < 100", self.graph))
+
+    def test_hit_on_reworded_question(self):
+        """Test that a stored plan is served for the same normalized question"""
+        self.cache.put("Top 10 sellers by revenue", self.graph, INTENT, ["sellers", "orders"], "SELECT 1")
+        plan = self.cache.get("top 10 sellers by revenue?", self.graph)
+        self.assertEqual(plan, {"intent": INTENT, "path": ["sellers", "orders"], "sql": "SELECT 1"})
+        self.assertIsNone(self.cache.get("top 5 sellers by revenue", self.graph))
+        stats = self.cache.snapshot()
+        self.assertEqual((stats["hit"], stats["miss"], stats["hit_rate"]), (1, 1, 0.5))
+        self.assertIn('nlq_query_cache_lookups_total{result="hit"} 1', self.cache.to_prometheus())
+
+    def test_lru_and_ttl_eviction(self):
+        """Test that the least recently used entry is evicted and old entries expire"""
+        self.cache.put("users", self.graph, INTENT, [], "SELECT 1")
+        self.cache.put("orders", self.graph, INTENT, [], "SELECT 2")
+        self.cache.get("users", self.graph)
+        self.cache.put("sellers", self.graph, INTENT, [], "SELECT 3")
+        self.assertIsNone(self.cache.get("orders", self.graph))
+        self.assertIsNotNone(self.cache.get("users", self.graph))
+
+        self.clock.now = 61
+        self.assertIsNone(self.cache.get("sellers", self.graph))
+
+    def test_invalidated_when_graph_changes(self):
+        """Test that a graph change or a different graph drops all entries"""
+        self.cache.put("users", self.graph, INTENT, [], "SELECT 1")
+        self.graph.add_node("users", node_type="table")
+        self.assertIsNone(self.cache.get("users", self.graph))
+        self.assertEqual(self.cache.snapshot()["invalidated"], 1)
+
+        self.cache.put("users", self.graph, INTENT, [], "SELECT 1")
+        self.assertIsNone(self.cache.get("users", SemanticGraph()))
+
+
+if __name__ == '__main__':
+    unittest.main()
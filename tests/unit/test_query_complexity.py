@@ -0,0 +1,67 @@
+"""
+Unit tests for QueryComplexityClassifier
+
+Tests the heuristic prescreen, the vector-confidence check and the hit-rate
+accounting used to tune refinement skipping.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.query_complexity import QueryComplexityClassifier
+
+
+class TestQueryComplexityClassifier(unittest.TestCase):
+    """Test suite for QueryComplexityClassifier"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.classifier = QueryComplexityClassifier(enabled=True, max_words=12, max_distance=0.8, max_tables=2, top_k=5)
+
+    def test_prescreen(self):
+        """Test that trivial queries pass and multi-step or vague ones are flagged"""
+        self.assertTrue(self.classifier.prescreen("How many users are there?")["simple"])
+        self.assertTrue(self.classifier.prescreen("list all product categories")["simple"])
+        self.assertIn("complex_terms", self.classifier.prescreen("top 5 sellers per month")["reasons"])
+        self.assertIn("multiple_conditions", self.classifier.prescreen("orders shipped and paid")["reasons"])
+        self.assertIn("vague_reference", self.classifier.prescreen("show me those")["reasons"])
+        self.assertIn("long_query", self.classifier.prescreen(" ".join(["word"] * 13))["reasons"])
+        disabled = QueryComplexityClassifier(enabled=False)
+        self.assertEqual(disabled.prescreen("How many users are there?")["reasons"], ["disabled"])
+
+    def test_check_confidence(self):
+        """Test the best-hit distance threshold and the table spread of the top hits"""
+        close = [("users", 0.4), ("users.user_id", 0.5), ("users.email", 0.6)]
+        self.assertTrue(self.classifier.check_confidence(close)["simple"])
+
+        far = [("users", 1.2), ("users.user_id", 1.3)]
+        self.assertEqual(self.classifier.check_confidence(far)["reasons"], ["low_confidence"])
+
+        spread = [("users", 0.3), ("orders.total", 0.4), ("products", 0.5), ("reviews.rating", 0.5)]
+        self.assertEqual(self.classifier.check_confidence(spread)["reasons"], ["ambiguous_tables"])
+        self.assertEqual(self.classifier.check_confidence([("users", None)])["reasons"], ["no_vector_scores"])
+
+    def test_hit_rate_accounting(self):
+        """Test decision counters, skip rate and the Prometheus export"""
+        self.classifier.record(skipped=True, reasons=[])
+        self.classifier.record(skipped=True, reasons=[])
+        self.classifier.record(skipped=False, reasons=["complex_terms", "long_query"])
+        self.classifier.record(skipped=False, reasons=["low_confidence"])
+        self.classifier.record_correction_after_skip()
+
+        snapshot = self.classifier.snapshot()
+        self.assertEqual((snapshot["queries"], snapshot["skipped"], snapshot["skip_rate"]), (4, 2, 0.5))
+        self.assertEqual(snapshot["refined_by_reason"], {"complex_terms": 1, "low_confidence": 1})
+        self.assertEqual(snapshot["corrected_after_skip"], 1)
+
+        text = self.classifier.to_prometheus()
+        self.assertIn('nlq_refine_decisions_total{decision="skipped",reason="simple"} 2', text)
+        self.assertIn("nlq_refine_skipped_corrected_total 1", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Unit tests for QueryCostGuard
+
+Tests plan parsing, full scan detection against profiled row counts,
+and the reject / limit / correct actions.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.modules.semantic_graph import SemanticGraph
+from src.services.query_cost_service import QueryCostGuard
+
+
+class FakeExplainService:
+    """Returns a canned EXPLAIN FORMAT=JSON plan"""
+
+    def __init__(self, plan):
+        self.plan = plan
+
+    def explain_query(self, sql):
+        return self.plan
+
+
+JOIN_PLAN = {
+    "query_block": {
+        "select_id": 1,
+        "nested_loop": [
+            {"table": {"table_name": "o", "access_type": "ALL",
+                       "rows_examined_per_scan": 5000, "rows_produced_per_join": 5000}},
+            {"table": {"table_name": "c", "access_type": "eq_ref", "key": "PRIMARY",
+                       "rows_examined_per_scan": 1, "rows_produced_per_join": 5000}}
+        ]
+    }
+}
+
+SQL = "SELECT c.name, o.total FROM orders o JOIN customers AS c ON o.customer_id = c.customer_id"
+
+
+class TestQueryCostGuard(unittest.TestCase):
+    """Test suite for QueryCostGuard"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.graph = SemanticGraph()
+        self.graph.add_node("orders", node_type="table", properties={"row_count": 2000000})
+        self.graph.add_node("customers", node_type="table", properties={"row_count": 1000})
+
+    def _guard(self, **kwargs):
+        params = {"enabled": True, "max_rows_examined": 100000, "full_scan_threshold": 100000}
+        params.update(kwargs)
+        return QueryCostGuard(FakeExplainService(JOIN_PLAN), self.graph, **params)
+
+    def test_estimate_resolves_aliases_and_profiled_rows(self):
+        """Test that plan aliases map to graph tables and profiled row counts"""
+        estimate = self._guard().estimate(SQL)
+
+        self.assertEqual(estimate["rows_examined"], 10000)
+        self.assertEqual(len(estimate["full_scans"]), 1)
+        self.assertEqual(estimate["full_scans"][0]["table"], "orders")
+        self.assertEqual(estimate["full_scans"][0]["rows"], 2000000)
+
+    def test_disabled_guard_passes_through(self):
+        """Test that a disabled guard never calls EXPLAIN"""
+        result = QueryCostGuard(FakeExplainService(None), self.graph, enabled=False).check(SQL)
+        self.assertEqual(result["verdict"], "ok")
+        self.assertEqual(result["sql"], SQL)
+
+    def test_limit_action_appends_limit(self):
+        """Test that the limit action caps expensive queries"""
+        result = self._guard(action="limit", auto_limit=50).check(SQL + ";")
+        self.assertEqual(result["verdict"], "limit")
+        self.assertTrue(result["sql"].endswith("LIMIT 50"))
+
+    def test_limit_action_rejects_when_limit_present(self):
+        """Test that an existing LIMIT cannot be tightened and is rejected"""
+        result = self._guard(action="limit").check(SQL + " LIMIT 10")
+        self.assertEqual(result["verdict"], "reject")
+
+    def test_correct_action_feedback_includes_plan(self):
+        """Test that correction feedback describes the plan"""
+        guard = self._guard(action="correct")
+        result = guard.check(SQL)
+        self.assertEqual(result["verdict"], "correct")
+        feedback = guard.format_feedback(result)
+        self.assertIn("full table scan on 'orders'", feedback)
+        self.assertIn("access_type=ALL", feedback)
+
+    def test_cheap_query_is_ok(self):
+        """Test that queries under the thresholds pass"""
+        result = self._guard(max_rows_examined=10**9, full_scan_threshold=10**9).check(SQL)
+        self.assertEqual(result["verdict"], "ok")
+        self.assertIsNone(result["reason"])
+
+    def test_explicit_zero_thresholds_are_kept(self):
+        """Test that 0 passed explicitly does not fall back to the environment defaults"""
+        guard = self._guard(max_rows_examined=0, full_scan_threshold=0, auto_limit=0)
+        self.assertEqual((guard.max_rows_examined, guard.full_scan_threshold, guard.auto_limit), (0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,129 @@
+"""
+Unit tests for RoutingInferenceService
+
+Tests failover, jittered retries of retryable errors, circuit breaking,
+hedged requests and the typed error mapping.
+"""
+
+import unittest
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.llm_errors import (
+    AllProvidersFailedError,
+    LLMProviderError,
+    LLMResponseError,
+    LLMTimeoutError,
+    classify_error,
+)
+from src.services.routing_inference import CircuitBreaker, RoutingInferenceService
+
+
+class ScriptedProvider:
+    """Fake provider returning (or raising) scripted outcomes in order"""
+
+    def __init__(self, *outcomes, delay=0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+
+    def chat_completion(self, message, context=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        outcome = self.outcomes[min(self.calls, len(self.outcomes)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def get_structured_output(self, content, json_schema):
+        return self.chat_completion(content)
+
+
+class TestRoutingInferenceService(unittest.TestCase):
+    """Test suite for RoutingInferenceService"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.sleeps = []
+
+    def _router(self, *providers, **kwargs):
+        kwargs.setdefault("max_retries", 2)
+        kwargs.setdefault("hedge", False)
+        return RoutingInferenceService(
+            [(f"p{i}", p) for i, p in enumerate(providers)], sleep=self.sleeps.append, **kwargs
+        )
+
+    def test_retries_retryable_errors_with_jittered_backoff(self):
+        """Test that a 503 is retried on the same provider before succeeding"""
+        primary = ScriptedProvider(LLMProviderError("busy", status_code=503, retryable=True), "ok")
+        router = self._router(primary, backoff_base=0.5, backoff_max=8)
+        self.assertEqual(router.chat_completion("hi"), "ok")
+        self.assertEqual(primary.calls, 2)
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertTrue(0 <= self.sleeps[0] <= 0.5)
+
+    def test_fails_over_on_non_retryable_and_invalid_responses(self):
+        """Test that bad and empty responses move on to the next provider"""
+        bad_json = ScriptedProvider(LLMResponseError("not json"))
+        empty = ScriptedProvider({})
+        good = ScriptedProvider({"sql": "SELECT 1"})
+        router = self._router(bad_json, empty, good)
+        self.assertEqual(router.get_structured_output("q", {}), {"sql": "SELECT 1"})
+        self.assertEqual((bad_json.calls, empty.calls), (1, 1))
+
+        with self.assertRaises(AllProvidersFailedError) as ctx:
+            self._router(ScriptedProvider({})).get_structured_output("q", {})
+        self.assertIsInstance(ctx.exception.errors[0], LLMResponseError)
+
+    def test_circuit_opens_and_skips_provider(self):
+        """Test that an open circuit skips the provider until the probe succeeds"""
+        flaky = ScriptedProvider(LLMTimeoutError("slow"), LLMTimeoutError("slow"), "recovered")
+        backup = ScriptedProvider("backup")
+        router = self._router(flaky, backup, max_retries=0)
+        breaker = router.routes[0].breaker
+        breaker.failure_threshold, breaker.reset_timeout = 2, 0.05
+
+        self.assertEqual(router.chat_completion("a"), "backup")
+        self.assertEqual(router.chat_completion("b"), "backup")
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(router.chat_completion("c"), "backup")
+        self.assertEqual(flaky.calls, 2)
+
+        time.sleep(0.06)
+        self.assertEqual(router.chat_completion("d"), "recovered")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_hedges_slow_primary(self):
+        """Test that a second provider is fired after the hedge delay and wins"""
+        slow = ScriptedProvider("slow", delay=0.5)
+        fast = ScriptedProvider("fast")
+        router = self._router(slow, fast, hedge=True, hedge_delay=0.05)
+        started = time.monotonic()
+        self.assertEqual(router.chat_completion("hi"), "fast")
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(fast.calls, 1)
+
+    def test_classify_error(self):
+        """Test mapping of transport exceptions to typed errors"""
+        class Response:
+            status_code = 429
+
+        class HTTPError(Exception):
+            response = Response()
+
+        class ReadTimeout(Exception):
+            pass
+
+        rate_limited = classify_error("gemini", HTTPError("too many"))
+        self.assertEqual((rate_limited.status_code, rate_limited.retryable), (429, True))
+        self.assertIsInstance(classify_error("ollama", ReadTimeout()), LLMTimeoutError)
+        self.assertFalse(classify_error("openai", RuntimeError("bug")).retryable)
+        self.assertIsInstance(LLMResponseError("x"), ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
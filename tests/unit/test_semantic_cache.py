@@ -0,0 +1,98 @@
+"""
+Unit tests for SemanticAnswerCache
+
+Tests paraphrase hits over the local answer store, the literal and negation
+guards, the light-LLM equivalence check and versioning by graph fingerprint.
+"""
+
+import unittest
+import os
+import sys
+import zlib
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.modules.semantic_graph import SemanticGraph
+from src.services.semantic_cache import LocalAnswerStore, SemanticAnswerCache
+
+INTENT = {"start_node": ["products"], "end_node": ["order_items"], "condition": ""}
+PATH = ["products", "order_items"]
+SQL = "SELECT p.name, SUM(oi.quantity) AS sold FROM products p JOIN order_items oi ON oi.product_id = p.id GROUP BY p.name ORDER BY sold DESC LIMIT 5"
+
+# Paraphrases an embedding model would place together
+SAME_MEANING = {"best selling": "top sold", "highest sales": "top sold"}
+
+
+def fake_embed(texts):
+    """Bag-of-words vectors, with known paraphrases mapped to the same words"""
+    vectors = []
+    for text in texts:
+        text = text.lower().replace("-", " ")
+        for phrase, replacement in SAME_MEANING.items():
+            text = text.replace(phrase, replacement)
+        vector = [0.0] * 64
+        for word in text.replace("?", "").split():
+            if word not in ("the", "with", "show", "me"):
+                vector[zlib.crc32(word.encode()) % 64] += 1.0
+        vectors.append(vector)
+    return vectors
+
+
+class FakeVerifier:
+    """Light LLM stand-in with a fixed verdict"""
+
+    def __init__(self, equivalent=True):
+        self.equivalent = equivalent
+        self.prompts = []
+
+    def get_structured_output(self, content, json_schema):
+        self.prompts.append(content)
+        return {"equivalent": self.equivalent}
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    """Test suite for SemanticAnswerCache"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.graph = SemanticGraph()
+        self.graph.add_node("products", node_type="table")
+        self.store = LocalAnswerStore(fake_embed)
+        self.verifier = FakeVerifier()
+        self.cache = SemanticAnswerCache(self.store, verifier=self.verifier, enabled=True, min_similarity=0.7, verify=True)
+        self.cache.add("Top 5 best-selling products", self.graph, INTENT, PATH, SQL)
+
+    def test_paraphrase_hit_is_verified(self):
+        """Test that a paraphrase reuses the cached path and SQL after the equivalence check"""
+        plan = self.cache.lookup("top 5 products with highest sales", self.graph)
+        self.assertEqual((plan["path"], plan["sql"], plan["intent"]), (PATH, SQL, INTENT))
+        self.assertAlmostEqual(plan["similarity"], 1.0)
+        self.assertEqual(len(self.verifier.prompts), 1)
+        self.assertIn("Top 5 best-selling products", self.verifier.prompts[0])
+        self.assertIsNone(self.cache.lookup("average rating of reviews", self.graph))
+        self.assertEqual(self.cache.snapshot()["hit"], 1)
+
+    def test_different_literals_or_negations_are_guarded(self):
+        """Test that near-identical questions with other numbers or a negation miss"""
+        self.assertIsNone(self.cache.lookup("Top 10 best-selling products", self.graph))
+        self.cache.add("products sold", self.graph, INTENT, PATH, "SELECT 1")
+        self.assertIsNone(self.cache.lookup("products not sold", self.graph))
+        self.assertEqual(self.cache.snapshot()["guarded"], 2)
+        self.assertEqual(self.verifier.prompts, [])
+
+    def test_verifier_rejection_falls_back(self):
+        """Test that a negative equivalence verdict is a miss"""
+        self.verifier.equivalent = False
+        self.assertIsNone(self.cache.lookup("top 5 products with highest sales", self.graph))
+        self.assertIn('nlq_semantic_cache_lookups_total{result="unverified"} 1', self.cache.to_prometheus())
+
+    def test_entries_versioned_by_graph(self):
+        """Test that a graph change hides and prunes entries of the old graph"""
+        self.graph.add_node("reviews", node_type="table")
+        self.assertIsNone(self.cache.lookup("top 5 products with highest sales", self.graph))
+        self.assertEqual(len(self.store._entries), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Unit tests for the graph sensitivity index
+
+Tests that sensitive attribute nodes are precomputed per graph, used by
+query validation, and rebuilt when the graph or keywords change.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.modules.semantic_graph import SemanticGraph
+from src.services.data_governance_service import DataGovernanceService
+
+
+class TestSensitivityIndex(unittest.TestCase):
+    """Test suite for SemanticGraph.sensitivity_index"""
+
+    def setUp(self):
+        os.environ["DATA_GOVERNANCE_ENABLED"] = "true"
+        self.governance = DataGovernanceService()
+        self.graph = SemanticGraph()
+        self.graph.add_node("users", node_type="table")
+        self.graph.add_node("users.user_id", node_type="attribute")
+        self.graph.add_node("users.password_hash", node_type="attribute")
+        # Flagged by profiling even though the name matches no keyword
+        self.graph.add_node("users.nickname", node_type="attribute", properties={"is_sensitive": True})
+
+    def test_index_marks_keyword_and_profiled_columns(self):
+        """Test that keyword matches and profiled is_sensitive flags are indexed"""
+        index = self.graph.sensitivity_index(self.governance)
+
+        self.assertTrue(index.is_sensitive("users.password_hash"))
+        self.assertTrue(index.is_sensitive("users.nickname"))
+        self.assertFalse(index.is_sensitive("users.user_id"))
+        self.assertFalse(index.is_sensitive("users"))
+        self.assertTrue(index.is_sensitive_column("USERS", "NickName"))
+        self.assertIs(index, self.graph.sensitivity_index(self.governance))
+
+    def test_validate_query_uses_index_through_aliases(self):
+        """Test that validation resolves aliases to graph columns"""
+        index = self.graph.sensitivity_index(self.governance)
+        sql = "SELECT u.user_id, u.nickname FROM users u"
+
+        self.assertTrue(self.governance.validate_query(sql)[0])
+        is_valid, error = self.governance.validate_query(sql, sensitivity_index=index)
+        self.assertFalse(is_valid)
+        self.assertIn("u.nickname", error)
+
+    def test_index_rebuilt_on_graph_or_keyword_change(self):
+        """Test invalidation when nodes are added or keywords reloaded"""
+        index = self.graph.sensitivity_index(self.governance)
+        self.graph.add_node("users.salary", node_type="attribute")
+        self.assertIsNot(index, self.graph.sensitivity_index(self.governance))
+        self.assertFalse(self.graph.sensitivity_index(self.governance).is_sensitive("users.salary"))
+
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
+            f.write("keyword,mask_type\nsalary,full\n")
+            csv_path = f.name
+        try:
+            self.governance.reload_keywords(csv_path)
+            self.assertTrue(self.graph.sensitivity_index(self.governance).is_sensitive("users.salary"))
+        finally:
+            os.unlink(csv_path)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,72 @@
+"""
+Unit tests for the governance SQL parser
+
+Tests projection, alias and lineage resolution across joins, CTEs,
+derived tables and subqueries, plus the parse cache.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.modules.sql_parser import ColumnRef, parse_sql
+
+
+class TestSQLParser(unittest.TestCase):
+    """Test suite for parse_sql"""
+
+    def test_projection_columns_and_aliases(self):
+        """Test column references, aliases and table aliases in a join"""
+        parsed = parse_sql(
+            "SELECT u.name, COUNT(o.id) AS cnt, CAST(o.created_at AS DATE) day "
+            "FROM users u LEFT JOIN orders o ON o.user_id = u.id "
+            "WHERE o.total > 10 GROUP BY u.name"
+        )
+        items = parsed.selects[0].items
+
+        self.assertEqual([item.output_name for item in items], ["name", "cnt", "day"])
+        self.assertEqual(items[1].columns, [ColumnRef("o", "id")])
+        self.assertEqual(items[2].columns, [ColumnRef("o", "created_at")])
+        self.assertEqual(parsed.tables(), ["users", "orders"])
+        self.assertEqual(parsed.table_aliases()["o"], "orders")
+
+    def test_lineage_through_cte_and_derived_table(self):
+        """Test that output columns resolve to base table columns"""
+        parsed = parse_sql(
+            "WITH t AS (SELECT password AS x, id FROM users) "
+            "SELECT d.y, t.x FROM t JOIN (SELECT secret y, id FROM creds) d ON d.id = t.id"
+        )
+
+        self.assertEqual(parsed.column_lineage("x"), [("users", "password")])
+        self.assertEqual(parsed.column_lineage("y"), [("creds", "secret")])
+        # CTE names are not base tables
+        self.assertEqual(parsed.tables(), ["users", "creds"])
+
+    def test_subqueries_and_unions_are_walked(self):
+        """Test that nested SELECTs are reachable and strings/keywords are not columns"""
+        parsed = parse_sql(
+            "SELECT a, 'b,c' AS s FROM t1 WHERE id IN (SELECT ref_id FROM t3) "
+            "UNION ALL (SELECT b, DATE_SUB(NOW(), INTERVAL 1 DAY) FROM t2)"
+        )
+        columns = [col.name for select in parsed.walk_selects() for item in select.items for col in item.columns]
+
+        self.assertEqual(sorted(columns), ["a", "b", "ref_id"])
+        self.assertCountEqual(parsed.tables(), ["t1", "t2", "t3"])
+        # Set operations match columns by position
+        self.assertEqual(parsed.column_lineage("a"), [("t1", "a"), ("t2", "b")])
+
+    def test_parse_is_cached_and_tolerant(self):
+        """Test that identical SQL reuses the parsed tree and bad SQL does not raise"""
+        sql = "SELECT id FROM users"
+        self.assertIs(parse_sql(sql), parse_sql(sql))
+
+        for bad in ["", "SHOW TABLES", "SELECT ((", "SELECT FROM WHERE"]:
+            with self.subTest(sql=bad):
+                parse_sql(bad).tables()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,104 @@
+"""
+Unit tests for SQLTemplateCache
+
+Tests literal extraction, generalizing executed SQL into typed slots, binding
+new literals and rejecting literals whose types do not fit.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.modules.semantic_graph import SemanticGraph
+from src.services.sql_template_cache import SQLTemplateCache, extract_literals, generalize_sql
+
+PATH = ["users", "orders"]
+
+
+def build_graph():
+    graph = SemanticGraph()
+    graph.add_node("users", node_type="table")
+    graph.add_node("orders", node_type="table")
+    graph.add_node("orders.order_status", node_type="attribute", properties={
+        "is_categorical": True, "sample_values": ["Delivered", "Shipped", "In Transit"],
+    })
+    return graph
+
+
+class TestSQLTemplateCache(unittest.TestCase):
+    """Test suite for SQLTemplateCache"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.graph = build_graph()
+        self.cache = SQLTemplateCache(enabled=True, max_entries=10)
+
+    def test_extract_literals(self):
+        """Test that numbers, dates, quoted strings and known values become typed placeholders"""
+        shape, literals = extract_literals("What's the total of orders for customer 123 since 2024-01-01?")
+        self.assertEqual(shape, "total of orders for customer <num> since <text>")
+        self.assertEqual([(l.kind, l.text) for l in literals], [("int", "123"), ("date", "2024-01-01")])
+
+        shape, literals = extract_literals("Show shipped orders named 'Gift Box'", self.graph.value_index())
+        self.assertEqual(shape, "<value:orders.order_status> orders named <text>")
+        self.assertEqual([l.text for l in literals], ["Shipped", "Gift Box"])
+
+    def test_generalize_requires_each_literal_once(self):
+        """Test that literals missing from the SQL or repeated in it prevent a template"""
+        _, literals = extract_literals("orders for customer 5")
+        self.assertIsNotNone(generalize_sql("SELECT * FROM orders WHERE user_id = 5", literals))
+        self.assertIsNone(generalize_sql("SELECT * FROM orders WHERE user_id = 7", literals))
+        self.assertIsNone(generalize_sql("SELECT * FROM orders WHERE user_id = 5 LIMIT 5", literals))
+        self.assertIsNone(generalize_sql("SELECT * FROM orders WHERE note = '5'", literals))
+
+    def test_bind_new_literals(self):
+        """Test that a learned template answers questions of the same shape and path"""
+        self.assertTrue(self.cache.learn(
+            "Top 10 delivered orders of customer \"Ann O'Neil\"", PATH,
+            "SELECT o.id FROM users u JOIN orders o ON o.user_id = u.id "
+            "WHERE u.name LIKE '%Ann O''Neil%' AND o.order_status = 'Delivered' LIMIT 10",
+            self.graph
+        ))
+        sql = self.cache.bind("top 3 in transit orders of customer \"Bob\"", PATH, self.graph)
+        self.assertEqual(
+            sql,
+            "SELECT o.id FROM users u JOIN orders o ON o.user_id = u.id "
+            "WHERE u.name LIKE '%Bob%' AND o.order_status = 'In Transit' LIMIT 3"
+        )
+        self.assertIsNone(self.cache.bind("top 3 in transit orders of customer 'Bob'", ["orders"], self.graph))
+
+    def test_operator_mismatch_misses(self):
+        """Test that comparison operators are part of the shape, so "<" never binds a ">" template"""
+        self.assertNotEqual(extract_literals("orders with amount > 100")[0],
+                            extract_literals("orders with amount < 100")[0])
+        self.assertTrue(self.cache.learn("orders with amount > 100", PATH,
+                                         "SELECT id FROM orders WHERE amount > 100", self.graph))
+        self.assertEqual(self.cache.bind("orders with amount > 250", PATH, self.graph),
+                         "SELECT id FROM orders WHERE amount > 250")
+        self.assertIsNone(self.cache.bind("orders with amount < 250", PATH, self.graph))
+        self.assertIsNone(self.cache.bind("orders with amount >= 250", PATH, self.graph))
+        self.assertEqual(self.cache.snapshot()["miss"], 2)
+
+    def test_type_mismatch_is_rejected(self):
+        """Test that a decimal in an integer slot or a non-date in a date slot falls back"""
+        self.cache.learn("top 10 orders since '2024-01-01'", PATH,
+                         "SELECT id FROM orders WHERE created_at >= '2024-01-01' LIMIT 10", self.graph)
+        self.assertEqual(self.cache.bind("top 5 orders since '2024-03-01'", PATH, self.graph),
+                         "SELECT id FROM orders WHERE created_at >= '2024-03-01' LIMIT 5")
+        self.assertIsNone(self.cache.bind("top 2.5 orders since '2024-03-01'", PATH, self.graph))
+        self.assertIsNone(self.cache.bind("top 5 orders since 'yesterday'", PATH, self.graph))
+        self.assertEqual(self.cache.snapshot()["rejected"], 2)
+
+    def test_graph_change_drops_templates(self):
+        """Test that templates are forgotten when the graph changes"""
+        self.cache.learn("orders for customer 5", PATH, "SELECT * FROM orders WHERE user_id = 5", self.graph)
+        self.assertIsNotNone(self.cache.bind("orders for customer 6", PATH, self.graph))
+        self.graph.add_node("payments", node_type="table")
+        self.assertIsNone(self.cache.bind("orders for customer 6", PATH, self.graph))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Unit tests for streaming helpers
+
+Tests SSE and NDJSON decoding of provider streams, event encoding for the
+streaming API and pass-through caching of streamed completions.
+"""
+
+import unittest
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.llm_cache_service import CachedInferenceService, LLMResponseCache
+from src.services.streaming import encode_ndjson, encode_sse, iter_ndjson, iter_sse_data
+
+
+class StreamingInferenceService:
+    """Fake provider that streams a fixed completion"""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.streams = 0
+
+    def stream_chat_completion(self, message, context=None):
+        self.streams += 1
+        yield from ["SELECT ", "1"]
+
+
+class TestStreaming(unittest.TestCase):
+    """Test suite for streaming helpers"""
+
+    def test_iter_sse_data(self):
+        """Test that data fields are joined per event and [DONE] ends the stream"""
+        lines = [
+            ": keep-alive", "",
+            "data: {\"a\": 1}", "",
+            b"event: update", b"data: line one", b"data: line two", b"",
+            "data: [DONE]", "",
+            "data: after done", "",
+        ]
+        self.assertEqual(list(iter_sse_data(lines)), ['{"a": 1}', "line one\nline two"])
+
+    def test_iter_ndjson(self):
+        """Test that blank lines are skipped and each line is decoded"""
+        lines = [b'{"message": {"content": "a"}}', b"", '{"done": true}']
+        self.assertEqual(list(iter_ndjson(lines)), [{"message": {"content": "a"}}, {"done": True}])
+
+    def test_encode_events(self):
+        """Test SSE and NDJSON framing of flow events"""
+        event = {"event": "sql", "sql": "SELECT 1"}
+        self.assertEqual(encode_sse(event), 'event: sql\ndata: {"event": "sql", "sql": "SELECT 1"}\n\n')
+        line = encode_ndjson(event)
+        self.assertTrue(line.endswith("\n"))
+        self.assertEqual(json.loads(line), event)
+
+    def test_cached_stream_replays_full_completion(self):
+        """Test that a streamed completion is stored once complete and replayed on a hit"""
+        service = StreamingInferenceService()
+        cached = CachedInferenceService(service, LLMResponseCache(":memory:"), mode="readwrite")
+        self.assertEqual(list(cached.stream_chat_completion("q")), ["SELECT ", "1"])
+        self.assertEqual(list(cached.stream_chat_completion("q")), ["SELECT 1"])
+        self.assertEqual(service.streams, 1)
+        # Shares the key with the non-streaming call
+        self.assertEqual(cached.chat_completion("q"), "SELECT 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Unit tests for token usage accounting
+
+Tests provider-reported vs estimated counts, per-stage attribution into the
+flow state and the Prometheus export.
+"""
+
+import unittest
+import os
+import sys
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.services.token_usage import estimate_tokens, get_meter, record_usage, track_stage
+
+
+class TestTokenUsage(unittest.TestCase):
+    """Test suite for token usage accounting"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        get_meter().reset()
+
+    def test_reported_counts_win_over_estimates(self):
+        """Test that provider usage is used as-is and missing counts are estimated"""
+        reported = record_usage("openai", "gpt-4o", "x" * 400, "ok", prompt_tokens=90, completion_tokens=2)
+        self.assertEqual((reported["prompt_tokens"], reported["completion_tokens"]), (90, 2))
+        self.assertEqual(reported["estimated_calls"], 0)
+
+        messages = [{"role": "system", "content": "a" * 40}, {"role": "user", "content": "b" * 40}]
+        estimated = record_usage("gemini", "gemini-2.5-flash", messages, "c" * 40)
+        self.assertEqual(estimated["estimated_calls"], 1)
+        self.assertEqual(estimated["prompt_tokens"], estimate_tokens("a" * 40 + "\n" + "b" * 40))
+        self.assertGreater(estimated["completion_tokens"], 0)
+        self.assertEqual(estimate_tokens(""), 0)
+
+    def test_stage_usage_is_attached_to_state(self):
+        """Test that calls inside track_stage accumulate per stage, including retries"""
+        state = {}
+        with track_stage("correct_sql", state):
+            record_usage("ollama", "llama3", "p", "c", prompt_tokens=10, completion_tokens=5)
+        with track_stage("correct_sql", state):
+            record_usage("ollama", "llama3", "p", "c", prompt_tokens=20, completion_tokens=5)
+        record_usage("ollama", "llama3", "outside", "c", prompt_tokens=1, completion_tokens=1)
+
+        usage = state["token_usage"]["correct_sql"]
+        self.assertEqual((usage["calls"], usage["prompt_tokens"], usage["total_tokens"]), (2, 30, 40))
+        self.assertEqual(list(state["token_usage"]), ["correct_sql"])
+
+    def test_stages_are_isolated_across_threads(self):
+        """Test that concurrent flows do not mix their stage totals"""
+        states = [{}, {}]
+
+        def run(state, tokens):
+            with track_stage("refine_query", state):
+                record_usage("openai", "gpt-4o", "p", "c", prompt_tokens=tokens, completion_tokens=0)
+
+        threads = [threading.Thread(target=run, args=(state, n)) for state, n in zip(states, (7, 11))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([s["token_usage"]["refine_query"]["prompt_tokens"] for s in states], [7, 11])
+
+    def test_prometheus_export(self):
+        """Test counters per stage, provider and model in the text format"""
+        with track_stage("generate_sql"):
+            record_usage("openai", "gpt-4o", "p", "c", prompt_tokens=12, completion_tokens=3)
+        text = get_meter().to_prometheus()
+        self.assertIn("# TYPE nlq_llm_prompt_tokens_total counter", text)
+        self.assertIn('nlq_llm_prompt_tokens_total{stage="generate_sql",provider="openai",model="gpt-4o"} 12', text)
+        self.assertIn('nlq_llm_calls_total{stage="generate_sql",provider="openai",model="gpt-4o"} 1', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Unit tests for CategoricalValueIndex
+
+Tests literal normalization, lookups across columns, matching values in query
+text and rewriting SQL literals to the stored spelling.
+"""
+
+import unittest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.modules.semantic_graph import SemanticGraph
+from src.modules.value_index import normalize_literal
+
+
+def build_graph():
+    graph = SemanticGraph()
+    graph.add_node("orders", node_type="table")
+    graph.add_node("payments", node_type="table")
+    graph.add_node("orders.order_status", node_type="attribute", properties={
+        "is_categorical": True, "Type": "varchar(20)",
+        "value_distribution": {"Delivered": 225, "In Transit": 3, "Pending": 2},
+    })
+    graph.add_node("payments.payment_status", node_type="attribute", properties={
+        "is_categorical": True, "sample_values": ["Pending", "Paid"],
+        "value_distribution": {"Paid": 40, "Pending": 9},
+    })
+    graph.add_node("orders.payment_method", node_type="attribute", properties={
+        "is_categorical": True, "sample_values": ["Credit Card", "COD"],
+    })
+    graph.add_node("orders.created_at", node_type="attribute", properties={
+        "is_categorical": True, "Type": "timestamp", "sample_values": ["2025-12-19 03:25:18"],
+    })
+    graph.add_node("orders.quantity", node_type="attribute", properties={
+        "is_categorical": True, "sample_values": ["1", "2"],
+    })
+    graph.add_node("orders.card_holder", node_type="attribute", properties={
+        "is_categorical": True, "is_sensitive": True, "sample_values": ["Jane Doe"],
+    })
+    return graph
+
+
+class TestCategoricalValueIndex(unittest.TestCase):
+    """Test suite for CategoricalValueIndex"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.graph = build_graph()
+        self.index = self.graph.value_index()
+
+    def test_lookup(self):
+        """Test normalized lookups, frequency order and skipped columns"""
+        self.assertEqual(normalize_literal("  In_Transit "), "in transit")
+        self.assertEqual(self.index.lookup("DELIVERED"),
+                         [{"column": "orders.order_status", "value": "Delivered", "count": 225}])
+        self.assertEqual([m["column"] for m in self.index.lookup("pending")],
+                         ["payments.payment_status", "orders.order_status"])
+        self.assertEqual(self.index.lookup("cod")[0]["count"], 0)
+        for literal in ("2025-12-19 03:25:18", "1", "jane doe"):
+            self.assertEqual(self.index.lookup(literal), [])
+
+    def test_find_in_text(self):
+        """Test multi-word values, longest matches and the table filter"""
+        matches = self.index.find_in_text("Orders in transit paid by credit card")
+        self.assertEqual([m["literal"] for m in matches], ["in transit", "paid", "credit card"])
+        self.assertEqual(matches[2]["columns"][0]["column"], "orders.payment_method")
+
+        matches = self.index.find_in_text("pending orders", tables=["orders"])
+        self.assertEqual([c["column"] for c in matches[0]["columns"]], ["orders.order_status"])
+        self.assertEqual(self.index.describe(matches), "- \"pending\": orders.order_status = 'Pending'")
+
+    def test_canonicalize_sql(self):
+        """Test that literals get the stored spelling and unknown literals are untouched"""
+        sql = "SELECT id FROM orders WHERE order_status = 'in_transit' AND note <> 'it''s' AND payment_method = 'cod'"
+        self.assertEqual(
+            self.index.canonicalize_sql(sql),
+            "SELECT id FROM orders WHERE order_status = 'In Transit' AND note <> 'it''s' AND payment_method = 'COD'"
+        )
+        sql = ("SELECT o.id FROM orders o JOIN payments p ON p.order_id = o.id "
+               "WHERE o.order_status IN ('delivered', 'in transit') AND p.payment_status = 'paid'")
+        self.assertEqual(
+            self.index.canonicalize_sql(sql),
+            "SELECT o.id FROM orders o JOIN payments p ON p.order_id = o.id "
+            "WHERE o.order_status IN ('Delivered', 'In Transit') AND p.payment_status = 'Paid'"
+        )
+
+    def test_canonicalize_sql_leaves_patterns_and_other_columns(self):
+        """Test that LIKE patterns and literals compared with columns not holding the value are untouched"""
+        for sql in (
+            "SELECT id FROM orders WHERE order_status LIKE '%delivered%'",
+            "SELECT id FROM orders WHERE payment_method LIKE 'cod%'",
+            "SELECT p.name FROM products p WHERE p.name LIKE '%pending%'",
+            "SELECT p.name FROM products p WHERE p.name = 'pending'",
+            "SELECT o.id FROM orders o WHERE o.payment_method = 'pending'",
+            "SELECT id FROM orders WHERE order_status <> 'delivered'",
+        ):
+            self.assertEqual(self.index.canonicalize_sql(sql), sql)
+
+    def test_index_rebuilt_when_graph_changes(self):
+        """Test caching on the graph version"""
+        self.assertIs(self.graph.value_index(), self.index)
+        self.graph.add_node("orders.channel", node_type="attribute",
+                            properties={"is_categorical": True, "sample_values": ["Mobile App"]})
+        self.assertEqual(self.graph.value_index().lookup("mobile app")[0]["column"], "orders.channel")
+
+
+if __name__ == '__main__':
+    unittest.main()